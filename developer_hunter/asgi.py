@@ -2,6 +2,8 @@
 ASGI config for developer_hunter project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Public read views are served by their async variants (junior_hunter.async_views),
+see gunicorn_asgi.py for the server profile.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/3.0/howto/deployment/asgi/
@@ -9,8 +11,16 @@ https://docs.djangoproject.com/en/3.0/howto/deployment/asgi/
 
 import os
 
+from django.conf import settings
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'developer_hunter.settings')
+os.environ.setdefault('DJANGO_ASYNC_VIEWS', '1')
 
 application = get_asgi_application()
+
+if settings.APPLICATION_WRITE_BEHIND:
+    # Профиль gunicorn_asgi.py загружает приложение в каждом воркере: журнал откликов,
+    # оставшийся от прошлого запуска, записывается сразу после старта
+    from junior_hunter.application_journal import flusher
+    flusher.start()
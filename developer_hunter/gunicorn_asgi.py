@@ -0,0 +1,17 @@
+"""
+Профиль gunicorn для асинхронного режима:
+
+    gunicorn developer_hunter.asgi:application -c developer_hunter/gunicorn_asgi.py
+
+Каждый воркер - event loop uvicorn, медленные клиенты его не блокируют.
+Запросы к базе выполняются в пуле из DJANGO_ASYNC_DB_POOL_SIZE потоков на воркер.
+"""
+import multiprocessing
+import os
+
+bind = '0.0.0.0:' + os.environ.get('PORT', '8000')
+worker_class = 'uvicorn.workers.UvicornWorker'
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+keepalive = 5
+timeout = 30
+graceful_timeout = 30
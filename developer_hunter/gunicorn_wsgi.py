@@ -0,0 +1,63 @@
+"""
+Профиль gunicorn для WSGI (Procfile):
+
+    gunicorn developer_hunter.wsgi -c developer_hunter/gunicorn_wsgi.py
+
+Приложение загружается и прогревается в мастере до запуска воркеров (preload_app, junior_hunter/warmup.py):
+шаблоны, маршруты, снимок рекомендаций и индекс подсказок попадают в воркеры через fork.
+Каждый воркер открывает свои соединения с базой до первого запроса.
+В лог пишется отчет о старте: загрузка Django, шаги прогрева и время до первого запроса каждого воркера.
+DJANGO_PRELOAD=0 загружает и прогревает приложение в каждом воркере отдельно.
+"""
+import multiprocessing
+import os
+import time
+
+# Начало отсчета для отчета о старте: gunicorn читает профиль до загрузки приложения
+STARTED = time.monotonic()
+
+bind = '0.0.0.0:' + os.environ.get('PORT', '8000')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+preload_app = os.environ.get('DJANGO_PRELOAD', '1') == '1'
+keepalive = 5
+timeout = 30
+graceful_timeout = 30
+
+
+def warmup(log):
+    from developer_hunter import wsgi
+    from junior_hunter.warmup import format_report, warmup
+
+    report = warmup()
+    log.info(
+        'Процесс %s: Django загружен за %.2f с, прогрев %.2f с (%s)',
+        os.getpid(), wsgi.load_seconds, sum(report.values()), format_report(report)
+    )
+
+
+def when_ready(server):
+    # С preload_app приложение уже загружено в мастере, воркеры еще не запущены
+    if server.cfg.preload_app:
+        warmup(server.log)
+    server.log.info('Готов принимать запросы через %.2f с после старта', time.monotonic() - STARTED)
+
+
+def post_fork(server, worker):
+    worker.started = time.monotonic()
+
+
+def post_worker_init(worker):
+    from django.conf import settings
+
+    from junior_hunter.warmup import FirstRequestReport, open_connections
+
+    if not worker.cfg.preload_app:
+        warmup(worker.log)
+    open_connections()
+    if settings.APPLICATION_WRITE_BEHIND:
+        # Журнал откликов, оставшийся от прошлого запуска, записывается сразу, а не с первым запросом.
+        # В мастере поток не запускается: через fork он не переходит
+        from junior_hunter.application_journal import flusher
+        flusher.start()
+    worker.log.info('Воркер %s готов через %.2f с после запуска', worker.pid, time.monotonic() - worker.started)
+    FirstRequestReport(worker.started, worker.log.info).connect()
@@ -11,7 +11,9 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 SECRET_KEY = '7(i9e-c(=+y*a=2)!q25!+ns7(ax$$$(2ujbf@j!3n-i-)v*zj'
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+# По умолчанию выключен: шаблоны кэшируются, инструменты разработки не импортируются.
+# Для разработки DJANGO_DEBUG=1
+DEBUG = os.environ.get('DJANGO_DEBUG', '0') == '1'
 
 ALLOWED_HOSTS = ['*']
 
@@ -23,6 +25,33 @@ MEDIA_ROOT = 'media'
 MEDIA_COMPANY_IMAGE_DIR = 'company_images'
 MEDIA_SPECIALITY_IMAGE_DIR = 'speciality_images'
 
+# Отдача media в production (DEBUG = False).
+# Время кэширования для файлов без хэша содержимого в имени
+MEDIA_CACHE_MAX_AGE = 60 * 60 * 24
+# None - файл отдает Django, 'x-accel-redirect' - nginx, 'x-sendfile' - apache/lighttpd
+MEDIA_SENDFILE_MODE = None
+# internal location в nginx, из которого отдаются файлы при 'x-accel-redirect'
+MEDIA_SENDFILE_PREFIX = '/protected-media/'
+
+# Сколько потоков создают уменьшенные копии логотипов и картинок специальностей
+IMAGE_DERIVATIVE_WORKERS = 2
+
+# Асинхронные публичные представления включаются при запуске через developer_hunter/asgi.py
+ASYNC_PUBLIC_VIEWS = os.environ.get('DJANGO_ASYNC_VIEWS') == '1'
+# Сколько потоков асинхронные представления используют для запросов к базе
+ASYNC_DB_POOL_SIZE = int(os.environ.get('DJANGO_ASYNC_DB_POOL_SIZE', 8))
+
+# Количество вакансий на одной странице списков
+VACANCIES_PAGE_SIZE = 20
+# Количество откликов на одной странице вакансии в профиле компании
+APPLICATIONS_PAGE_SIZE = 20
+# JSON API (junior_hunter/api.py): строк на странице по умолчанию и наибольшее значение ?limit=
+API_PAGE_SIZE = 50
+API_MAX_PAGE_SIZE = 500
+
+# Сколько строк за раз читается из базы при выгрузке откликов
+EXPORT_CHUNK_SIZE = 2000
+
 # Application definition
 
 INSTALLED_APPS = [
@@ -33,10 +62,14 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'junior_hunter',
-    'django_extensions',
 ]
 
+if DEBUG:
+    # shell_plus, runserver_plus и прочие инструменты разработки не нужны воркерам и только удлиняют их старт
+    INSTALLED_APPS.append('django_extensions')
+
 MIDDLEWARE = [
+    'junior_hunter.metrics.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -54,11 +87,15 @@ LOGIN_URL = '/login/'
 
 # LOGOUT_REDIRECT_URL = '/'
 
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [os.path.join(BASE_DIR, 'templates')],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
@@ -66,6 +103,8 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            # Без DEBUG шаблоны компилируются один раз на процесс
+            'loaders': TEMPLATE_LOADERS if DEBUG else [('django.template.loaders.cached.Loader', TEMPLATE_LOADERS)],
         },
     },
 ]
@@ -80,9 +119,106 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # Соединение переиспользуется между запросами, PRAGMA выполняются один раз
+        'CONN_MAX_AGE': int(os.environ.get('DJANGO_CONN_MAX_AGE', 600)),
     }
 }
 
+# PRAGMA для каждого нового соединения с SQLite (junior_hunter/db.py).
+# WAL позволяет читать во время записи, busy_timeout ждет блокировку вместо ошибки "database is locked"
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,  # в КиБ, то есть 64 МиБ
+    'temp_store': 'MEMORY',
+    'busy_timeout': 20000,  # мс
+}
+
+
+# Кэш. Отрендеренные публичные страницы хранятся в файловом кэше,
+# чтобы все воркеры gunicorn видели один и тот же сброс по тегам
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'responses': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache', 'responses'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
+    # Готовые карточки вакансий. Ключ строится из updated_at вакансии и логотипа компании, поэтому
+    # локального кэша процесса достаточно: устаревшая карточка просто не будет найдена
+    'fragments': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'fragments',
+        'OPTIONS': {
+            'MAX_ENTRIES': 20000,
+        },
+    },
+    # Сессии вошедших пользователей. Файловый кэш общий для воркеров; при вытеснении записи
+    # движок cached_db перечитает сессию из базы
+    'sessions': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache', 'sessions'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+        },
+    },
+}
+
+RESPONSE_CACHE_ALIAS = 'responses'
+RESPONSE_CACHE_TIMEOUT = 60 * 60
+FRAGMENT_CACHE_ALIAS = 'fragments'
+FRAGMENT_CACHE_TIMEOUT = 24 * 60 * 60
+
+# Сессии. cached_db читает сессию из кэша и обращается к базе только при записи и промахе кэша.
+# DJANGO_SESSION_ENGINE=django.contrib.sessions.backends.cache или .signed_cookies убирает и их.
+# Анонимный запрос без cookie сессии хранилище не трогает: сессия загружается лениво, а сообщения
+# хранятся только в cookie и не создают сессию анонимному посетителю
+SESSION_ENGINE = os.environ.get('DJANGO_SESSION_ENGINE', 'django.contrib.sessions.backends.cached_db')
+SESSION_CACHE_ALIAS = 'sessions'
+MESSAGE_STORAGE = 'django.contrib.messages.storage.cookie.CookieStorage'
+
+# Статическая выгрузка публичных страниц (manage.py export_site)
+STATIC_EXPORT_DIR = os.environ.get('DJANGO_STATIC_EXPORT_DIR', os.path.join(BASE_DIR, 'cache', 'site'))
+
+# Метрики запросов: снимки каждого воркера, которые собирает эндпоинт /metrics/
+METRICS_DIR = os.environ.get('DJANGO_METRICS_DIR', os.path.join(BASE_DIR, 'cache', 'metrics'))
+METRICS_FLUSH_INTERVAL = 10
+
+
+# Рекомендации вакансий по резюме (junior_hunter/matching.py)
+MATCHING_TOP_N = 10
+MATCHING_REFRESH_INTERVAL = 5  # секунд между проверками журнала изменений
+MATCHING_JOURNAL_SIZE = 100000  # сколько последних записей журнала хранить
+MATCHING_COMPACT_RATIO = 0.2  # доля устаревших строк, после которой снимок перестраивается
+
+# Подсказки в строке поиска (junior_hunter/autocomplete.py)
+AUTOCOMPLETE_LIMIT = 10
+AUTOCOMPLETE_MAX_SIZE = 50000  # подсказок в памяти процесса, остаются самые популярные
+AUTOCOMPLETE_REBUILD_INTERVAL = 10 * 60  # секунд; подхватывает изменения других процессов
+
+# Прогрев процесса до первого запроса (junior_hunter/warmup.py, developer_hunter/gunicorn_wsgi.py).
+# Снимок рекомендаций и индекс подсказок строятся при прогреве, а не на первом запросе к ним
+WARMUP_INDEXES = os.environ.get('DJANGO_WARMUP_INDEXES', '1') == '1'
+
+
+# Отклики через журнал (junior_hunter/application_journal.py): запрос дописывает отклик в файл
+# и сразу отвечает, фоновый поток каждого процесса пишет накопленное в базу пачками
+APPLICATION_WRITE_BEHIND = os.environ.get('DJANGO_APPLICATION_WRITE_BEHIND') == '1'
+APPLICATION_JOURNAL_DIR = os.environ.get(
+    'DJANGO_APPLICATION_JOURNAL_DIR', os.path.join(BASE_DIR, 'cache', 'applications')
+)
+APPLICATION_FLUSH_SIZE = int(os.environ.get('DJANGO_APPLICATION_FLUSH_SIZE', 500))
+APPLICATION_FLUSH_DELAY = float(os.environ.get('DJANGO_APPLICATION_FLUSH_DELAY', 1))  # секунд
+APPLICATION_FLUSH_MAX_ATTEMPTS = 5  # после стольких неудачных попыток отклик уходит в dead.jsonl
+# fsync после каждого отклика: принятый отклик переживает и отключение питания.
+# DJANGO_APPLICATION_JOURNAL_FSYNC=0 убирает fsync (под нагрузкой он стоит десятки миллисекунд),
+# тогда журнал, как и база с synchronous=NORMAL, переживает падение процесса, но не отключение питания
+APPLICATION_JOURNAL_FSYNC = os.environ.get('DJANGO_APPLICATION_JOURNAL_FSYNC', '1') == '1'
 
 # Password validation
 # https://docs.djangoproject.com/en/3.0/ref/settings/#auth-password-validators
@@ -1,7 +1,9 @@
+import re
+
 from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
-from django.urls import path
+from django.urls import path, re_path
 
 from junior_hunter.views import (
     MainView, VacanciesView, VacancyView,
@@ -14,33 +16,80 @@ from junior_hunter.views import (
     UserProfile, CreateCompanyProfileVacancy,
     CompanyProfileVacancy, CompanyProfileVacancyEdit,
     sent, ResumeView, CreateResume, SearchView,
-    about, all_company
+    about, all_company, ApplicationsExport, VacancyFilterView,
+    SkillVacanciesView
 )
+from junior_hunter.api import CompanyApiView, SpecialtyApiView, SuggestApiView, VacancyApiView
+from junior_hunter.media import serve_media
+from junior_hunter.metrics import metrics
+
+# Под ASGI публичные страницы обслуживаются асинхронными вариантами представлений
+if settings.ASYNC_PUBLIC_VIEWS:
+    from junior_hunter import async_views
+    main_view = async_views.AsyncMainView
+    search_view = async_views.AsyncSearchView
+    vacancies_view = async_views.AsyncVacanciesView
+    vacancy_filter_view = async_views.AsyncVacancyFilterView
+    skill_vacancies_view = async_views.AsyncSkillVacanciesView
+    vacancy_view = async_views.AsyncVacancyView
+    company_view = async_views.AsyncCompanyView
+    vacancy_in_category_view = async_views.AsyncVacancyInCategoryView
+    all_company_view = async_views.async_all_company
+    about_view = async_views.async_about
+    vacancy_api_view = async_views.AsyncVacancyApiView
+    company_api_view = async_views.AsyncCompanyApiView
+    specialty_api_view = async_views.AsyncSpecialtyApiView
+    suggest_view = async_views.AsyncSuggestApiView
+else:
+    main_view = MainView.as_view()
+    search_view = SearchView.as_view()
+    vacancies_view = VacanciesView.as_view()
+    vacancy_filter_view = VacancyFilterView.as_view()
+    skill_vacancies_view = SkillVacanciesView.as_view()
+    vacancy_view = VacancyView.as_view()
+    company_view = CompanyView.as_view()
+    vacancy_in_category_view = VacancyInCategoryView.as_view()
+    all_company_view = all_company
+    about_view = about
+    vacancy_api_view = VacancyApiView.as_view()
+    company_api_view = CompanyApiView.as_view()
+    specialty_api_view = SpecialtyApiView.as_view()
+    suggest_view = SuggestApiView.as_view()
 
 urlpatterns = [
     path(
         'admin/', admin.site.urls
     ),
+    path(
+        'metrics/',
+        metrics,
+        name='metrics'
+    ),
     path(
         '',
-        MainView.as_view(),
+        main_view,
         name='index'
     ),
     path(
         'about/',
-        about,
+        about_view,
         name='about'
     ),
     path(
         'all_company/',
-        all_company,
+        all_company_view,
         name='all_company'
     ),
     path(
         'search/',
-        SearchView.as_view(),
+        search_view,
         name='search'
     ),
+    path(
+        'search/suggest/',
+        suggest_view,
+        name='search_suggest'
+    ),
     path(
         'logout/',
         logout_view,
@@ -101,6 +150,16 @@ urlpatterns = [
         CompanyProfileVacancy.as_view(),
         name='company_vacancy'
     ),
+    path(
+        'profile/company_vacancy/<int:vacancy_id>/export/',
+        ApplicationsExport.as_view(),
+        name='vacancy_applications_export'
+    ),
+    path(
+        'profile/company_applications/export/',
+        ApplicationsExport.as_view(),
+        name='company_applications_export'
+    ),
     path(
         'profile/company_vacancy_edit/<int:company_id>/',
         CompanyProfileVacancyEdit.as_view(),
@@ -118,23 +177,48 @@ urlpatterns = [
     ),
     path(
         'vacancies/',
-        VacanciesView.as_view(),
+        vacancies_view,
         name='vacancies'
     ),
+    path(
+        'vacancies/filter/',
+        vacancy_filter_view,
+        name='vacancy_filter'
+    ),
+    path(
+        'vacancies/skills/',
+        skill_vacancies_view,
+        name='skill_vacancies'
+    ),
     path(
         'vacancies/<int:vacancy_id>/',
-        VacancyView.as_view(),
+        vacancy_view,
         name='vacancy_id'
     ),
     path(
         'companies/<int:company_id>/',
-        CompanyView.as_view(),
+        company_view,
         name='company_id'
     ),
     path(
         'vacancies/cat/<str:vacancy_in_category>/',
-        VacancyInCategoryView.as_view(),
+        vacancy_in_category_view,
         name='vacancy_in_category'
+    ),
+    path(
+        'api/vacancies/',
+        vacancy_api_view,
+        name='api_vacancies'
+    ),
+    path(
+        'api/companies/',
+        company_api_view,
+        name='api_companies'
+    ),
+    path(
+        'api/specialties/',
+        specialty_api_view,
+        name='api_specialties'
     )
 ]
 
@@ -145,3 +229,11 @@ handler500 = custom_handler500
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL,
                           document_root=settings.MEDIA_ROOT)
+else:
+    urlpatterns += [
+        re_path(
+            r'^%s(?P<path>.*)$' % re.escape(settings.MEDIA_URL.lstrip('/')),
+            serve_media,
+            name='media'
+        )
+    ]
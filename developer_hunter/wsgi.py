@@ -8,9 +8,13 @@ https://docs.djangoproject.com/en/3.0/howto/deployment/wsgi/
 """
 
 import os
+import time
 
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'developer_hunter.settings')
 
+started = time.monotonic()
 application = get_wsgi_application()
+# Время загрузки Django для отчета о старте (developer_hunter/gunicorn_wsgi.py)
+load_seconds = time.monotonic() - started
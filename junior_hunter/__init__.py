@@ -0,0 +1 @@
+default_app_config = 'junior_hunter.apps.JuniorHunterConfig'
@@ -0,0 +1,190 @@
+import json
+
+from django.conf import settings
+from django.db.models import Case, CharField, Count, F, Max, Value, When
+from django.db.models.functions import Concat
+from django.http import HttpResponse
+from django.utils.cache import patch_cache_control
+from django.utils.decorators import method_decorator
+from django.views import View
+
+from junior_hunter.autocomplete import autocomplete
+from junior_hunter.conditional import conditional_response, vacancies_validators
+from junior_hunter.models import Company, Specialty, Vacancy
+from junior_hunter.pagination import keyset_paginate
+from junior_hunter.search import filter_vacancies
+
+try:
+    import orjson
+except ImportError:
+    # Необязательная зависимость: без нее ответ кодирует стандартный json
+    orjson = None
+
+# Поля ответа: имя в API -> None (поле модели с тем же именем) или выражение для values().
+# Имена выражений не должны совпадать с полями модели
+VACANCY_FIELDS = {
+    'id': None,
+    'title': None,
+    'specialty': F('speciality__code'),
+    'company_id': None,
+    'company_name': F('company__name'),
+    'skills': None,
+    'description': None,
+    'salary_min': None,
+    'salary_max': None,
+    'published_at': None,
+    'updated_at': None,
+}
+COMPANY_FIELDS = {
+    'id': None,
+    'name': None,
+    'location': None,
+    'logo_url': Case(
+        When(logo='', then=Value(None)),
+        default=Concat(Value(settings.MEDIA_URL), 'logo'),
+        output_field=CharField()
+    ),
+    'description': None,
+    'employee_count': None,
+    'vacancy_count': None,
+    'updated_at': None,
+}
+SPECIALTY_FIELDS = {
+    'id': None,
+    'code': None,
+    'title': None,
+    'vacancy_count': None,
+    'updated_at': None,
+}
+
+# Поля по умолчанию, без ?fields=. Описание вакансии - самое тяжелое поле, его нужно запросить явно
+VACANCY_DEFAULT_FIELDS = [name for name in VACANCY_FIELDS if name != 'description']
+COMPANY_DEFAULT_FIELDS = [name for name in COMPANY_FIELDS if name != 'description']
+
+
+class FieldError(ValueError):
+    pass
+
+
+def dumps(data):
+    if orjson is not None:
+        return orjson.dumps(data)
+    # Даты и время в том же виде, что у orjson (DjangoJSONEncoder отбрасывает микросекунды)
+    return json.dumps(
+        data, default=lambda value: value.isoformat(), ensure_ascii=False, separators=(',', ':')
+    ).encode()
+
+
+def json_response(data, status=200):
+    return HttpResponse(dumps(data), content_type='application/json', status=status)
+
+
+def select_fields(queryset, request, available, default, required):
+    """queryset.values() с полями из ?fields=id,title. Поля required (по ним строится курсор)
+    выбираются всегда. Неизвестное поле - FieldError."""
+    requested = request.GET.get('fields')
+    names = [name.strip() for name in requested.split(',') if name.strip()] if requested else list(default)
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise FieldError(f'Неизвестные поля: {", ".join(unknown)}. Доступны: {", ".join(available)}')
+    names = list(dict.fromkeys([*required, *names]))
+    return queryset.values(
+        *(name for name in names if available[name] is None),
+        **{name: available[name] for name in names if available[name] is not None}
+    )
+
+
+def page_size(request):
+    try:
+        size = int(request.GET.get('limit', settings.API_PAGE_SIZE))
+    except ValueError:
+        return settings.API_PAGE_SIZE
+    return min(max(size, 1), settings.API_MAX_PAGE_SIZE)
+
+
+def next_url(request, cursor):
+    if cursor is None:
+        return None
+    query = request.GET.copy()
+    query['after'] = cursor
+    return f'{request.path}?{query.urlencode()}'
+
+
+def companies_validators(request):
+    # Удаление компании без вакансий не меняет updated_at остальных, поэтому учитывается и число строк
+    return list(Company.objects.aggregate(updated_at=Max('updated_at'), count=Count('id')).values())
+
+
+def specialties_validators(request):
+    return [value for row in Specialty.objects.values_list('id', 'updated_at') for value in row]
+
+
+@method_decorator(conditional_response(vacancies_validators), name='get')
+class VacancyApiView(View):
+    """Вакансии в JSON, новые первыми: ?specialty=backend (как страница специальности),
+    ?search=python (как поиск, но по дате, а не по релевантности), ?fields=, ?limit=, ?after=.
+    Строки читаются через values() и кодируются без создания объектов моделей."""
+
+    def get(self, request):
+        queryset = Vacancy.objects.all()
+        code = request.GET.get('specialty')
+        if code:
+            specialty_id = Specialty.objects.filter(code=code).values_list('id', flat=True).first()
+            if specialty_id is None:
+                return json_response({'error': f'Нет специальности {code}'}, status=404)
+            queryset = queryset.filter(speciality_id=specialty_id)
+        search = request.GET.get('search')
+        if search:
+            queryset = filter_vacancies(queryset, search)
+        try:
+            queryset = select_fields(queryset, request, VACANCY_FIELDS, VACANCY_DEFAULT_FIELDS, ['id', 'published_at'])
+        except FieldError as error:
+            return json_response({'error': str(error)}, status=400)
+        page = keyset_paginate(queryset, request.GET.get('after'), page_size(request))
+        return json_response({'results': page.object_list, 'next': next_url(request, page.next_cursor)})
+
+
+@method_decorator(conditional_response(companies_validators), name='get')
+class CompanyApiView(View):
+    """Компании в JSON по возрастанию id: ?fields=, ?limit=, ?after=<id последней компании>."""
+
+    def get(self, request):
+        try:
+            queryset = select_fields(
+                Company.objects.order_by('id'), request, COMPANY_FIELDS, COMPANY_DEFAULT_FIELDS, ['id']
+            )
+        except FieldError as error:
+            return json_response({'error': str(error)}, status=400)
+        after = request.GET.get('after', '')
+        if after.isdigit():
+            queryset = queryset.filter(id__gt=int(after))
+        size = page_size(request)
+        rows = list(queryset[:size + 1])
+        cursor = str(rows[size - 1]['id']) if len(rows) > size else None
+        return json_response({'results': rows[:size], 'next': next_url(request, cursor)})
+
+
+@method_decorator(conditional_response(specialties_validators), name='get')
+class SpecialtyApiView(View):
+    """Справочник специальностей в JSON целиком: ?fields=."""
+
+    def get(self, request):
+        try:
+            queryset = select_fields(
+                Specialty.objects.order_by('id'), request, SPECIALTY_FIELDS, SPECIALTY_FIELDS, ['id']
+            )
+        except FieldError as error:
+            return json_response({'error': str(error)}, status=400)
+        return json_response({'results': list(queryset), 'next': None})
+
+
+class SuggestApiView(View):
+    """Подсказки для строки поиска: ?q=pyt -> заголовки вакансий, навыки, компании и специальности,
+    популярные первыми. Отвечает из индекса в памяти процесса, без запросов к базе."""
+
+    def get(self, request):
+        suggestions = autocomplete.suggest(request.GET.get('q', ''))
+        response = json_response({'results': [suggestion.as_dict() for suggestion in suggestions]})
+        # Подсказки меняются медленно, браузер может не спрашивать их повторно при наборе того же префикса
+        patch_cache_control(response, max_age=60)
+        return response
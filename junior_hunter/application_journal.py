@@ -0,0 +1,261 @@
+import fcntl
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DatabaseError, OperationalError, close_old_connections, transaction
+from django.utils.dateparse import parse_datetime
+
+from junior_hunter.models import Application
+
+logger = logging.getLogger(__name__)
+
+# Поля отклика, которые пишутся в журнал. created_at - время отправки, а не записи в базу:
+# по нему упорядочены отклики у работодателя
+RECORD_FIELDS = ('written_username', 'written_phone', 'written_cover_letter', 'vacancy_id', 'user_id')
+
+JOURNAL_FILE = 'journal.jsonl'
+# Файлы, которые забирает flusher: pending - вынутые из журнала, retry - строки, которые не записались
+PENDING_PATTERN = 'pending-*.jsonl'
+RETRY_PATTERN = 'retry-*.jsonl'
+DEAD_FILE = 'dead.jsonl'
+
+
+def journal_path(name):
+    return os.path.join(settings.APPLICATION_JOURNAL_DIR, name)
+
+
+@contextmanager
+def file_lock(name, blocking=True):
+    """Межпроцессная блокировка flock на файле в каталоге журнала.
+    Отдает False, если blocking=False и блокировку держит другой процесс."""
+    try:
+        lock_file = open(journal_path(name), 'a')
+    except FileNotFoundError:
+        os.makedirs(settings.APPLICATION_JOURNAL_DIR, exist_ok=True)
+        lock_file = open(journal_path(name), 'a')
+    with lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def append_records(name, records):
+    """Дописывает записи в файл и дожидается fsync: после возврата записи переживут падение процесса."""
+    if not records:
+        return
+    data = ''.join(json.dumps(record, ensure_ascii=False) + '\n' for record in records).encode()
+    descriptor = os.open(journal_path(name), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(descriptor, data)
+        os.fsync(descriptor)
+    finally:
+        os.close(descriptor)
+
+
+def read_records(path):
+    records = []
+    with open(path, encoding='utf-8') as journal_file:
+        for line in journal_file:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                # Недописанная строка при падении посреди записи
+                logger.warning('Пропущена поврежденная строка журнала откликов в %s', path)
+    return records
+
+
+class Journal:
+    """Открытый на запись journal.jsonl процесса. Запись идет под flock самого файла.
+    Записанное переживает падение и перезапуск процесса, с APPLICATION_JOURNAL_FSYNC (по умолчанию) -
+    и отключение питания.
+    Сброс переименовывает файл под той же блокировкой, поэтому после получения блокировки
+    проверяется, что открытый файл все еще journal.jsonl, иначе открывается новый."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.descriptor = None
+        self.pid = None
+
+    def open(self):
+        path = journal_path(JOURNAL_FILE)
+        try:
+            return os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        except FileNotFoundError:
+            os.makedirs(settings.APPLICATION_JOURNAL_DIR, exist_ok=True)
+            return os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+    def append(self, data):
+        with self.lock:
+            if self.descriptor is None or self.pid != os.getpid():
+                self.descriptor, self.pid = self.open(), os.getpid()
+            while True:
+                fcntl.flock(self.descriptor, fcntl.LOCK_EX)
+                try:
+                    current = os.stat(journal_path(JOURNAL_FILE)).st_ino
+                except FileNotFoundError:
+                    current = None
+                if current == os.fstat(self.descriptor).st_ino:
+                    break
+                # Файл уже забрал flusher
+                os.close(self.descriptor)
+                self.descriptor = self.open()
+            try:
+                os.write(self.descriptor, data)
+                if settings.APPLICATION_JOURNAL_FSYNC:
+                    os.fsync(self.descriptor)
+            finally:
+                fcntl.flock(self.descriptor, fcntl.LOCK_UN)
+
+
+journal = Journal()
+
+
+def submit(application):
+    """Записывает несохраненный отклик в журнал вместо INSERT в базу.
+    Отклик попадет в базу при следующем сбросе, не позже APPLICATION_FLUSH_DELAY секунд."""
+    record = {field: getattr(application, field) for field in RECORD_FIELDS}
+    record['created_at'] = application.created_at.isoformat()
+    record['attempts'] = 0
+    journal.append((json.dumps(record, ensure_ascii=False) + '\n').encode())
+    flusher.notify()
+
+
+def rotate_journal():
+    """Переименовывает накопленный журнал в pending-файл, новые отклики пишутся в новый журнал."""
+    path = journal_path(JOURNAL_FILE)
+    try:
+        descriptor = os.open(path, os.O_RDONLY)
+    except FileNotFoundError:
+        return
+    try:
+        fcntl.flock(descriptor, fcntl.LOCK_EX)
+        if os.fstat(descriptor).st_size:
+            os.replace(path, journal_path(f'pending-{time.time_ns()}-{os.getpid()}.jsonl'))
+    finally:
+        os.close(descriptor)
+
+
+def application_from_record(record):
+    application = Application(**{field: record[field] for field in RECORD_FIELDS})
+    # В записях, сделанных до появления поля, даты нет: остается время записи в базу
+    if record.get('created_at'):
+        application.created_at = parse_datetime(record['created_at'])
+    return application
+
+
+def insert_records(records):
+    with transaction.atomic():
+        Application.objects.bulk_create(
+            [application_from_record(record) for record in records],
+            batch_size=settings.APPLICATION_FLUSH_SIZE
+        )
+
+
+def flush_file(path):
+    """Записывает отклики файла в базу и удаляет файл.
+    При блокировке базы (OperationalError) файл остается и будет записан заново целиком,
+    поэтому доставка - как минимум один раз. Если пачка не записалась по другой причине,
+    строки пишутся по одной, а не записавшиеся уходят в retry-файл,
+    после APPLICATION_FLUSH_MAX_ATTEMPTS попыток - в dead.jsonl."""
+    records = read_records(path)
+    try:
+        insert_records(records)
+    except OperationalError:
+        raise
+    except DatabaseError:
+        logger.exception('Пачка откликов из %s не записалась, пишем по одному', path)
+        failed = []
+        for record in records:
+            try:
+                insert_records([record])
+            except OperationalError:
+                raise
+            except DatabaseError:
+                failed.append(dict(record, attempts=record.get('attempts', 0) + 1))
+        retry = [record for record in failed if record['attempts'] < settings.APPLICATION_FLUSH_MAX_ATTEMPTS]
+        dead = [record for record in failed if record['attempts'] >= settings.APPLICATION_FLUSH_MAX_ATTEMPTS]
+        append_records(f'retry-{time.time_ns()}-{os.getpid()}.jsonl', retry)
+        append_records(DEAD_FILE, dead)
+        if dead:
+            logger.error('%s откликов не записаны после %s попыток, см. %s',
+                         len(dead), settings.APPLICATION_FLUSH_MAX_ATTEMPTS, journal_path(DEAD_FILE))
+    os.remove(path)
+    return len(records)
+
+
+def flush(blocking=False):
+    """Сбрасывает журнал в базу. Одновременно сбрасывает только один процесс,
+    остальные пропускают ход (blocking=False) или ждут его (blocking=True).
+    Недописанные при прошлом запуске pending- и retry-файлы записываются первыми.
+    Возвращает число обработанных записей."""
+    with file_lock('flush.lock', blocking=blocking) as locked:
+        if not locked:
+            return 0
+        rotate_journal()
+        directory = settings.APPLICATION_JOURNAL_DIR
+        # Имена начинаются с time_ns, поэтому сортировка сохраняет порядок откликов
+        paths = sorted(glob.glob(os.path.join(directory, PENDING_PATTERN)))
+        paths += sorted(glob.glob(os.path.join(directory, RETRY_PATTERN)))
+        return sum(flush_file(path) for path in paths)
+
+
+class Flusher:
+    """Фоновый поток процесса, который сбрасывает журнал в базу раз в APPLICATION_FLUSH_DELAY секунд
+    или сразу, как процесс принял APPLICATION_FLUSH_SIZE откликов.
+    Запускается при старте воркера (developer_hunter/gunicorn_wsgi.py, developer_hunter/asgi.py),
+    под другими серверами - первым запросом. Первый сброс идет сразу после запуска, поэтому журнал,
+    оставшийся от прошлого запуска, записывается, не дожидаясь запросов."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.pending = 0
+        self.thread = None
+        self.pid = None
+
+    def start(self, **kwargs):
+        # После fork потока в дочернем процессе нет, поэтому проверяется pid
+        if self.pid == os.getpid() and self.thread.is_alive():
+            return
+        with self.lock:
+            if self.pid == os.getpid() and self.thread.is_alive():
+                return
+            self.pid = os.getpid()
+            self.thread = threading.Thread(target=self.run, name='application-flusher', daemon=True)
+            self.thread.start()
+
+    def notify(self):
+        with self.lock:
+            self.pending += 1
+            if self.pending >= settings.APPLICATION_FLUSH_SIZE:
+                self.wakeup.set()
+
+    def run(self):
+        while True:
+            close_old_connections()
+            try:
+                flush()
+            except Exception:
+                # В том числе database is locked: файлы остались и будут записаны в следующий раз
+                logger.exception('Не удалось сбросить журнал откликов')
+            finally:
+                close_old_connections()
+            self.wakeup.wait(settings.APPLICATION_FLUSH_DELAY)
+            self.wakeup.clear()
+            with self.lock:
+                self.pending = 0
+
+
+flusher = Flusher()
@@ -3,3 +3,19 @@ from django.apps import AppConfig
 
 class JuniorHunterConfig(AppConfig):
     name = 'junior_hunter'
+
+    def ready(self):
+        from django.conf import settings
+        from django.core.signals import request_started
+        from django.db.backends.signals import connection_created
+
+        from junior_hunter import signals  # noqa: F401
+        from junior_hunter.db import configure_sqlite
+
+        connection_created.connect(configure_sqlite, dispatch_uid='configure_sqlite')
+
+        if settings.APPLICATION_WRITE_BEHIND:
+            # Поток сброса журнала откликов не нужен командам manage.py. Воркеры gunicorn и ASGI
+            # запускают его при старте, под другими серверами он стартует с первым запросом
+            from junior_hunter.application_journal import flusher
+            request_started.connect(flusher.start, dispatch_uid='application_flusher')
@@ -0,0 +1,67 @@
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial, wraps
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from junior_hunter.api import CompanyApiView, SpecialtyApiView, SuggestApiView, VacancyApiView
+from junior_hunter.views import (
+    MainView, VacanciesView, VacancyView, CompanyView,
+    VacancyInCategoryView, SearchView, VacancyFilterView, SkillVacanciesView, all_company, about
+)
+
+# Ограниченный пул потоков для работы с базой. Пока запрос ждет свободный поток
+# или медленного клиента, он не занимает ни воркер, ни соединение с базой.
+_db_executor = ThreadPoolExecutor(
+    max_workers=settings.ASYNC_DB_POOL_SIZE,
+    thread_name_prefix='async-db'
+)
+
+
+def _call_in_db_thread(func, *args, **kwargs):
+    # Соединения в потоках пула живут по тем же правилам CONN_MAX_AGE, что и в WSGI
+    close_old_connections()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+async def run_in_db_pool(func, *args, **kwargs):
+    """Выполняет синхронный код с ORM в пуле потоков базы."""
+    loop = asyncio.get_running_loop()
+    # run_in_executor не переносит contextvars, а на них держатся метрики запроса
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        _db_executor, partial(context.run, _call_in_db_thread, func, *args, **kwargs)
+    )
+
+
+def async_view(view):
+    """Асинхронный вариант синхронного представления.
+    Запросы к базе и рендер шаблона (он тоже лениво ходит в базу, например за request.user)
+    выполняются в пуле, а event loop в это время обслуживает другие соединения."""
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        return await run_in_db_pool(view, request, *args, **kwargs)
+
+    return wrapper
+
+
+AsyncMainView = async_view(MainView.as_view())
+AsyncSearchView = async_view(SearchView.as_view())
+AsyncVacanciesView = async_view(VacanciesView.as_view())
+AsyncVacancyFilterView = async_view(VacancyFilterView.as_view())
+AsyncSkillVacanciesView = async_view(SkillVacanciesView.as_view())
+AsyncVacancyView = async_view(VacancyView.as_view())
+AsyncCompanyView = async_view(CompanyView.as_view())
+AsyncVacancyInCategoryView = async_view(VacancyInCategoryView.as_view())
+async_all_company = async_view(all_company)
+async_about = async_view(about)
+AsyncVacancyApiView = async_view(VacancyApiView.as_view())
+AsyncCompanyApiView = async_view(CompanyApiView.as_view())
+AsyncSpecialtyApiView = async_view(SpecialtyApiView.as_view())
+AsyncSuggestApiView = async_view(SuggestApiView.as_view())
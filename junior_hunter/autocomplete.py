@@ -0,0 +1,322 @@
+import heapq
+import logging
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import Counter
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count
+from django.urls import reverse
+
+from junior_hunter.models import Company, Specialty, Vacancy, VacancySkill
+from junior_hunter.skills import parse_skills
+
+logger = logging.getLogger(__name__)
+
+SPACE_RE = re.compile(r'\s+')
+# Ключи строятся с начала каждого из первых слов подсказки: 'Python Django' ищется и по 'dja'
+MAX_KEY_WORDS = 5
+MAX_KEY_LENGTH = 64
+# Для префиксов не длиннее этого лучшие подсказки хранятся готовыми: под короткий префикс
+# подходят тысячи ключей, и выбирать из них на каждый запрос слишком долго.
+# Для более длинного префикса, под который подходит больше SCAN_LIMIT ключей, список запоминается при первом поиске
+TOP_PREFIX_LENGTH = 3
+SCAN_LIMIT = 256
+KEY_END = chr(0x10FFFF)
+
+
+def normalize(text):
+    """Регистр не важен, в том числе для кириллицы, 'ё' ищется как 'е': 'Ёлка  Dev' -> 'елка dev'."""
+    return SPACE_RE.sub(' ', text.casefold().replace('ё', 'е')).strip()
+
+
+def phrase_keys(text):
+    words = normalize(text).split(' ')
+    return list(dict.fromkeys(
+        ' '.join(words[start:])[:MAX_KEY_LENGTH] for start in range(min(len(words), MAX_KEY_WORDS)) if words[start]
+    ))
+
+
+def search_url(text):
+    return f'{reverse("search")}?{urlencode({"search": text})}'
+
+
+class Suggestion:
+    """Подсказка: текст, вид (title, skill, company, specialty), ссылка и популярность - число вакансий."""
+
+    __slots__ = ('ident', 'text', 'url', 'weight', 'keys')
+
+    def __init__(self, ident, text, url, weight):
+        self.ident = ident
+        self.text = text
+        self.url = url
+        self.weight = weight
+        self.keys = phrase_keys(text)
+
+    @property
+    def kind(self):
+        return self.ident[0]
+
+    def rank(self):
+        return -self.weight, self.text
+
+    def as_dict(self):
+        return {'text': self.text, 'kind': self.kind, 'url': self.url}
+
+
+class AutocompleteIndex:
+    """Префиксный индекс подсказок: отсортированный список пар (ключ, подсказка) и поиск диапазона бинарным
+    поиском. Для коротких и частых префиксов лучшие top_size подсказок хранятся готовыми и поддерживаются
+    при каждом изменении. Меняется и читается под блокировкой."""
+
+    def __init__(self, suggestions, top_size):
+        self.lock = threading.RLock()
+        self.top_size = top_size
+        self.suggestions = {suggestion.ident: suggestion for suggestion in suggestions}
+        self.entries = sorted(
+            (key, suggestion.ident) for suggestion in self.suggestions.values() for key in suggestion.keys
+        )
+        self.top = {}
+        candidates = {}
+        for key, ident in self.entries:
+            for prefix in short_prefixes([key]):
+                candidates.setdefault(prefix, set()).add(ident)
+        for prefix, idents in candidates.items():
+            self.top[prefix] = heapq.nsmallest(top_size, idents, key=self.rank)
+
+    def __len__(self):
+        return len(self.suggestions)
+
+    def rank(self, ident):
+        return self.suggestions[ident].rank()
+
+    def key_range(self, prefix):
+        return bisect_left(self.entries, (prefix,)), bisect_left(self.entries, (prefix + KEY_END,))
+
+    def scan(self, prefix, limit):
+        start, end = self.key_range(prefix)
+        return heapq.nsmallest(limit, {ident for _, ident in self.entries[start:end]}, key=self.rank)
+
+    def lookup(self, text, limit):
+        prefix = normalize(text)[:MAX_KEY_LENGTH]
+        if not prefix:
+            return []
+        with self.lock:
+            idents = self.top.get(prefix)
+            if idents is None and len(prefix) > TOP_PREFIX_LENGTH:
+                start, end = self.key_range(prefix)
+                if end - start > SCAN_LIMIT:
+                    idents = self.top[prefix] = self.scan(prefix, self.top_size)
+                else:
+                    idents = self.scan(prefix, limit)
+            return [self.suggestions[ident] for ident in (idents or [])[:limit]]
+
+    def add(self, suggestion, max_size):
+        """Добавляет подсказку, если индекс не заполнен до max_size, или заменяет текст существующей."""
+        with self.lock:
+            if suggestion.ident in self.suggestions:
+                suggestion.weight = self.suggestions[suggestion.ident].weight
+                self.remove(suggestion.ident)
+            elif len(self.suggestions) >= max_size:
+                return
+            self.suggestions[suggestion.ident] = suggestion
+            for key in suggestion.keys:
+                insort(self.entries, (key, suggestion.ident))
+            self.update_top(suggestion.ident, suggestion.keys, was_full={})
+
+    def remove(self, ident):
+        with self.lock:
+            suggestion = self.suggestions.get(ident)
+            if suggestion is None:
+                return
+            was_full = self.detach_top(ident, suggestion.keys)
+            for key in suggestion.keys:
+                position = bisect_left(self.entries, (key, ident))
+                if position < len(self.entries) and self.entries[position] == (key, ident):
+                    del self.entries[position]
+            del self.suggestions[ident]
+            self.refill_top(was_full)
+
+    def change_weight(self, ident, delta):
+        with self.lock:
+            suggestion = self.suggestions.get(ident)
+            if suggestion is None:
+                return
+            was_full = self.detach_top(ident, suggestion.keys)
+            suggestion.weight += delta
+            self.update_top(ident, suggestion.keys, was_full)
+
+    def detach_top(self, ident, keys):
+        """Убирает подсказку из готовых списков. Возвращает {префикс: ранг последней подсказки}
+        для списков, которые были заполнены: за их пределами могут быть подсказки не хуже нее."""
+        was_full = {}
+        for prefix in key_prefixes(keys):
+            top = self.top.get(prefix)
+            if top and ident in top:
+                if len(top) >= self.top_size:
+                    was_full[prefix] = self.rank(top[-1])
+                top.remove(ident)
+        return was_full
+
+    def update_top(self, ident, keys, was_full):
+        rank = self.rank(ident)
+        for prefix in key_prefixes(keys):
+            if len(prefix) <= TOP_PREFIX_LENGTH:
+                top = self.top.setdefault(prefix, [])
+            else:
+                top = self.top.get(prefix)
+                if top is None:
+                    continue
+            if prefix in was_full and rank > was_full[prefix]:
+                # Подсказка опустилась ниже прежней последней: лучшие за пределами списка неизвестны
+                top[:] = self.scan(prefix, self.top_size)
+            elif len(top) < self.top_size or rank < self.rank(top[-1]):
+                self.insert_top(top, ident, rank)
+
+    def insert_top(self, top, ident, rank):
+        position = bisect_left([self.rank(other) for other in top], rank)
+        top.insert(position, ident)
+        del top[self.top_size:]
+
+    def refill_top(self, was_full):
+        for prefix in was_full:
+            self.top[prefix] = self.scan(prefix, self.top_size)
+            if not self.top[prefix]:
+                del self.top[prefix]
+
+
+def short_prefixes(keys):
+    return {key[:length] for key in keys for length in range(1, min(len(key), TOP_PREFIX_LENGTH) + 1)}
+
+
+def key_prefixes(keys):
+    return {key[:length] for key in keys for length in range(1, len(key) + 1)}
+
+
+def entity_suggestion(kind, pk, text, code=None, weight=0):
+    if kind == 'company':
+        url = reverse('company_id', kwargs={'company_id': pk})
+    else:
+        url = reverse('vacancy_in_category', kwargs={'vacancy_in_category': code})
+    return Suggestion((kind, pk), text, url, weight)
+
+
+def text_suggestion(kind, text, weight=0):
+    """Заголовок вакансии или навык: ведет на поиск. Одинаковые без учета регистра объединяются."""
+    return Suggestion((kind, normalize(text)), text, search_url(text), weight)
+
+
+def load_suggestions(max_size):
+    """Подсказки из базы, самые популярные max_size. Заголовки группируются в SQL,
+    навыки считаются по индексу VacancySkill, для компаний и специальностей берутся счетчики."""
+    suggestions = {}
+
+    def put(suggestion, count):
+        suggestions.setdefault(suggestion.ident, suggestion).weight += count
+
+    titles = Vacancy.objects.values_list('title').annotate(count=Count('id')).order_by()
+    for title, count in titles.iterator():
+        put(text_suggestion('title', title), count)
+    for name, count in VacancySkill.objects.values_list('skill__name').annotate(count=Count('id')).order_by():
+        put(text_suggestion('skill', name), count)
+    for pk, name, count in Company.objects.values_list('id', 'name', 'vacancy_count'):
+        put(entity_suggestion('company', pk, name), count)
+    for pk, code, title, count in Specialty.objects.values_list('id', 'code', 'title', 'vacancy_count'):
+        put(entity_suggestion('specialty', pk, title, code), count)
+    suggestions.pop(('title', ''), None)
+    return heapq.nsmallest(max_size, suggestions.values(), key=Suggestion.rank)
+
+
+def vacancy_idents(title, skills, speciality_id, company_id):
+    idents = [('title', normalize(title)), ('company', company_id), ('specialty', speciality_id)]
+    return idents + [('skill', normalize(name)) for name in parse_skills(skills)]
+
+
+class Autocomplete:
+    """Индекс подсказок процесса. Строится при первом запросе подсказок и дальше обновляется сигналами
+    моделей (signals.py) на изменения, сделанные этим процессом. Изменения других процессов
+    (воркеров, импорта фидов) подхватываются перестройкой раз в AUTOCOMPLETE_REBUILD_INTERVAL секунд
+    в фоновом потоке, запросы в это время читают прежний индекс. Размер ограничен AUTOCOMPLETE_MAX_SIZE."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.index = None
+        self.built_at = 0.0
+        self.rebuilding = False
+
+    def get_index(self):
+        if self.index is None:
+            with self.lock:
+                if self.index is None:
+                    self.index = self.build()
+        elif time.monotonic() - self.built_at >= settings.AUTOCOMPLETE_REBUILD_INTERVAL and not self.rebuilding:
+            with self.lock:
+                if not self.rebuilding:
+                    self.rebuilding = True
+                    threading.Thread(target=self.rebuild, name='autocomplete-rebuild', daemon=True).start()
+        return self.index
+
+    def build(self):
+        index = AutocompleteIndex(load_suggestions(settings.AUTOCOMPLETE_MAX_SIZE), settings.AUTOCOMPLETE_LIMIT)
+        self.built_at = time.monotonic()
+        return index
+
+    def reload(self):
+        """Перестройка сразу, например для прогрева процесса до первого запроса."""
+        with self.lock:
+            self.index = self.build()
+        return self.index
+
+    def rebuild(self):
+        try:
+            index = self.build()
+            with self.lock:
+                self.index = index
+        except Exception:
+            logger.exception('Не удалось перестроить индекс подсказок')
+        finally:
+            self.rebuilding = False
+            connection.close()
+
+    def invalidate(self):
+        """Перестроить при следующем запросе, например после массовой записи вакансий."""
+        self.built_at = float('-inf')
+
+    def suggest(self, text, limit=None):
+        return self.get_index().lookup(text, min(limit or settings.AUTOCOMPLETE_LIMIT, settings.AUTOCOMPLETE_LIMIT))
+
+    def vacancy_changed(self, previous, current):
+        """previous и current - (title, skills, speciality_id, company_id) до и после изменения или None.
+        Популярность меняется только у подсказок, которые вакансия приобрела или потеряла."""
+        index = self.index
+        if index is None:
+            return
+        added = vacancy_idents(*current) if current else []
+        deltas = Counter(added)
+        deltas.subtract(vacancy_idents(*previous) if previous else [])
+        with index.lock:
+            for ident, delta in deltas.items():
+                if not delta:
+                    continue
+                if ident not in index.suggestions and delta > 0 and ident[0] in ('title', 'skill'):
+                    text = current[0] if ident[0] == 'title' else ident[1]
+                    index.add(text_suggestion(ident[0], text), settings.AUTOCOMPLETE_MAX_SIZE)
+                index.change_weight(ident, delta)
+                suggestion = index.suggestions.get(ident)
+                if suggestion is not None and suggestion.weight <= 0 and ident[0] in ('title', 'skill'):
+                    index.remove(ident)
+
+    def entity_saved(self, suggestion):
+        if self.index is not None:
+            self.index.add(suggestion, settings.AUTOCOMPLETE_MAX_SIZE)
+
+    def entity_deleted(self, ident):
+        if self.index is not None:
+            self.index.remove(ident)
+
+
+autocomplete = Autocomplete()
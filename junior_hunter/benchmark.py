@@ -0,0 +1,220 @@
+import random
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.db import connection, reset_queries, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, get_resolver, reverse
+
+from junior_hunter.counters import reconcile_vacancy_counts
+from junior_hunter.facets import rebuild_facet_counts
+from junior_hunter.models import Specialty, Company, Vacancy, Application, Resume
+from junior_hunter.signals import vacancies_bulk_changed
+
+# Кэши для замеров без готовых страниц и карточек: считается рендер, а не чтение кэша
+NO_RESPONSE_CACHE = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'responses': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+    'fragments': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+    'sessions': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'bench-sessions'},
+}
+
+SCALES = {
+    'tiny': {'specialties': 8, 'companies': 20, 'vacancies': 200, 'applications': 500},
+    'small': {'specialties': 20, 'companies': 500, 'vacancies': 10000, 'applications': 20000},
+    'large': {'specialties': 50, 'companies': 10000, 'vacancies': 500000, 'applications': 1000000},
+}
+
+SKILLS = [
+    'Python', 'Django', 'Flask', 'SQL', 'PostgreSQL', 'Docker', 'Kubernetes', 'Git', 'Linux',
+    'JavaScript', 'TypeScript', 'React', 'Vue', 'Figma', 'Photoshop', 'Unity', 'C#', 'Go',
+    'Selenium', 'Pytest', 'Agile', 'Jira', 'Парсинг', 'REST', 'Redis', 'Celery',
+]
+TITLE_WORDS = ['Разработчик', 'Инженер', 'Стажер', 'Аналитик', 'Дизайнер', 'Тестировщик', 'Менеджер']
+CITIES = ['Москва', 'Санкт-Петербург', 'Казань', 'Новосибирск', 'Екатеринбург', 'Удаленно']
+
+BATCH_SIZE = 2000
+BENCH_USERNAME = 'bench'
+
+# Маршруты, которые меняют состояние клиента или не являются страницами сайта
+SKIPPED_ROUTES = {'logout', 'media', 'metrics'}
+QUERY_STRINGS = {
+    'search': '?search=python',
+    'skill_vacancies': '?skills=python,docker&mode=all',
+    'api_vacancies': '?search=python&fields=title,company_name',
+    'search_suggest': '?q=py',
+}
+
+
+@contextmanager
+def temporary_database(name=None):
+    """Создает пустую базу для замеров и удаляет ее по выходу.
+    name - путь к файлу SQLite, по умолчанию база в памяти."""
+    if name:
+        connection.settings_dict['TEST']['NAME'] = name
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def _batches(total):
+    for start in range(1, total + 1, BATCH_SIZE):
+        yield range(start, min(start + BATCH_SIZE, total + 1))
+
+
+def seed_dataset(specialties, companies, vacancies, applications, seed=42):
+    """Детерминированно заполняет пустую базу. Возвращает пользователя-владельца
+    первой компании, от имени которого замеряются страницы профиля."""
+    rnd = random.Random(seed)
+    bench_user = User.objects.create_user(BENCH_USERNAME, password=BENCH_USERNAME, first_name='Bench')
+    owner = User.objects.create_user('bench_owner')
+    User.objects.bulk_create([User(username=f'bench_applicant_{i}') for i in range(100)])
+    applicant_ids = list(User.objects.filter(username__startswith='bench_applicant_').values_list('id', flat=True))
+
+    Specialty.objects.bulk_create([
+        Specialty(
+            id=i, code=f'spec{i}', title=f'Специальность {i}',
+            picture='MEDIA_SPECIALITY_IMAGE_DIR/specty_backend.png'
+        )
+        for i in range(1, specialties + 1)
+    ])
+    for ids in _batches(companies):
+        Company.objects.bulk_create([
+            Company(
+                id=i, name=f'Компания {i}', location=rnd.choice(CITIES),
+                logo='MEDIA_COMPANY_IMAGE_DIR/workiro.png', description='Описание компании',
+                employee_count=rnd.randint(5, 5000), owner=bench_user if i == 1 else owner
+            )
+            for i in ids
+        ])
+
+    today = date.today()
+    for day, ids in enumerate(_batches(vacancies)):
+        with transaction.atomic():
+            Vacancy.objects.bulk_create([
+                Vacancy(
+                    id=i,
+                    title=f'{rnd.choice(TITLE_WORDS)} {rnd.choice(SKILLS)}',
+                    speciality_id=rnd.randint(1, specialties),
+                    company_id=rnd.randint(1, companies),
+                    skills=', '.join(rnd.sample(SKILLS, 4)),
+                    description='Описание вакансии. ' * rnd.randint(5, 30),
+                    salary_min=salary,
+                    salary_max=salary + rnd.randint(0, 100) * 1000,
+                )
+                for i in ids
+                for salary in [rnd.randint(20, 300) * 1000]
+            ])
+            # bulk_create ставит сегодняшнюю дату, раскладываем пачки по дням
+            Vacancy.objects.filter(id__range=(ids[0], ids[-1])).update(published_at=today - timedelta(days=day))
+            vacancies_bulk_changed(ids)
+
+    for ids in _batches(applications):
+        Application.objects.bulk_create([
+            Application(
+                id=i, written_username='Соискатель', written_phone='+79000000000',
+                written_cover_letter='Сопроводительное письмо', vacancy_id=rnd.randint(1, vacancies),
+                user_id=rnd.choice(applicant_ids)
+            )
+            for i in ids
+        ])
+
+    Resume.objects.create(
+        user=bench_user, first_name='Bench', last_name='User', salary=100000, specialty_id=1,
+        education='Образование', experience='Python, Django, SQL', portfolio='https://example.com'
+    )
+    reconcile_vacancy_counts()
+    rebuild_facet_counts()
+    return bench_user
+
+
+def named_routes():
+    """Все именованные маршруты корневого urls.py (без include, например админки)."""
+    for pattern in get_resolver().url_patterns:
+        if isinstance(pattern, URLPattern) and pattern.name and pattern.name not in SKIPPED_ROUTES:
+            yield pattern.name, list(pattern.pattern.converters)
+
+
+def sample_kwargs(name, params, bench_user):
+    company = Company.objects.get(owner=bench_user)
+    vacancy = Vacancy.objects.filter(company=company).first() or Vacancy.objects.first()
+    values = {
+        'vacancy_id': vacancy.id,
+        'company_id': vacancy.id if name == 'company_vacancy_edit' else company.id,
+        'vacancy_in_category': vacancy.speciality.code,
+    }
+    return {param: values[param] for param in params}
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, int(round(fraction * len(values))) - 1))
+    return values[index]
+
+
+def measure_route(client, path, repeat):
+    """Один прогон с подсчетом запросов и пиковой памяти, затем repeat замеров времени."""
+    # Журнал запросов ограничен 9000 записями, после генерации данных он заполнен
+    reset_queries()
+    tracemalloc.start()
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(path)
+        if response.streaming:
+            b''.join(response.streaming_content)
+    # Журнал очищается в начале каждого запроса, поэтому считаем сразу
+    query_count = len(queries)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = client.get(path)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        latencies.append((time.perf_counter() - started) * 1000)
+    return {
+        'path': path,
+        'status': response.status_code,
+        'queries': query_count,
+        'peak_memory_kb': round(peak / 1024, 1),
+        'p50_ms': round(percentile(latencies, 0.50), 3),
+        'p95_ms': round(percentile(latencies, 0.95), 3),
+        'p99_ms': round(percentile(latencies, 0.99), 3),
+    }
+
+
+def route_clients(bench_user):
+    """Отдает (имя маршрута, путь, клиент) для всех страниц сайта.
+    Страницы профиля открываются от имени владельца компании, остальные - анонимно."""
+    anonymous = Client()
+    authenticated = Client()
+    authenticated.force_login(bench_user)
+    for name, params in named_routes():
+        path = reverse(name, kwargs=sample_kwargs(name, params, bench_user)) + QUERY_STRINGS.get(name, '')
+        client = authenticated if path.startswith(('/profile/', '/user_profile/')) else anonymous
+        yield name, path, client
+
+
+def run_benchmark(bench_user, repeat=20):
+    return {name: measure_route(client, path, repeat) for name, path, client in route_clients(bench_user)}
+
+
+def compare_reports(report, baseline, threshold):
+    """Возвращает список регрессий: рост p95 больше чем на threshold или рост числа запросов."""
+    regressions = []
+    for name, current in report['routes'].items():
+        previous = baseline.get('routes', {}).get(name)
+        if not previous:
+            continue
+        if current['p95_ms'] > previous['p95_ms'] * (1 + threshold):
+            regressions.append(f'{name}: p95 {previous["p95_ms"]} -> {current["p95_ms"]} мс')
+        if current['queries'] > previous['queries']:
+            regressions.append(f'{name}: запросов {previous["queries"]} -> {current["queries"]}')
+    return regressions
@@ -0,0 +1,92 @@
+import hashlib
+from calendar import timegm
+from datetime import datetime
+from functools import wraps
+
+from django.db.models import Max
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from junior_hunter.models import Company, Specialty, Vacancy
+from junior_hunter.response_cache import is_cacheable_request
+
+
+def conditional_response(validators):
+    """Отвечает 304 Not Modified, если данные страницы не менялись, без вызова представления.
+    validators(request, *args, **kwargs) возвращает список значений, от которых зависит страница
+    (даты изменения, id), или None, если страницы нет. ETag - хэш списка, Last-Modified - последняя дата.
+    Только для анонимных запросов: у пользователя с сессией в шапке его имя.
+    Декоратор стоит снаружи cache_response, поэтому validators выполняются на каждый анонимный запрос,
+    в том числе когда страница уже лежит в кэше ответов: это один-два запроса к базе
+    (updated_at одной строки или Max по таблице специальностей и компаний). Взамен 304 не читает
+    из кэша и не передает тело страницы."""
+
+    def decorator(view_func):
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if not is_cacheable_request(request):
+                return view_func(request, *args, **kwargs)
+            values = validators(request, *args, **kwargs)
+            if values is None:
+                return view_func(request, *args, **kwargs)
+            etag = quote_etag(hashlib.md5(repr(values).encode()).hexdigest())
+            timestamps = [value for value in values if isinstance(value, datetime)]
+            last_modified = timegm(max(timestamps).utctimetuple()) if timestamps else None
+
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = view_func(request, *args, **kwargs)
+            if response.status_code in (200, 304):
+                response.setdefault('ETag', etag)
+                if last_modified:
+                    response.setdefault('Last-Modified', http_date(last_modified))
+                # Браузер не должен показывать страницу из своего кэша без проверки:
+                # после входа на сайт та же страница выглядит иначе
+                patch_cache_control(response, no_cache=True)
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def companies_updated_at():
+    # Карточки вакансий выводят название и логотип компании
+    return Company.objects.aggregate(updated_at=Max('updated_at'))['updated_at']
+
+
+def main_validators(request):
+    """Главная: первые специальности и компании со счетчиками вакансий."""
+    # Порядок тот же, что у MainView: без order_by SQLite может читать только индекс по updated_at
+    rows = [
+        *Specialty.objects.order_by('id').values_list('id', 'updated_at')[:8],
+        *Company.objects.order_by('id').values_list('id', 'updated_at')[:16],
+    ]
+    return [value for row in rows for value in row]
+
+
+def vacancies_validators(request):
+    """Все вакансии: изменение любой вакансии обновляет updated_at ее специальности."""
+    return [
+        Specialty.objects.aggregate(updated_at=Max('updated_at'))['updated_at'],
+        companies_updated_at(),
+    ]
+
+
+def category_validators(request, vacancy_in_category):
+    specialty = Specialty.objects.filter(code=vacancy_in_category).values_list('updated_at', flat=True).first()
+    if specialty is None:
+        return None
+    return [specialty, companies_updated_at()]
+
+
+def company_validators(request, company_id):
+    """Страница компании: изменение ее вакансий обновляет updated_at компании."""
+    company = Company.objects.filter(id=company_id).values_list('updated_at', flat=True).first()
+    return None if company is None else [company]
+
+
+def vacancy_validators(request, vacancy_id):
+    row = Vacancy.objects.filter(id=vacancy_id).values_list('updated_at', 'company__updated_at').first()
+    return None if row is None else list(row)
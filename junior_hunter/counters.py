@@ -0,0 +1,41 @@
+from django.db import transaction
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from junior_hunter.models import Specialty, Company
+
+
+def change_vacancy_count(speciality_id, company_id, delta):
+    """Атомарно изменяет счетчики вакансий специальности и компании на delta и обновляет их updated_at:
+    по нему страницы со списками вакансий отвечают 304. delta=0 - вакансия изменилась без переноса."""
+    now = timezone.now()
+    # Разошедшийся счетчик не уходит ниже нуля: иначе CHECK поля без знака роняет удаление вакансии,
+    # а расхождение исправит reconcile_vacancy_counts
+    count = Greatest(F('vacancy_count') + delta, 0)
+    with transaction.atomic():
+        Specialty.objects.filter(id=speciality_id).update(vacancy_count=count, updated_at=now)
+        Company.objects.filter(id=company_id).update(vacancy_count=count, updated_at=now)
+
+
+def touch_vacancy_parents(speciality_ids, company_ids):
+    """Обновляет updated_at специальностей и компаний, вакансии которых изменены в обход сигналов."""
+    now = timezone.now()
+    with transaction.atomic():
+        Specialty.objects.filter(id__in=speciality_ids).update(updated_at=now)
+        Company.objects.filter(id__in=company_ids).update(updated_at=now)
+
+
+def reconcile_vacancy_counts():
+    """Пересчитывает счетчики по таблице вакансий и исправляет расхождения.
+    Возвращает количество исправленных записей."""
+    fixed = 0
+    for model in (Specialty, Company):
+        with transaction.atomic():
+            drifted = model.objects.annotate(
+                actual=Count('vacancies')
+            ).exclude(vacancy_count=F('actual')).values_list('id', 'actual')
+            for pk, actual in drifted:
+                model.objects.filter(id=pk).update(vacancy_count=actual, updated_at=timezone.now())
+                fixed += 1
+    return fixed
@@ -0,0 +1,72 @@
+import csv
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+APPLICATION_COLUMNS = [
+    'id', 'created_at', 'vacancy_id', 'vacancy__title',
+    'written_username', 'written_phone', 'written_cover_letter',
+]
+
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+}
+
+
+class Echo:
+    """Псевдофайл для csv.writer: возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows, columns):
+    writer = csv.writer(Echo())
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def jsonl_lines(rows, columns):
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for row in rows:
+        yield encoder.encode(dict(zip(columns, row))) + '\n'
+
+
+def parse_day(value):
+    try:
+        return parse_date(value or '')
+    except ValueError:
+        return None
+
+
+def day_start(day):
+    moment = datetime.combine(day, time.min)
+    return timezone.make_aware(moment) if settings.USE_TZ else moment
+
+
+def filter_by_dates(queryset, date_from, date_to, field='created_at'):
+    """Фильтр по датам ?date_from=2020-07-01&date_to=2020-07-31 включительно.
+    Сравнение идет по границам дня, чтобы работал индекс по полю."""
+    date_from = parse_day(date_from)
+    date_to = parse_day(date_to)
+    if date_from:
+        queryset = queryset.filter(**{f'{field}__gte': day_start(date_from)})
+    if date_to:
+        queryset = queryset.filter(**{f'{field}__lt': day_start(date_to + timedelta(days=1))})
+    return queryset
+
+
+def export_response(queryset, columns, filename, file_format):
+    """Потоковая выгрузка кортежей values_list() без создания моделей.
+    Память не растет с количеством строк: читаем пачками по EXPORT_CHUNK_SIZE."""
+    rows = queryset.values_list(*columns).iterator(chunk_size=settings.EXPORT_CHUNK_SIZE)
+    lines = jsonl_lines(rows, columns) if file_format == 'jsonl' else csv_lines(rows, columns)
+    response = StreamingHttpResponse(lines, content_type=CONTENT_TYPES[file_format])
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{file_format}"'
+    return response
@@ -0,0 +1,239 @@
+from bisect import bisect_right
+from collections import Counter
+from datetime import date, timedelta
+
+from django.db import connection, transaction
+from django.db.models import Case, Count, IntegerField, Sum, Value, When
+
+from junior_hunter.models import Vacancy, VacancyFacet
+from junior_hunter.response_cache import invalidate_tags
+
+# Границы диапазонов зарплаты "от" (salary_min), руб.
+SALARY_BOUNDS = [50000, 100000, 150000, 200000]
+# Окна даты публикации: (параметр days, подпись)
+DATE_WINDOWS = [(1, 'Сегодня'), (7, 'За неделю'), (30, 'За месяц')]
+
+FACET_COLUMNS = ['speciality_id', 'location', 'salary_bucket', 'published_at']
+
+
+def salary_bucket(salary_min):
+    return bisect_right(SALARY_BOUNDS, salary_min)
+
+
+def salary_bucket_label(bucket):
+    if bucket == 0:
+        return f'до {SALARY_BOUNDS[0]:,}'.replace(',', ' ')
+    if bucket == len(SALARY_BOUNDS):
+        return f'от {SALARY_BOUNDS[-1]:,}'.replace(',', ' ')
+    return f'от {SALARY_BOUNDS[bucket - 1]:,} до {SALARY_BOUNDS[bucket]:,}'.replace(',', ' ')
+
+
+def salary_bucket_case():
+    """Номер диапазона зарплаты, вычисляемый в SQL."""
+    return Case(
+        *(When(salary_min__lt=bound, then=Value(bucket)) for bucket, bound in enumerate(SALARY_BOUNDS)),
+        default=Value(len(SALARY_BOUNDS)),
+        output_field=IntegerField()
+    )
+
+
+def facet_key(speciality_id, location, salary_min, published_at):
+    return speciality_id, location, salary_bucket(salary_min), published_at
+
+
+def apply_facet_deltas(deltas):
+    """Применяет изменения количеств {ключ фасета: дельта}.
+    Прибавление - INSERT ... ON CONFLICT DO UPDATE, вычитание - только UPDATE:
+    при каскадном удалении специальности строка фасета не должна создаваться заново."""
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    table = connection.ops.quote_name(VacancyFacet._meta.db_table)
+    date_field = VacancyFacet._meta.get_field('published_at')
+    increments = []
+    decrements = []
+    for (speciality_id, location, bucket, published_at), delta in deltas.items():
+        row = [speciality_id, location, bucket, date_field.get_db_prep_save(published_at, connection)]
+        if delta > 0:
+            increments.append(row + [delta])
+        else:
+            decrements.append([delta] + row)
+    with transaction.atomic(), connection.cursor() as cursor:
+        if increments:
+            cursor.executemany(
+                f'INSERT INTO {table} ({", ".join(FACET_COLUMNS)}, vacancy_count) VALUES (%s, %s, %s, %s, %s) '
+                f'ON CONFLICT ({", ".join(FACET_COLUMNS)}) '
+                f'DO UPDATE SET vacancy_count = vacancy_count + excluded.vacancy_count',
+                increments
+            )
+        if decrements:
+            cursor.executemany(
+                f'UPDATE {table} SET vacancy_count = vacancy_count + %s WHERE '
+                + ' AND '.join(f'{column} = %s' for column in FACET_COLUMNS),
+                decrements
+            )
+    invalidate_tags('facets')
+
+
+def move_company_location(company_id, old_location, new_location):
+    """Переносит количества вакансий компании из одного города в другой."""
+    deltas = Counter()
+    rows = Vacancy.objects.filter(company_id=company_id).values_list('speciality_id', 'salary_min', 'published_at')
+    for speciality_id, salary_min, published_at in rows.iterator():
+        deltas[facet_key(speciality_id, old_location, salary_min, published_at)] -= 1
+        deltas[facet_key(speciality_id, new_location, salary_min, published_at)] += 1
+    apply_facet_deltas(deltas)
+
+
+@transaction.atomic
+def rebuild_facet_counts(batch_size=2000):
+    """Пересчитывает таблицу фасетов одним сгруппированным запросом. Возвращает число строк."""
+    VacancyFacet.objects.all().delete()
+    groups = Vacancy.objects.annotate(salary_bucket=salary_bucket_case()).values(
+        'speciality_id', 'company__location', 'salary_bucket', 'published_at'
+    ).annotate(vacancy_count=Count('id')).order_by()
+    batch = []
+    total = 0
+    for group in groups.iterator(chunk_size=batch_size):
+        batch.append(VacancyFacet(
+            speciality_id=group['speciality_id'], location=group['company__location'],
+            salary_bucket=group['salary_bucket'], published_at=group['published_at'],
+            vacancy_count=group['vacancy_count']
+        ))
+        if len(batch) >= batch_size:
+            VacancyFacet.objects.bulk_create(batch)
+            total += len(batch)
+            batch = []
+    VacancyFacet.objects.bulk_create(batch)
+    invalidate_tags('facets')
+    return total + len(batch)
+
+
+class VacancyFilter:
+    """Фильтр вакансий по специальности, городу компании, зарплате и дате публикации.
+    Параметры: ?specialty=backend&location=Москва&salary=2&days=7. Некорректные значения игнорируются.
+    Количества для вариантов каждого фасета считаются по таблице VacancyFacet
+    с учетом остальных выбранных фасетов. Все количества дает один сгруппированный запрос (counts)."""
+
+    FACETS = ('specialty', 'location', 'salary', 'days')
+
+    def __init__(self, params, specialties, today=None):
+        self.params = params
+        self.today = today or date.today()
+        self.specialties = {specialty.code: specialty for specialty in specialties}
+        specialty = self.specialties.get(params.get('specialty'))
+        self.speciality_id = specialty.id if specialty else None
+        self.location = params.get('location') or None
+        salary = params.get('salary', '')
+        self.salary = int(salary) if salary.isdigit() and int(salary) <= len(SALARY_BOUNDS) else None
+        days = params.get('days', '')
+        self.days = int(days) if days.isdigit() and int(days) in dict(DATE_WINDOWS) else None
+        self._counts = None
+
+    def since(self, days):
+        return self.today - timedelta(days=days - 1)
+
+    def vacancies(self, queryset):
+        if self.speciality_id:
+            queryset = queryset.filter(speciality_id=self.speciality_id)
+        if self.location:
+            queryset = queryset.filter(company__location=self.location)
+        if self.salary is not None:
+            if self.salary > 0:
+                queryset = queryset.filter(salary_min__gte=SALARY_BOUNDS[self.salary - 1])
+            if self.salary < len(SALARY_BOUNDS):
+                queryset = queryset.filter(salary_min__lt=SALARY_BOUNDS[self.salary])
+        if self.days:
+            queryset = queryset.filter(published_at__gte=self.since(self.days))
+        return queryset
+
+    def _window_case(self):
+        """Номер самого узкого окна DATE_WINDOWS, в которое попадает дата, или len(DATE_WINDOWS)."""
+        return Case(
+            *(When(published_at__gte=self.since(days), then=Value(number))
+              for number, (days, _) in enumerate(DATE_WINDOWS)),
+            default=Value(len(DATE_WINDOWS)),
+            output_field=IntegerField()
+        )
+
+    def counts(self):
+        """Количества одним запросом: таблица фасетов, сгруппированная по специальности, городу,
+        диапазону зарплаты и окну дат, складывается в Python. Группа идет в количества фасета,
+        если подходит под все остальные выбранные фасеты, и в итог, если подходит под все.
+        Возвращает (итог, {фасет: {значение: количество}}), для days значение - номер окна."""
+        if self._counts is not None:
+            return self._counts
+        window = [days for days, _ in DATE_WINDOWS].index(self.days) if self.days else None
+        groups = VacancyFacet.objects.filter(vacancy_count__gt=0).annotate(window=self._window_case()).values(
+            'speciality_id', 'location', 'salary_bucket', 'window'
+        ).annotate(total=Sum('vacancy_count')).order_by()
+        total = 0
+        counts = {facet: Counter() for facet in self.FACETS}
+        for group in groups:
+            values = dict(zip(self.FACETS, (
+                group['speciality_id'], group['location'], group['salary_bucket'], group['window']
+            )))
+            failed = [facet for facet, matches in zip(self.FACETS, (
+                self.speciality_id is None or values['specialty'] == self.speciality_id,
+                self.location is None or values['location'] == self.location,
+                self.salary is None or values['salary'] == self.salary,
+                window is None or values['days'] <= window,
+            )) if not matches]
+            if not failed:
+                total += group['total']
+                for facet in self.FACETS:
+                    counts[facet][values[facet]] += group['total']
+            elif len(failed) == 1:
+                counts[failed[0]][values[failed[0]]] += group['total']
+        self._counts = total, counts
+        return self._counts
+
+    def total(self):
+        return self.counts()[0]
+
+    def option(self, name, value, label, count):
+        """Вариант фасета со ссылкой, которая выбирает его или снимает выбор."""
+        params = self.params.copy()
+        params.pop('after', None)
+        selected = params.get(name) == value
+        if selected:
+            params.pop(name)
+        else:
+            params[name] = value
+        return {'label': label, 'count': count, 'selected': selected, 'query': params.urlencode()}
+
+    def facets(self):
+        """Варианты фасетов с количествами: {фасет: [вариант, ...]}."""
+        _, counts = self.counts()
+        by_specialty = counts['specialty']
+        by_location = counts['location']
+        by_salary = counts['salary']
+        # Окна дат вложены друг в друга: в окно входят и даты всех более узких окон
+        by_days = {
+            days: sum(counts['days'][window] for window in range(number + 1))
+            for number, (days, _) in enumerate(DATE_WINDOWS)
+        }
+        return {
+            'specialty': [
+                self.option('specialty', specialty.code, specialty.title, by_specialty[specialty.id])
+                for specialty in self.specialties.values() if by_specialty.get(specialty.id)
+            ],
+            'location': [
+                self.option('location', location, location, count)
+                for location, count in sorted(by_location.items()) if count
+            ],
+            'salary': [
+                self.option('salary', str(bucket), salary_bucket_label(bucket), by_salary[bucket])
+                for bucket in range(len(SALARY_BOUNDS) + 1) if by_salary.get(bucket)
+            ],
+            'days': [
+                self.option('days', str(days), title, by_days[days])
+                for days, title in DATE_WINDOWS if by_days[days]
+            ],
+        }
+
+    def query(self):
+        """Параметры фильтра без курсора - для ссылок пагинации."""
+        params = self.params.copy()
+        params.pop('after', None)
+        return params.urlencode()
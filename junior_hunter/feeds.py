@@ -0,0 +1,230 @@
+import csv
+import json
+import os
+
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.db.models import Max
+
+from junior_hunter.counters import reconcile_vacancy_counts, touch_vacancy_parents
+from junior_hunter.facets import rebuild_facet_counts
+from junior_hunter.forms import CompanyInfoForms, VacancyForm
+from junior_hunter.models import Company, Specialty, Vacancy
+from junior_hunter.response_cache import invalidate_tags
+from junior_hunter.signals import vacancies_bulk_changed
+
+VACANCY_FIELDS = ['title', 'skills', 'description', 'salary_min', 'salary_max']
+COMPANY_FIELDS = ['name', 'location', 'description', 'employee_count']
+
+
+class InvalidRow:
+    """Строка файла, которую не удалось разобрать. Импорт записывает ее в ошибки и идет дальше."""
+
+    def __init__(self, error):
+        self.errors = [error]
+
+
+def parse_json_line(line):
+    try:
+        row = json.loads(line)
+    except ValueError as error:
+        return InvalidRow(f'некорректный JSON: {error}')
+    if not isinstance(row, dict):
+        return InvalidRow('строка должна быть JSON-объектом')
+    return row
+
+
+def read_rows(path, file_format=None):
+    """Построчно читает CSV или JSONL, не загружая файл в память целиком.
+    Отдает пары (номер строки, словарь или InvalidRow)."""
+    file_format = file_format or os.path.splitext(path)[1].lstrip('.').lower()
+    with open(path, encoding='utf-8', newline='') as feed:
+        if file_format == 'csv':
+            for line_number, row in enumerate(csv.DictReader(feed), start=2):
+                yield line_number, row
+        elif file_format in ('jsonl', 'ndjson'):
+            for line_number, line in enumerate(feed, start=1):
+                if line.strip():
+                    yield line_number, parse_json_line(line)
+        else:
+            raise ValueError(f'Неизвестный формат файла: {file_format}')
+
+
+def clean_fields(form_class, field_names, row):
+    """Проверяет значения по правилам полей формы (тип, max_length, обязательность)
+    без создания экземпляра формы на каждую строку."""
+    cleaned = {}
+    errors = []
+    for name in field_names:
+        field = form_class.base_fields[name]
+        try:
+            cleaned[name] = field.clean(row.get(name))
+        except ValidationError as error:
+            errors.append(f'{name}: {" ".join(error.messages)}')
+    return cleaned, errors
+
+
+def update_rows(model, instances, field_names):
+    """Обновляет строки одним подготовленным UPDATE через executemany.
+    bulk_update строит CASE WHEN на каждую строку и на больших пачках
+    упирается в накладные расходы ORM. Значения берутся через pre_save, как при save(),
+    поэтому поля auto_now (updated_at) получают текущее время."""
+    if not instances:
+        return
+    fields = [model._meta.get_field(name) for name in field_names]
+    quote = connection.ops.quote_name
+    sql = 'UPDATE {} SET {} WHERE {} = %s'.format(
+        quote(model._meta.db_table),
+        ', '.join(f'{quote(field.column)} = %s' for field in fields),
+        quote(model._meta.pk.column)
+    )
+    params = [
+        [field.get_db_prep_save(field.pre_save(instance, False), connection) for field in fields] + [instance.pk]
+        for instance in instances
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, params)
+
+
+class FeedImporter:
+    """Потоковый импорт компаний и вакансий пачками через bulk_create и executemany.
+    Справочники специальностей и компаний держатся в памяти в виде словарей.
+    Пачки коммитятся по одной, поэтому счетчики, фасеты и кэш приводятся в порядок
+    и после ошибки посреди файла: записанное до нее уже в базе."""
+
+    def __init__(self, batch_size=1000, upsert=False, owner=None):
+        self.batch_size = batch_size
+        self.upsert = upsert
+        self.owner = owner
+        self.created = 0
+        self.updated = 0
+        self.errors = []
+        self.specialties = dict(Specialty.objects.values_list('code', 'id'))
+        self.companies = dict(Company.objects.values_list('name', 'id'))
+        self.touched_companies = set()
+        self.touched_specialties = set()
+
+    def import_companies(self, rows):
+        try:
+            self._import(rows, self._company_from_row, self._write_companies)
+        finally:
+            self._after_companies()
+
+    def _after_companies(self):
+        if self.upsert:
+            # Город компании входит в фасеты ее вакансий, а обновление идет в обход сигналов
+            rebuild_facet_counts()
+        invalidate_tags('companies', *(f'company:{pk}' for pk in self.touched_companies))
+
+    def import_vacancies(self, rows):
+        try:
+            self._import(rows, self._vacancy_from_row, self._write_vacancies)
+        finally:
+            self._after_vacancies()
+
+    def _after_vacancies(self):
+        reconcile_vacancy_counts()
+        touch_vacancy_parents(self.touched_specialties, self.touched_companies)
+        rebuild_facet_counts()
+        codes = {code for code, pk in self.specialties.items() if pk in self.touched_specialties}
+        invalidate_tags(
+            'vacancies', 'companies', 'specialties',
+            *(f'company:{pk}' for pk in self.touched_companies),
+            *(f'specialty:{code}' for code in codes)
+        )
+
+    def _import(self, rows, parse, write):
+        batch = {}
+        for line_number, row in rows:
+            if isinstance(row, InvalidRow):
+                self.errors.append((line_number, row.errors))
+                continue
+            key, instance, errors = parse(row)
+            if errors:
+                self.errors.append((line_number, errors))
+                continue
+            # Повтор ключа внутри пачки - побеждает последняя строка
+            batch[key if self.upsert else line_number] = instance
+            if len(batch) >= self.batch_size:
+                write(list(batch.values()))
+                batch = {}
+        if batch:
+            write(list(batch.values()))
+
+    def _company_from_row(self, row):
+        cleaned, errors = clean_fields(CompanyInfoForms, COMPANY_FIELDS, row)
+        if errors:
+            return None, None, errors
+        # Хэш копий нового логотипа запишет junior_hunter.images после их создания
+        company = Company(owner=self.owner, logo=row.get('logo') or '', logo_digest='', **cleaned)
+        return company.name, company, []
+
+    def _vacancy_from_row(self, row):
+        cleaned, errors = clean_fields(VacancyForm, VACANCY_FIELDS, row)
+        speciality_id = self.specialties.get(row.get('specialty'))
+        company_id = self.companies.get(row.get('company'))
+        if speciality_id is None:
+            errors.append(f'specialty: нет специальности с кодом {row.get("specialty")!r}')
+        if company_id is None:
+            errors.append(f'company: нет компании {row.get("company")!r}')
+        if not errors and cleaned['salary_min'] > cleaned['salary_max']:
+            errors.append('salary_min: больше salary_max')
+        if errors:
+            return None, None, errors
+        vacancy = Vacancy(speciality_id=speciality_id, company_id=company_id, **cleaned)
+        return (company_id, vacancy.title), vacancy, []
+
+    @transaction.atomic
+    def _write_companies(self, companies):
+        existing = {}
+        if self.upsert:
+            existing = dict(
+                Company.objects.filter(name__in=[c.name for c in companies]).values_list('name', 'id')
+            )
+        to_update = []
+        for company in companies:
+            if company.name in existing:
+                company.id = existing[company.name]
+                to_update.append(company)
+        to_create = [company for company in companies if company.id is None]
+        # Строка без логотипа не стирает уже загруженный
+        update_rows(Company, [c for c in to_update if c.logo], COMPANY_FIELDS + ['logo', 'logo_digest', 'updated_at'])
+        update_rows(Company, [c for c in to_update if not c.logo], COMPANY_FIELDS + ['updated_at'])
+        Company.objects.bulk_create(to_create)
+        # bulk_create в SQLite не возвращает id, поэтому перечитываем справочник по именам
+        created = Company.objects.filter(name__in=[c.name for c in to_create]).values_list('name', 'id')
+        self.companies.update(created)
+        self.touched_companies.update(company.id for company in to_update)
+        self.touched_companies.update(pk for _, pk in created)
+        self.created += len(to_create)
+        self.updated += len(to_update)
+
+    @transaction.atomic
+    def _write_vacancies(self, vacancies):
+        to_update = []
+        if self.upsert:
+            existing = {
+                (company_id, title): (pk, speciality_id)
+                for pk, company_id, title, speciality_id in Vacancy.objects.filter(
+                    company_id__in={v.company_id for v in vacancies},
+                    title__in={v.title for v in vacancies}
+                ).values_list('id', 'company_id', 'title', 'speciality_id')
+            }
+            for vacancy in vacancies:
+                found = existing.get((vacancy.company_id, vacancy.title))
+                if found:
+                    vacancy.id, previous_speciality_id = found
+                    self.touched_specialties.add(previous_speciality_id)
+                    to_update.append(vacancy)
+        to_create = [vacancy for vacancy in vacancies if vacancy.id is None]
+        update_rows(Vacancy, to_update, VACANCY_FIELDS + ['speciality', 'updated_at'])
+        last_id = Vacancy.objects.aggregate(last_id=Max('id'))['last_id'] or 0
+        Vacancy.objects.bulk_create(to_create)
+        # Внутри транзакции SQLite других писателей нет, поэтому новые строки - это id > last_id
+        changed_ids = [vacancy.id for vacancy in to_update]
+        changed_ids += Vacancy.objects.filter(id__gt=last_id).values_list('id', flat=True)
+        vacancies_bulk_changed(changed_ids)
+        self.touched_companies.update(vacancy.company_id for vacancy in vacancies)
+        self.touched_specialties.update(vacancy.speciality_id for vacancy in vacancies)
+        self.created += len(to_create)
+        self.updated += len(to_update)
@@ -0,0 +1,134 @@
+import hashlib
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from PIL import Image
+
+from junior_hunter.response_cache import bump_tag_versions
+
+logger = logging.getLogger(__name__)
+
+# Размеры, в которых картинки выводятся в шаблонах
+PRESETS = {
+    'company_logo': (130, 80),
+    'specialty_picture': (80, 80),
+}
+DENSITIES = (1, 2)
+FORMATS = (
+    ('webp', 'WEBP', {'quality': 80, 'method': 6}),
+    ('png', 'PNG', {'optimize': True}),
+)
+DERIVATIVES_DIR = 'derivatives'
+DIGEST_LENGTH = 12
+
+# Пул текущего процесса (get_executor) и pid, в котором он создан
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Пул потоков для копий картинок. Создается первой задачей процесса, а не при импорте:
+    с gunicorn --preload модуль импортируется в мастере, а пул с его потоками и очередью
+    через fork в воркер не переходит. Поэтому проверяется pid, как у application_journal.Flusher."""
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.IMAGE_DERIVATIVE_WORKERS,
+                thread_name_prefix='image-derivatives'
+            )
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def source_digest(data):
+    return hashlib.sha256(data).hexdigest()[:DIGEST_LENGTH]
+
+
+def derivative_name(name, preset, density, extension, digest):
+    """MEDIA_COMPANY_IMAGE_DIR/logo.png -> derivatives/company_logo/MEDIA_COMPANY_IMAGE_DIR/logo-2x.3f2a9c1b0d4e.webp
+    В имени хэш содержимого исходника: новая картинка получает новый URL, и копии можно кэшировать навсегда."""
+    base = os.path.splitext(name)[0]
+    return f'{DERIVATIVES_DIR}/{preset}/{base}-{density}x.{digest}.{extension}'
+
+
+def derivatives_exist(name, preset, digest):
+    return all(
+        default_storage.exists(derivative_name(name, preset, density, extension, digest))
+        for density in DENSITIES for extension, _, _ in FORMATS
+    )
+
+
+def generate_derivatives(name, preset, force=False):
+    """Создает уменьшенные копии картинки во всех форматах и плотностях.
+    Возвращает (хэш содержимого, были ли созданы копии)."""
+    with default_storage.open(name) as source:
+        data = source.read()
+    digest = source_digest(data)
+    if not force and derivatives_exist(name, preset, digest):
+        return digest, False
+    width, height = PRESETS[preset]
+    original = Image.open(BytesIO(data))
+    original.load()
+    for density in DENSITIES:
+        image = original.copy()
+        # Картинка вписывается в рамку без обрезки и никогда не увеличивается
+        image.thumbnail((width * density, height * density), Image.LANCZOS)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA')
+        for extension, image_format, options in FORMATS:
+            buffer = BytesIO()
+            image.save(buffer, image_format, **options)
+            path = derivative_name(name, preset, density, extension, digest)
+            if default_storage.exists(path):
+                default_storage.delete(path)
+            default_storage.save(path, ContentFile(buffer.getvalue()))
+    return digest, True
+
+
+def record_digest(image, digest):
+    """Запоминает хэш копий в поле <поле картинки>_digest, если картинка за это время не сменилась.
+    Возвращает True, если значение изменилось."""
+    field = image.field.name
+    return bool(
+        type(image.instance).objects
+        .filter(pk=image.instance.pk, **{field: image.name})
+        .exclude(**{f'{field}_digest': digest})
+        .update(**{f'{field}_digest': digest})
+    )
+
+
+def build_derivatives(image, preset, tag, force=False):
+    """Создает копии картинки модели и запоминает их хэш. Страницы с тегом tag сбрасываются,
+    когда копии появились или сменились. Возвращает True в этом случае."""
+    digest, created = generate_derivatives(image.name, preset, force=force)
+    changed = record_digest(image, digest)
+    if created or changed:
+        bump_tag_versions([tag])
+    return created or changed
+
+
+def _generate_in_background(image, preset, tag):
+    try:
+        build_derivatives(image, preset, tag)
+    except Exception:
+        logger.exception('Не удалось создать копии картинки %s', image.name)
+    finally:
+        connection.close()
+
+
+def schedule_derivatives(image, preset, tag):
+    """Ставит создание копий картинки модели (FieldFile) в фоновый пул после коммита транзакции,
+    чтобы не декодировать картинку в потоке запроса.
+    После создания сбрасывается кэш страниц с тегом tag.
+    Картинка с записанным хэшем не менялась (новая загрузка его сбрасывает, junior_hunter.signals): ее пропускаем."""
+    if image and not getattr(image.instance, f'{image.field.name}_digest', ''):
+        transaction.on_commit(lambda: get_executor().submit(_generate_in_background, image, preset, tag))
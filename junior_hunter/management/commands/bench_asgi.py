@@ -0,0 +1,75 @@
+import asyncio
+import importlib
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, Client, override_settings
+from django.urls import clear_url_caches, set_urlconf
+
+from junior_hunter.benchmark import NO_RESPONSE_CACHE
+
+DEFAULT_PATHS = ['/', '/vacancies/', '/all_company/', '/about/']
+
+
+def summary(name, latencies, elapsed):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1] if latencies else 0
+    return (f'{name}: {len(latencies) / elapsed:.0f} запр/с, '
+            f'p50 {statistics.median(latencies) * 1000:.1f} мс, p95 {p95 * 1000:.1f} мс')
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает пропускную способность публичных страниц через WSGI и ASGI в одном процессе'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='*', default=DEFAULT_PATHS)
+        parser.add_argument('--requests', type=int, default=200, help='Запросов на каждый путь')
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--with-cache', action='store_true', help='Не отключать кэш ответов')
+
+    def handle(self, *args, **options):
+        paths = options['paths'] * options['requests']
+        cache_settings = {} if options['with_cache'] else {'CACHES': NO_RESPONSE_CACHE}
+        with override_settings(ASYNC_PUBLIC_VIEWS=False, **cache_settings):
+            self.reload_urls()
+            self.stdout.write(summary('WSGI', *self.run_wsgi(paths, options['concurrency'])))
+        with override_settings(ASYNC_PUBLIC_VIEWS=True, **cache_settings):
+            self.reload_urls()
+            self.stdout.write(summary('ASGI', *asyncio.run(self.run_asgi(paths, options['concurrency']))))
+        self.reload_urls()
+
+    def reload_urls(self):
+        # urls.py выбирает варианты представлений при импорте
+        importlib.reload(importlib.import_module(settings.ROOT_URLCONF))
+        clear_url_caches()
+        set_urlconf(settings.ROOT_URLCONF)
+
+    def run_wsgi(self, paths, concurrency):
+        def fetch(path):
+            started = time.perf_counter()
+            Client().get(path)
+            return time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            latencies = list(executor.map(fetch, paths))
+        return latencies, time.perf_counter() - started
+
+    async def run_asgi(self, paths, concurrency):
+        client = AsyncClient()
+        queue = list(reversed(paths))
+        latencies = []
+
+        async def worker():
+            while queue:
+                path = queue.pop()
+                started = time.perf_counter()
+                await client.get(path)
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return latencies, time.perf_counter() - started
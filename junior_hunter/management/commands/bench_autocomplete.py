@@ -0,0 +1,52 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from junior_hunter.autocomplete import AutocompleteIndex, Suggestion
+from junior_hunter.benchmark import percentile
+
+WORDS = ['python', 'django', 'разработчик', 'программист', 'аналитик', 'данных', 'стажер', 'младший', 'junior',
+         'backend', 'frontend', 'тестировщик', 'инженер', 'devops', 'менеджер', 'проекта', 'дизайнер', 'интерфейсов',
+         'java', 'javascript', 'react', 'ёлка', 'Поддержка', 'администратор', 'системный', 'sql', 'go', 'qa']
+
+
+class Command(BaseCommand):
+    help = 'Замеряет подсказки строки поиска на синтетическом индексе без базы данных'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--suggestions', type=int, default=50000)
+        parser.add_argument('--queries', type=int, default=20000)
+        parser.add_argument('--updates', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        rnd = random.Random(0)
+        suggestions = {}
+        while len(suggestions) < options['suggestions']:
+            text = ' '.join(rnd.sample(WORDS, rnd.randint(1, 4))) + f' {rnd.randrange(100000)}'
+            suggestions[text] = Suggestion(('title', text), text, '', int(rnd.paretovariate(1.2)))
+        started = time.perf_counter()
+        index = AutocompleteIndex(suggestions.values(), 10)
+        self.stdout.write(f'Индекс из {len(index)} подсказок построен за {time.perf_counter() - started:.1f} с')
+
+        latencies = []
+        for _ in range(options['queries']):
+            word = rnd.choice(WORDS)
+            prefix = word[:rnd.randint(1, len(word))]
+            started = time.perf_counter()
+            index.lookup(prefix.upper() if rnd.random() < 0.2 else prefix, 10)
+            latencies.append(time.perf_counter() - started)
+        self.stdout.write(
+            f'Поиск: p50 {percentile(latencies, 0.5) * 1000:.3f} мс, p99 {percentile(latencies, 0.99) * 1000:.3f} мс'
+        )
+
+        idents = list(index.suggestions)
+        latencies = []
+        for _ in range(options['updates']):
+            started = time.perf_counter()
+            index.change_weight(rnd.choice(idents), rnd.choice([-1, 1]))
+            latencies.append(time.perf_counter() - started)
+        self.stdout.write(
+            f'Изменение популярности: p50 {percentile(latencies, 0.5) * 1000:.3f} мс, '
+            f'p99 {percentile(latencies, 0.99) * 1000:.3f} мс'
+        )
@@ -0,0 +1,43 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from junior_hunter.benchmark import percentile
+from junior_hunter.matching import Snapshot, tokenize
+
+SKILLS = ['python', 'django', 'flask', 'sql', 'postgresql', 'docker', 'git', 'linux', 'javascript', 'react',
+          'vue', 'typescript', 'go', 'java', 'kotlin', 'c#', 'c++', 'redis', 'celery', 'kafka']
+
+
+class Command(BaseCommand):
+    help = 'Замеряет подбор вакансий для резюме на синтетическом снимке без базы данных'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--vacancies', type=int, default=1000000)
+        parser.add_argument('--specialties', type=int, default=8)
+        parser.add_argument('--queries', type=int, default=200)
+        parser.add_argument('--top', type=int, default=10)
+
+    def handle(self, *args, **options):
+        rnd = random.Random(0)
+        rows = (
+            (pk, rnd.randint(1, options['specialties']), salary, salary + rnd.randrange(0, 100000, 5000),
+             ', '.join(rnd.sample(SKILLS, 4)))
+            for pk in range(1, options['vacancies'] + 1)
+            for salary in [rnd.randrange(30000, 300000, 5000)]
+        )
+        started = time.perf_counter()
+        snapshot = Snapshot.build(rows, watermark=0)
+        self.stdout.write(f'Снимок из {len(snapshot)} вакансий построен за {time.perf_counter() - started:.1f} с')
+
+        latencies = []
+        for _ in range(options['queries']):
+            tokens = tokenize(', '.join(rnd.sample(SKILLS, 3)))
+            started = time.perf_counter()
+            scores = snapshot.score(rnd.randint(1, options['specialties']), rnd.randrange(50000, 250000, 10000), tokens)
+            snapshot.top(scores, options['top'])
+            latencies.append(time.perf_counter() - started)
+        self.stdout.write(
+            f'Подбор: p50 {percentile(latencies, 0.5) * 1000:.2f} мс, p99 {percentile(latencies, 0.99) * 1000:.2f} мс'
+        )
@@ -0,0 +1,57 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+
+from junior_hunter.benchmark import (
+    NO_RESPONSE_CACHE, SCALES, compare_reports, run_benchmark, seed_dataset, temporary_database
+)
+
+
+class Command(BaseCommand):
+    help = ('Замеряет p50/p95/p99, число SQL-запросов и пиковую память для всех именованных маршрутов '
+            'на сгенерированных данных во временной базе. Отчет сохраняется в JSON')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=SCALES, default='small')
+        for name in ('specialties', 'companies', 'vacancies', 'applications'):
+            parser.add_argument(f'--{name}', type=int, help=f'Переопределить количество ({name}) из --scale')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--repeat', type=int, default=20, help='Замеров на каждый маршрут')
+        parser.add_argument('--db-file', help='Файл для временной базы, по умолчанию база в памяти')
+        parser.add_argument('--with-cache', action='store_true', help='Не отключать кэш ответов')
+        parser.add_argument('--output', default='bench_report.json')
+        parser.add_argument('--compare', help='Сохраненный отчет, с которым сравнить результат')
+        parser.add_argument('--threshold', type=float, default=0.2, help='Допустимый рост p95, доля')
+
+    def handle(self, *args, **options):
+        scale = dict(SCALES[options['scale']])
+        for name in scale:
+            if options[name] is not None:
+                scale[name] = options[name]
+
+        cache_settings = {} if options['with_cache'] else {'CACHES': NO_RESPONSE_CACHE}
+        with temporary_database(options['db_file']), override_settings(DEBUG=False, **cache_settings):
+            self.stdout.write(f'Генерация данных: {scale}')
+            bench_user = seed_dataset(seed=options['seed'], **scale)
+            routes = run_benchmark(bench_user, repeat=options['repeat'])
+
+        report = {'scale': scale, 'seed': options['seed'], 'repeat': options['repeat'], 'routes': routes}
+        with open(options['output'], 'w', encoding='utf-8') as output:
+            json.dump(report, output, ensure_ascii=False, indent=2)
+
+        for name, result in routes.items():
+            self.stdout.write(
+                f'{name:32} {result["status"]} p50 {result["p50_ms"]:8.2f} p95 {result["p95_ms"]:8.2f} '
+                f'p99 {result["p99_ms"]:8.2f} мс, запросов {result["queries"]:4}, '
+                f'память {result["peak_memory_kb"]} КБ'
+            )
+        self.stdout.write(f'Отчет сохранен в {options["output"]}')
+
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as baseline_file:
+                baseline = json.load(baseline_file)
+            regressions = compare_reports(report, baseline, options['threshold'])
+            if regressions:
+                raise CommandError('Регрессии производительности:\n' + '\n'.join(regressions))
+            self.stdout.write(self.style.SUCCESS('Регрессий нет'))
@@ -0,0 +1,123 @@
+import os
+import random
+import tempfile
+import threading
+import time
+from functools import partial
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection
+from django.test import override_settings
+
+from junior_hunter import application_journal
+from junior_hunter.benchmark import SCALES, percentile, seed_dataset, temporary_database
+from junior_hunter.models import Application, Vacancy
+from junior_hunter.pagination import keyset_paginate
+
+# Настройки SQLite по умолчанию: журнал отката, стандартный таймаут модуля sqlite3
+DEFAULT_PRAGMAS = {}
+
+
+class Worker(threading.Thread):
+    """Поток со своим соединением, который до остановки выполняет operation в цикле."""
+
+    def __init__(self, operation, stop):
+        super().__init__(daemon=True)
+        self.operation = operation
+        self.stop = stop
+        self.latencies = []
+        self.errors = 0
+
+    def run(self):
+        rnd = random.Random(self.name)
+        try:
+            while not self.stop.is_set():
+                started = time.perf_counter()
+                try:
+                    self.operation(rnd)
+                except OperationalError:
+                    # database is locked
+                    self.errors += 1
+                    continue
+                self.latencies.append(time.perf_counter() - started)
+        finally:
+            connection.close()
+
+
+def read_pages(vacancies, rnd):
+    # То же, что делают страницы списка вакансий и вакансии
+    list(keyset_paginate(Vacancy.objects.select_related('company'), None, 20))
+    Vacancy.objects.select_related('company').filter(id=rnd.randint(1, vacancies)).first()
+
+
+def write_application(vacancies, user_id, rnd):
+    # То же, что VacancyView.post: один INSERT в режиме autocommit или запись в журнал откликов
+    application = Application(
+        written_username='Соискатель', written_phone='+79000000000', written_cover_letter='Письмо',
+        vacancy_id=rnd.randint(1, vacancies), user_id=user_id
+    )
+    if settings.APPLICATION_WRITE_BEHIND:
+        application_journal.submit(application)
+    else:
+        application.save()
+
+
+class Command(BaseCommand):
+    help = ('Замеряет пропускную способность чтения при параллельной записи в файловую базу SQLite '
+            'с настройками по умолчанию, с SQLITE_PRAGMAS из настроек и с записью откликов через журнал')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=SCALES, default='tiny')
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--duration', type=float, default=5, help='Секунд на каждый режим')
+        parser.add_argument('--db-file', help='Файл для временной базы, по умолчанию во временном каталоге')
+
+    def handle(self, *args, **options):
+        db_file = options['db_file'] or os.path.join(tempfile.mkdtemp(), 'bench_contention.sqlite3')
+        modes = [
+            ('по умолчанию', DEFAULT_PRAGMAS, False),
+            ('SQLITE_PRAGMAS', settings.SQLITE_PRAGMAS, False),
+            ('SQLITE_PRAGMAS и журнал откликов', settings.SQLITE_PRAGMAS, True),
+        ]
+        for title, pragmas, write_behind in modes:
+            journal_dir = os.path.join(os.path.dirname(db_file), 'applications')
+            with override_settings(
+                SQLITE_PRAGMAS=pragmas, APPLICATION_WRITE_BEHIND=write_behind, APPLICATION_JOURNAL_DIR=journal_dir
+            ), temporary_database(db_file):
+                connection.close()  # соединение создания базы открыто без PRAGMA
+                bench_user = seed_dataset(**SCALES[options['scale']])
+                connection.close()
+                if write_behind:
+                    application_journal.flusher.start()
+                vacancies = SCALES[options['scale']]['vacancies']
+                self.report(title, self.run_workers(
+                    partial(read_pages, vacancies), partial(write_application, vacancies, bench_user.id), options
+                ))
+                if write_behind:
+                    self.stdout.write(f'  из журнала после замера: {application_journal.flush(blocking=True)}')
+                    connection.close()
+
+    def run_workers(self, read, write, options):
+        stop = threading.Event()
+        readers = [Worker(read, stop) for _ in range(options['readers'])]
+        writers = [Worker(write, stop) for _ in range(options['writers'])]
+        for worker in readers + writers:
+            worker.start()
+        time.sleep(options['duration'])
+        stop.set()
+        for worker in readers + writers:
+            worker.join()
+        return {'readers': readers, 'writers': writers, 'duration': options['duration']}
+
+    def report(self, title, result):
+        self.stdout.write(f'{title}:')
+        for kind in ('readers', 'writers'):
+            latencies = [latency for worker in result[kind] for latency in worker.latencies]
+            errors = sum(worker.errors for worker in result[kind])
+            line = f'  {kind:8} {len(latencies) / result["duration"]:8.0f} оп/с'
+            if latencies:
+                line += (f', p50 {percentile(latencies, 0.5) * 1000:7.2f} мс'
+                         f', p99 {percentile(latencies, 0.99) * 1000:7.2f} мс')
+            self.stdout.write(f'{line}, ошибок блокировки {errors}')
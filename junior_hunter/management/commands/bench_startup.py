@@ -0,0 +1,61 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+DEFAULT_PATHS = ['/', '/vacancies/', '/all_company/']
+
+# Выполняется в новом интерпретаторе, чтобы замерить холодный старт.
+# Cookie сессии ведет запросы мимо кэша ответов: замеряется рендер, а не чтение готовой страницы
+CHILD_SCRIPT = '''
+import json, sys, time
+started = time.monotonic()
+from developer_hunter.wsgi import application
+report = {"import": time.monotonic() - started}
+if sys.argv[1] == "1":
+    from junior_hunter.warmup import open_connections, warmup
+    report.update({"warmup": sum(warmup().values())})
+    # Как воркер gunicorn после fork (developer_hunter/gunicorn_wsgi.py)
+    started = time.monotonic()
+    open_connections()
+    report["connections"] = time.monotonic() - started
+from django.test import RequestFactory
+factory = RequestFactory()
+factory.cookies["sessionid"] = "bench-startup"
+for number, path in enumerate(sys.argv[2:] * 2):
+    started = time.monotonic()
+    status = application.get_response(factory.get(path)).status_code
+    if status != 200:
+        sys.exit(f"{path}: ответ {status}")
+    report[("first " if number < len(sys.argv) - 2 else "second ") + path] = time.monotonic() - started
+print(json.dumps(report))
+'''
+
+
+class Command(BaseCommand):
+    help = 'Замеряет холодный старт процесса: загрузку Django, прогрев и первые запросы с прогревом и без'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='*', default=DEFAULT_PATHS)
+        parser.add_argument('--runs', type=int, default=3, help='Запусков процесса на каждый режим')
+
+    def handle(self, *args, **options):
+        for warm in (False, True):
+            reports = [self.run_child(warm, options['paths']) for _ in range(options['runs'])]
+            self.stdout.write('С прогревом:' if warm else 'Без прогрева:')
+            for name in reports[0]:
+                median = statistics.median(report[name] for report in reports)
+                self.stdout.write(f'  {name}: {median * 1000:.0f} мс')
+
+    def run_child(self, warm, paths):
+        result = subprocess.run(
+            [sys.executable, '-c', CHILD_SCRIPT, '1' if warm else '0', *paths],
+            cwd=settings.BASE_DIR, env=os.environ.copy(), capture_output=True, text=True
+        )
+        if result.returncode:
+            raise CommandError(result.stderr.strip())
+        return json.loads(result.stdout.strip().splitlines()[-1])
@@ -0,0 +1,39 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from junior_hunter.images import build_derivatives
+from junior_hunter.models import Company, Specialty
+
+
+class Command(BaseCommand):
+    help = 'Создает уменьшенные копии логотипов компаний и картинок специальностей'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Пересоздать уже существующие копии')
+        parser.add_argument('--workers', type=int, default=4)
+
+    def handle(self, *args, **options):
+        jobs = [
+            (company.logo, 'company_logo', f'company:{company.id}')
+            for company in Company.objects.only('id', 'logo', 'logo_digest')
+        ] + [
+            (specialty.picture, 'specialty_picture', f'specialty:{specialty.code}')
+            for specialty in Specialty.objects.only('id', 'code', 'picture', 'picture_digest')
+        ]
+        jobs = [job for job in jobs if job[0]]
+
+        def process(job):
+            image, preset, tag = job
+            try:
+                return build_derivatives(image, preset, tag, force=options['force'])
+            except (OSError, ValueError) as error:
+                self.stderr.write(f'{image.name}: {error}')
+                return False
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            created = sum(executor.map(process, jobs))
+        self.stdout.write(self.style.SUCCESS(f'Обработано картинок: {len(jobs)}, создано копий для {created}'))
@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from junior_hunter.static_export import SiteExport
+
+
+class Command(BaseCommand):
+    help = ('Выгружает публичные страницы в статические HTML-файлы STATIC_EXPORT_DIR. '
+            'Первый запуск выгружает все страницы, следующие - только изменившиеся с прошлой выгрузки')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=settings.STATIC_EXPORT_DIR)
+        parser.add_argument('--processes', type=int, default=None, help='По умолчанию - число ядер')
+        parser.add_argument('--full', action='store_true', help='Выгрузить все страницы заново')
+
+    def handle(self, *args, **options):
+        export = SiteExport(options['output'], processes=options['processes'], full=options['full'])
+        exported, removed, full, failed = export.run()
+        kind = 'Полная выгрузка' if full else 'Выгрузка изменений'
+        self.stdout.write(f'{kind}: страниц {exported}, удалено {removed}')
+        if failed:
+            raise CommandError(f'Не выгружено страниц: {len(failed)}, например {failed[0][0]} (ответ {failed[0][1]})')
+        self.stdout.write(self.style.SUCCESS(f'Страницы в {options["output"]}'))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from junior_hunter.application_journal import flush
+
+
+class Command(BaseCommand):
+    help = ('Записывает в базу отклики из журнала APPLICATION_JOURNAL_DIR, '
+            'например перед остановкой сайта или после выключения APPLICATION_WRITE_BEHIND')
+
+    def handle(self, *args, **options):
+        total = flush(blocking=True)
+        self.stdout.write(self.style.SUCCESS(f'Обработано откликов из журнала: {total}'))
@@ -0,0 +1,51 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from junior_hunter.feeds import FeedImporter, read_rows
+
+
+class Command(BaseCommand):
+    help = ('Потоковый импорт компаний или вакансий из CSV/JSONL. '
+            'Колонки вакансий: title, specialty (код), company (название), skills, description, '
+            'salary_min, salary_max. Колонки компаний: name, location, description, employee_count, logo')
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=['companies', 'vacancies'])
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='По умолчанию - по расширению файла')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Строк в одной транзакции')
+        parser.add_argument('--upsert', action='store_true',
+                            help='Обновлять существующие записи: компании по названию, вакансии по компании и названию')
+        parser.add_argument('--owner', help='Имя пользователя - владельца импортируемых компаний')
+        parser.add_argument('--show-errors', type=int, default=20, help='Сколько ошибок вывести')
+
+    def handle(self, *args, **options):
+        owner = None
+        if options['kind'] == 'companies':
+            if not options['owner']:
+                raise CommandError('Для импорта компаний нужен --owner')
+            owner = User.objects.filter(username=options['owner']).first()
+            if not owner:
+                raise CommandError(f'Нет пользователя {options["owner"]}')
+
+        importer = FeedImporter(batch_size=options['batch_size'], upsert=options['upsert'], owner=owner)
+        rows = read_rows(options['path'], options['format'])
+        started = time.perf_counter()
+        try:
+            if options['kind'] == 'companies':
+                importer.import_companies(rows)
+            else:
+                importer.import_vacancies(rows)
+        except (OSError, ValueError) as error:
+            raise CommandError(error)
+        elapsed = time.perf_counter() - started
+
+        for line_number, errors in importer.errors[:options['show_errors']]:
+            self.stderr.write(f'Строка {line_number}: {"; ".join(errors)}')
+        processed = importer.created + importer.updated + len(importer.errors)
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано: {importer.created}, обновлено: {importer.updated}, ошибок: {len(importer.errors)}. '
+            f'{processed / elapsed if elapsed else processed:.0f} строк/с'
+        ))
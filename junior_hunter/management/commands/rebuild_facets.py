@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from junior_hunter.facets import rebuild_facet_counts
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает таблицу количеств вакансий для фильтров (VacancyFacet)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        total = rebuild_facet_counts(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Строк фасетов: {total}'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from junior_hunter.skills import rebuild_skill_index
+
+
+class Command(BaseCommand):
+    help = 'Заполняет индекс навыков (Skill, VacancySkill) заново из поля Vacancy.skills'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        total = rebuild_skill_index(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Пар навык - вакансия: {total}'))
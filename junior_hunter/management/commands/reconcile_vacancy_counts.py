@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from junior_hunter.counters import reconcile_vacancy_counts
+
+
+class Command(BaseCommand):
+    help = 'Сверяет счетчики вакансий у специальностей и компаний с фактическим количеством'
+
+    def handle(self, *args, **options):
+        fixed = reconcile_vacancy_counts()
+        self.stdout.write(self.style.SUCCESS(f'Исправлено счетчиков: {fixed}'))
@@ -0,0 +1,227 @@
+import re
+import threading
+import time
+from collections import defaultdict
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Max
+
+from junior_hunter.models import Vacancy, VacancyChange
+
+TOKEN_RE = re.compile(r'\w[\w+#]*')
+
+# Веса составляющих оценки: специальность, зарплата, навыки
+SPECIALTY_WEIGHT = 3.0
+SALARY_WEIGHT = 1.0
+SKILLS_WEIGHT = 2.0
+
+# Если за раз изменено больше вакансий, в журнал пишется одна метка полной перезагрузки
+BULK_RELOAD_THRESHOLD = 1000
+
+VACANCY_COLUMNS = ('id', 'speciality_id', 'salary_min', 'salary_max', 'skills')
+
+
+def tokenize(text):
+    """Навыки в нижнем регистре: 'Python, C#, Django REST' -> {'python', 'c#', 'django', 'rest'}."""
+    return set(TOKEN_RE.findall(text.casefold()))
+
+
+def salary_fit(salary_min, salary_max, salary):
+    """Насколько вилки [salary_min, salary_max] покрывают ожидания salary: среднее min(x / salary, 1)
+    по всем суммам x вилки. Вилка целиком не ниже ожиданий - 1, целиком ниже - доля ее середины,
+    частично - доля вилки выше ожиданий плюс вклад нижней части. Вилка из одной суммы - min(x / salary, 1)."""
+    salary = np.float32(salary)
+    width = salary_max - salary_min
+    low = np.minimum(salary_min, salary)
+    high = np.minimum(salary_max, salary)
+    # Интеграл min(x / salary, 1) по вилке: часть ниже ожиданий и часть не ниже
+    below = (high * high - low * low) / (2 * salary)
+    above = np.maximum(salary_max, salary) - np.maximum(salary_min, salary)
+    covered = below + above
+    point = np.minimum(salary_max / salary, 1.0)
+    return np.where(width > 0, covered / np.where(width > 0, width, 1), point).astype(np.float32)
+
+
+def record_vacancy_changes(vacancy_ids):
+    """Записывает измененные (созданные, удаленные) вакансии в журнал.
+    Запись идет в той же транзакции, что и изменение, поэтому движок не увидит изменение раньше коммита."""
+    vacancy_ids = list(vacancy_ids)
+    if not vacancy_ids:
+        return
+    if len(vacancy_ids) > BULK_RELOAD_THRESHOLD:
+        VacancyChange.objects.create(vacancy_id=None)
+    else:
+        VacancyChange.objects.bulk_create([VacancyChange(vacancy_id=pk) for pk in vacancy_ids])
+    last_id = VacancyChange.objects.aggregate(last_id=Max('id'))['last_id']
+    VacancyChange.objects.filter(id__lte=last_id - settings.MATCHING_JOURNAL_SIZE).delete()
+
+
+class Snapshot:
+    """Вакансии в виде массивов NumPy: строка массива - одна версия вакансии.
+    Специальности и навыки хранятся инвертированными индексами: значение -> номера строк,
+    так оценка прибавляется только к подходящим строкам, а не сравнивается по всему массиву.
+    Снимок не меняется после создания, изменения дают новый снимок,
+    поэтому запросы из разных потоков читают его без блокировок."""
+
+    def __init__(self, ids, salary_min, salary_max, active, by_speciality, postings, watermark):
+        self.ids = ids
+        self.salary_min = salary_min
+        self.salary_max = salary_max
+        self.active = active
+        self.by_speciality = by_speciality
+        self.postings = postings
+        self.watermark = watermark
+
+    @classmethod
+    def build(cls, rows, watermark, start=0):
+        """rows - кортежи (id, speciality_id, salary_min, salary_max, skills). Номера строк начинаются со start."""
+        ids, salary_min, salary_max = [], [], []
+        by_speciality = defaultdict(list)
+        postings = defaultdict(list)
+        for row_number, (pk, speciality_id, low, high, skills) in enumerate(rows, start=start):
+            ids.append(pk)
+            salary_min.append(low)
+            salary_max.append(high)
+            by_speciality[speciality_id].append(row_number)
+            for token in tokenize(skills):
+                postings[token].append(row_number)
+        return cls(
+            np.array(ids, dtype=np.int32),
+            np.array(salary_min, dtype=np.float32),
+            np.array(salary_max, dtype=np.float32),
+            np.ones(len(ids), dtype=bool),
+            {key: np.array(rows, dtype=np.int32) for key, rows in by_speciality.items()},
+            {key: np.array(rows, dtype=np.int32) for key, rows in postings.items()},
+            watermark
+        )
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def inactive_count(self):
+        return len(self.ids) - int(np.count_nonzero(self.active))
+
+    def with_changes(self, stale_rows, rows, watermark):
+        """Новый снимок: строки stale_rows выключены, rows дописаны в конец."""
+        added = Snapshot.build(rows, watermark, start=len(self))
+        active = np.concatenate([self.active, added.active])
+        active[stale_rows] = False
+        return Snapshot(
+            np.concatenate([self.ids, added.ids]),
+            np.concatenate([self.salary_min, added.salary_min]),
+            np.concatenate([self.salary_max, added.salary_max]),
+            active,
+            merge_postings(self.by_speciality, added.by_speciality),
+            merge_postings(self.postings, added.postings),
+            watermark
+        )
+
+    def score(self, speciality_id, salary, tokens):
+        """Оценка всех вакансий за один векторный проход."""
+        if salary > 0:
+            scores = salary_fit(self.salary_min, self.salary_max, salary)
+            scores *= SALARY_WEIGHT
+        else:
+            scores = np.zeros(len(self), dtype=np.float32)
+        if speciality_id in self.by_speciality:
+            scores[self.by_speciality[speciality_id]] += SPECIALTY_WEIGHT
+        tokens = [token for token in tokens if token in self.postings]
+        for token in tokens:
+            # В списке токена номера строк не повторяются, поэтому += через индексы корректно
+            scores[self.postings[token]] += np.float32(SKILLS_WEIGHT / len(tokens))
+        scores[~self.active] = -np.inf
+        return scores
+
+    def top(self, scores, limit):
+        limit = min(limit, int(np.count_nonzero(self.active)))
+        if limit <= 0:
+            return []
+        best = np.argpartition(scores, -limit)[-limit:]
+        best = best[np.argsort(-scores[best], kind='stable')]
+        return [(int(self.ids[row]), float(scores[row])) for row in best]
+
+
+def merge_postings(postings, added):
+    merged = dict(postings)
+    for key, rows in added.items():
+        merged[key] = np.concatenate([merged[key], rows]) if key in merged else rows
+    return merged
+
+
+class MatchingEngine:
+    """Снимок вакансий, общий для всех запросов процесса.
+    Не чаще раза в MATCHING_REFRESH_INTERVAL секунд читает журнал VacancyChange
+    и догружает только измененные вакансии. Полная перезагрузка - при первом обращении,
+    по метке в журнале и когда выключенных строк становится больше MATCHING_COMPACT_RATIO."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.snapshot = None
+        self.checked_at = 0.0
+        # id вакансии -> номер ее текущей строки в снимке, меняется только под блокировкой
+        self.rows = {}
+
+    def get_snapshot(self):
+        if self.snapshot is None or time.monotonic() - self.checked_at >= settings.MATCHING_REFRESH_INTERVAL:
+            with self.lock:
+                if self.snapshot is None or time.monotonic() - self.checked_at >= settings.MATCHING_REFRESH_INTERVAL:
+                    self.snapshot = self.refresh(self.snapshot)
+                    self.checked_at = time.monotonic()
+        return self.snapshot
+
+    def reload(self):
+        """Полная перезагрузка снимка, например для прогрева процесса до первого запроса."""
+        with self.lock:
+            self.snapshot = self.load()
+            self.checked_at = time.monotonic()
+        return self.snapshot
+
+    def load(self):
+        watermark = VacancyChange.objects.aggregate(last_id=Max('id'))['last_id'] or 0
+        rows = Vacancy.objects.values_list(*VACANCY_COLUMNS).order_by('id').iterator(chunk_size=10000)
+        snapshot = Snapshot.build(rows, watermark)
+        self.rows = {int(pk): row for row, pk in enumerate(snapshot.ids)}
+        return snapshot
+
+    def refresh(self, snapshot):
+        if snapshot is None:
+            return self.load()
+        changes = list(
+            VacancyChange.objects.filter(id__gt=snapshot.watermark).order_by('id').values_list('id', 'vacancy_id')
+        )
+        if not changes:
+            return snapshot
+        first_kept = VacancyChange.objects.order_by('id').values_list('id', flat=True).first()
+        changed_ids = {vacancy_id for _, vacancy_id in changes}
+        if (
+            None in changed_ids
+            # Журнал обрезан дальше, чем мы прочитали
+            or first_kept > snapshot.watermark + 1
+            or snapshot.inactive_count + len(changed_ids) > settings.MATCHING_COMPACT_RATIO * max(len(snapshot), 1)
+        ):
+            return self.load()
+
+        stale_rows = [self.rows.pop(pk) for pk in changed_ids if pk in self.rows]
+        rows = list(Vacancy.objects.filter(id__in=changed_ids).values_list(*VACANCY_COLUMNS).order_by('id'))
+        updated = snapshot.with_changes(stale_rows, rows, changes[-1][0])
+        for row, (pk, *_) in enumerate(rows, start=len(snapshot)):
+            self.rows[pk] = row
+        return updated
+
+    def recommend(self, resume, limit):
+        """Лучшие limit вакансий для резюме: список пар (id вакансии, оценка)."""
+        snapshot = self.get_snapshot()
+        scores = snapshot.score(resume.specialty_id, resume.salary, tokenize(resume.experience))
+        return snapshot.top(scores, limit)
+
+
+engine = MatchingEngine()
+
+
+def recommend_vacancies(resume, limit=None):
+    """Рекомендованные вакансии для резюме, лучшие первыми."""
+    ranked = engine.recommend(resume, limit or settings.MATCHING_TOP_N)
+    vacancies = Vacancy.objects.select_related('company').in_bulk([pk for pk, _ in ranked])
+    return [vacancies[pk] for pk, _ in ranked if pk in vacancies]
@@ -0,0 +1,137 @@
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+from junior_hunter.images import DERIVATIVES_DIR
+
+# Уменьшенные копии с хэшем содержимого в имени (logo-2x.3f2a9c1b0d4e.webp, junior_hunter/images.py)
+# не меняются: новая картинка получает новое имя, поэтому их можно кэшировать навсегда
+HASHED_NAME_RE = re.compile(r'\.[0-9a-f]{8,}\.\w+$')
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+SENDFILE_HEADERS = {
+    'x-accel-redirect': 'X-Accel-Redirect',
+    'x-sendfile': 'X-Sendfile',
+}
+
+
+class FileRange:
+    """Файл, из которого читается только диапазон байт [start, start + length)."""
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.remaining = length
+        file.seek(start)
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """Разбирает заголовок Range с одним диапазоном.
+    Возвращает (start, end) включительно, None если заголовка нет или он не поддерживается,
+    и False, если диапазон не пересекается с файлом."""
+    match = RANGE_RE.match(header.strip()) if header else None
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    else:
+        # bytes=-500 - последние 500 байт
+        start = max(size - int(last), 0)
+        end = size - 1
+    if start > end or start >= size:
+        return False
+    return start, end
+
+
+def cache_control(path):
+    if path.startswith(f'{DERIVATIVES_DIR}/') and HASHED_NAME_RE.search(path):
+        return 'public, max-age=31536000, immutable'
+    return f'public, max-age={settings.MEDIA_CACHE_MAX_AGE}'
+
+
+@require_safe
+def serve_media(request, path):
+    """Отдает загруженные файлы в production.
+    Поддерживает 304 по ETag/Last-Modified, запросы диапазонов и,
+    при MEDIA_SENDFILE_MODE, передачу отдачи файла nginx/apache."""
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404('Файл не найден')
+    try:
+        stat = os.stat(full_path)
+    except OSError:
+        raise Http404('Файл не найден')
+    if not os.path.isfile(full_path):
+        raise Http404('Файл не найден')
+
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    content_type, encoding = mimetypes.guess_type(full_path)
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(stat.st_mtime),
+        'Cache-Control': cache_control(path),
+        'Accept-Ranges': 'bytes',
+    }
+
+    base = HttpResponse()
+    for name, value in headers.items():
+        base[name] = value
+    conditional = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime), response=base)
+    if conditional is not base:
+        return conditional
+
+    mode = settings.MEDIA_SENDFILE_MODE
+    if mode:
+        # Файл отдаст фронтенд-сервер, он же обработает Range
+        response = HttpResponse(content_type=content_type or 'application/octet-stream')
+        if mode == 'x-accel-redirect':
+            response[SENDFILE_HEADERS[mode]] = settings.MEDIA_SENDFILE_PREFIX + path
+        else:
+            response[SENDFILE_HEADERS[mode]] = os.path.abspath(full_path)
+    else:
+        byte_range = parse_range(request.META.get('HTTP_RANGE'), stat.st_size)
+        if_range = request.META.get('HTTP_IF_RANGE')
+        if (byte_range is not None and if_range and if_range != etag
+                and parse_http_date_safe(if_range) != int(stat.st_mtime)):
+            # Файл изменился с момента первого запроса - Range не действует, отдаем целиком
+            byte_range = None
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{stat.st_size}'
+            return response
+        if byte_range:
+            start, end = byte_range
+            response = FileResponse(FileRange(open(full_path, 'rb'), start, end - start + 1), status=206)
+            response['Content-Length'] = end - start + 1
+            response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+        else:
+            # Целый файл: сервер может отдать его через wsgi.file_wrapper/sendfile
+            response = FileResponse(open(full_path, 'rb'))
+        response['Content-Type'] = content_type or 'application/octet-stream'
+    if encoding:
+        response['Content-Encoding'] = encoding
+    for name, value in headers.items():
+        response[name] = value
+    return response
@@ -0,0 +1,298 @@
+import asyncio
+import atexit
+import glob
+import json
+import logging
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse
+from django.template.backends.django import Template
+
+logger = logging.getLogger(__name__)
+
+# Границы корзин гистограмм, секунды
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HISTOGRAMS = {
+    'request': ('developer_hunter_request_duration_seconds', 'Полное время обработки запроса'),
+    'db': ('developer_hunter_db_duration_seconds', 'Суммарное время SQL-запросов за запрос'),
+    'template': ('developer_hunter_template_duration_seconds', 'Время рендера шаблонов за запрос'),
+}
+QUERIES_METRIC = ('developer_hunter_db_queries_total', 'Количество SQL-запросов')
+
+# metrics-<pid>-<время старта процесса, нс>.json: номер процесса может достаться новому процессу
+SNAPSHOT_RE = re.compile(r'metrics-(\d+)(?:-(\d+))?\.json$')
+
+# Статистика текущего запроса. ContextVar, а не threading.local:
+# так она видна и из потоков пула асинхронных представлений
+_current = ContextVar('request_stats', default=None)
+
+
+class RequestStats:
+    __slots__ = ('queries', 'db_time', 'template_time')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+
+
+def _query_wrapper(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.db_time += time.perf_counter() - started
+        stats.queries += 1
+
+
+def _install_query_wrapper(sender, connection, **kwargs):
+    if _query_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_query_wrapper)
+
+
+def _instrument_templates():
+    original_render = Template.render
+    if getattr(original_render, 'instrumented', False):
+        return
+
+    def render(self, context=None, request=None):
+        stats = _current.get()
+        if stats is None:
+            return original_render(self, context, request)
+        started = time.perf_counter()
+        try:
+            return original_render(self, context, request)
+        finally:
+            stats.template_time += time.perf_counter() - started
+
+    render.instrumented = True
+    Template.render = render
+
+
+class Registry:
+    """Гистограммы по имени маршрута в памяти процесса.
+    Раз в METRICS_FLUSH_INTERVAL секунд снимок пишется в METRICS_DIR/metrics-<pid>-<старт>.json,
+    эндпоинт метрик суммирует файлы всех воркеров. При выходе процесса файл удаляется."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.data = {}
+        self.flushed_at = 0.0
+        self.pid = None
+        self.started = None
+
+    def snapshot_path(self):
+        # После fork у воркера свой файл: данные мастера до fork не копятся
+        if self.pid != os.getpid():
+            self.pid = os.getpid()
+            self.started = time.time_ns()
+            atexit.register(self.remove_snapshot)
+        return os.path.join(settings.METRICS_DIR, f'metrics-{self.pid}-{self.started}.json')
+
+    def remove_snapshot(self):
+        # Обработчики atexit наследуются через fork: удаляется только файл своего процесса
+        if self.pid == os.getpid():
+            remove_file(os.path.join(settings.METRICS_DIR, f'metrics-{self.pid}-{self.started}.json'))
+
+    def observe(self, url_name, durations, queries):
+        with self.lock:
+            route = self.data.setdefault(url_name, {
+                'histograms': {key: {'buckets': [0] * (len(BUCKETS) + 1), 'sum': 0.0} for key in HISTOGRAMS},
+                'queries': 0,
+            })
+            for key, value in durations.items():
+                histogram = route['histograms'][key]
+                histogram['buckets'][bisect_left(BUCKETS, value)] += 1
+                histogram['sum'] += value
+            route['queries'] += queries
+
+    def snapshot(self):
+        with self.lock:
+            return json.loads(json.dumps(self.data))
+
+    def flush(self, force=False):
+        """Пишет снимок не чаще раза в METRICS_FLUSH_INTERVAL секунд. Пока снимок пишет другой поток,
+        запрос не ждет его. Ошибка записи только попадает в лог: метрики не должны ронять запрос."""
+        if not self.flush_lock.acquire(blocking=force):
+            return
+        try:
+            now = time.monotonic()
+            if not force and now - self.flushed_at < settings.METRICS_FLUSH_INTERVAL:
+                return
+            self.flushed_at = now
+            os.makedirs(settings.METRICS_DIR, exist_ok=True)
+            path = self.snapshot_path()
+            temporary = f'{path}.{threading.get_ident()}.tmp'
+            with open(temporary, 'w') as snapshot_file:
+                json.dump(self.snapshot(), snapshot_file)
+            os.replace(temporary, path)
+        except OSError:
+            logger.exception('Не удалось записать снимок метрик')
+        finally:
+            self.flush_lock.release()
+
+
+registry = Registry()
+
+
+def remove_file(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def live_snapshots():
+    """Файлы снимков работающих процессов. Снимки завершившихся процессов (убитых без atexit)
+    и прежних процессов с тем же pid удаляются, иначе их счетчики суммировались бы вечно."""
+    latest = {}
+    for path in glob.glob(os.path.join(settings.METRICS_DIR, 'metrics-*.json')):
+        match = SNAPSHOT_RE.search(path)
+        if not match:
+            continue
+        pid, started = int(match.group(1)), int(match.group(2) or 0)
+        if not process_alive(pid):
+            remove_file(path)
+            continue
+        if pid in latest:
+            older, newer = sorted([latest[pid], (started, path)])
+            remove_file(older[1])
+            latest[pid] = newer
+        else:
+            latest[pid] = (started, path)
+    return [path for _, path in latest.values()]
+
+
+class RequestMetricsMiddleware:
+    """Считает для каждого запроса число SQL-запросов, время SQL, рендера шаблонов и общее время.
+    Отдает их в заголовке Server-Timing и копит гистограммы по имени маршрута.
+    Умеет работать и синхронно, и асинхронно: под ASGI синхронное middleware первым в цепочке
+    выполняло бы все запросы процесса по одному в потоке thread_sensitive."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = asyncio.iscoroutinefunction(get_response)
+        if self.is_async:
+            # Django проверяет это свойство, чтобы вызывать middleware через await
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+        # Соединения других потоков получат обертку при подключении
+        connection_created.connect(_install_query_wrapper, dispatch_uid='request_metrics')
+        for connection in connections.all():
+            _install_query_wrapper(None, connection)
+        _instrument_templates()
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, stats, started)
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, stats, started)
+
+    def finish(self, request, response, stats, started):
+        total = time.perf_counter() - started
+        response['Server-Timing'] = (
+            f'db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} queries", '
+            f'tpl;dur={stats.template_time * 1000:.1f}, '
+            f'total;dur={total * 1000:.1f}'
+        )
+        match = request.resolver_match
+        url_name = (match.url_name if match else None) or 'unresolved'
+        registry.observe(
+            url_name,
+            {'request': total, 'db': stats.db_time, 'template': stats.template_time},
+            stats.queries
+        )
+        registry.flush()
+        return response
+
+
+def merged_snapshots():
+    registry.flush(force=True)
+    merged = {}
+    for path in live_snapshots():
+        try:
+            with open(path) as snapshot_file:
+                snapshot = json.load(snapshot_file)
+        except (OSError, ValueError):
+            continue
+        for url_name, route in snapshot.items():
+            target = merged.setdefault(url_name, {
+                'histograms': {key: {'buckets': [0] * (len(BUCKETS) + 1), 'sum': 0.0} for key in HISTOGRAMS},
+                'queries': 0,
+            })
+            for key, histogram in route['histograms'].items():
+                target['histograms'][key]['buckets'] = [
+                    a + b for a, b in zip(target['histograms'][key]['buckets'], histogram['buckets'])
+                ]
+                target['histograms'][key]['sum'] += histogram['sum']
+            target['queries'] += route['queries']
+    return merged
+
+
+def render_prometheus(data):
+    lines = []
+    for key, (metric, description) in HISTOGRAMS.items():
+        lines.append(f'# HELP {metric} {description}')
+        lines.append(f'# TYPE {metric} histogram')
+        for url_name, route in sorted(data.items()):
+            histogram = route['histograms'][key]
+            cumulative = 0
+            for bound, count in zip(BUCKETS + ('+Inf',), histogram['buckets']):
+                cumulative += count
+                lines.append(f'{metric}_bucket{{view="{url_name}",le="{bound}"}} {cumulative}')
+            lines.append(f'{metric}_sum{{view="{url_name}"}} {histogram["sum"]:.6f}')
+            lines.append(f'{metric}_count{{view="{url_name}"}} {cumulative}')
+    metric, description = QUERIES_METRIC
+    lines.append(f'# HELP {metric} {description}')
+    lines.append(f'# TYPE {metric} counter')
+    for url_name, route in sorted(data.items()):
+        lines.append(f'{metric}{{view="{url_name}"}} {route["queries"]}')
+    return '\n'.join(lines) + '\n'
+
+
+@staff_member_required
+def metrics(request):
+    """Метрики всех воркеров в текстовом формате Prometheus. Только для сотрудников."""
+    return HttpResponse(render_prometheus(merged_snapshots()), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,30 @@
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_vacancy_counts(apps, schema_editor):
+    for model_name in ('Specialty', 'Company'):
+        model = apps.get_model('junior_hunter', model_name)
+        for pk, actual in model.objects.annotate(actual=Count('vacancies')).values_list('id', 'actual'):
+            model.objects.filter(id=pk).update(vacancy_count=actual)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('junior_hunter', '0002_vacancy_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='company',
+            name='vacancy_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество вакансий'),
+        ),
+        migrations.AddField(
+            model_name='specialty',
+            name='vacancy_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество вакансий'),
+        ),
+        migrations.RunPython(fill_vacancy_counts, migrations.RunPython.noop),
+    ]
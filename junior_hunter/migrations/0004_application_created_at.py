@@ -0,0 +1,20 @@
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('junior_hunter', '0003_vacancy_counts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='application',
+            name='created_at',
+            field=models.DateTimeField(
+                auto_now_add=True, default=django.utils.timezone.now, verbose_name='Дата отклика'
+            ),
+            preserve_default=False,
+        ),
+    ]
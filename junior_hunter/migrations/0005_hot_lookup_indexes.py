@@ -0,0 +1,75 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Одиночные индексы внешних ключей, которые покрываются составными индексами.
+# Имена те, что Django дал им в 0001_initial. Удаляем их через RunSQL: AlterField(db_index=False)
+# в SQLite пересобирает таблицу вакансий целиком
+COVERED_FOREIGN_KEY_INDEXES = [
+    ('junior_hunter_vacancy_speciality_id_8578a5d8', 'junior_hunter_vacancy', 'speciality_id'),
+    ('junior_hunter_vacancy_company_id_197884bb', 'junior_hunter_vacancy', 'company_id'),
+    ('junior_hunter_application_vacancy_id_51136ac4', 'junior_hunter_application', 'vacancy_id'),
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('junior_hunter', '0004_application_created_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='specialty',
+            name='code',
+            field=models.CharField(db_index=True, max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='application',
+            index=models.Index(fields=['vacancy', 'created_at'], name='application_vacancy_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vacancy',
+            index=models.Index(fields=['published_at', 'id'], name='vacancy_published_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vacancy',
+            index=models.Index(fields=['speciality', 'published_at', 'id'], name='vacancy_speciality_pub_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vacancy',
+            index=models.Index(fields=['company', 'published_at', 'id'], name='vacancy_company_pub_idx'),
+        ),
+        migrations.RunSQL(
+            sql=[f'DROP INDEX IF EXISTS "{name}"' for name, _, _ in COVERED_FOREIGN_KEY_INDEXES],
+            reverse_sql=[
+                f'CREATE INDEX "{name}" ON "{table}" ("{column}")'
+                for name, table, column in COVERED_FOREIGN_KEY_INDEXES
+            ],
+            state_operations=[
+                migrations.AlterField(
+                    model_name='application',
+                    name='vacancy',
+                    field=models.ForeignKey(
+                        db_index=False, on_delete=django.db.models.deletion.CASCADE,
+                        related_name='applications', to='junior_hunter.vacancy'
+                    ),
+                ),
+                migrations.AlterField(
+                    model_name='vacancy',
+                    name='company',
+                    field=models.ForeignKey(
+                        db_index=False, on_delete=django.db.models.deletion.CASCADE,
+                        related_name='vacancies', to='junior_hunter.company', verbose_name='Компания'
+                    ),
+                ),
+                migrations.AlterField(
+                    model_name='vacancy',
+                    name='speciality',
+                    field=models.ForeignKey(
+                        db_index=False, on_delete=django.db.models.deletion.CASCADE,
+                        related_name='vacancies', to='junior_hunter.specialty', verbose_name='Специальность'
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,57 @@
+from django.db import migrations, models
+from django.db.models import Case, Count, IntegerField, Value, When
+import django.db.models.deletion
+
+SALARY_BOUNDS = [50000, 100000, 150000, 200000]
+
+
+def fill_vacancy_facets(apps, schema_editor):
+    Vacancy = apps.get_model('junior_hunter', 'Vacancy')
+    VacancyFacet = apps.get_model('junior_hunter', 'VacancyFacet')
+    salary_bucket = Case(
+        *(When(salary_min__lt=bound, then=Value(bucket)) for bucket, bound in enumerate(SALARY_BOUNDS)),
+        default=Value(len(SALARY_BOUNDS)),
+        output_field=IntegerField()
+    )
+    groups = Vacancy.objects.annotate(salary_bucket=salary_bucket).values(
+        'speciality_id', 'company__location', 'salary_bucket', 'published_at'
+    ).annotate(vacancy_count=Count('id')).order_by()
+    VacancyFacet.objects.bulk_create([
+        VacancyFacet(
+            speciality_id=group['speciality_id'], location=group['company__location'],
+            salary_bucket=group['salary_bucket'], published_at=group['published_at'],
+            vacancy_count=group['vacancy_count']
+        )
+        for group in groups
+    ], batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('junior_hunter', '0005_hot_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VacancyFacet',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('location', models.CharField(max_length=50)),
+                ('salary_bucket', models.PositiveSmallIntegerField()),
+                ('published_at', models.DateField()),
+                ('vacancy_count', models.IntegerField(default=0)),
+                ('speciality', models.ForeignKey(
+                    db_index=False, on_delete=django.db.models.deletion.CASCADE,
+                    related_name='+', to='junior_hunter.specialty'
+                )),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='vacancyfacet',
+            constraint=models.UniqueConstraint(
+                fields=('speciality', 'location', 'salary_bucket', 'published_at'), name='vacancy_facet_unique'
+            ),
+        ),
+        migrations.RunPython(fill_vacancy_facets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('junior_hunter', '0006_vacancy_facets'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VacancyChange',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('vacancy_id', models.IntegerField(null=True)),
+            ],
+        ),
+    ]
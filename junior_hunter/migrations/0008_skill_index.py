@@ -0,0 +1,37 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('junior_hunter', '0007_vacancy_changes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Skill',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=64, unique=True, verbose_name='Навык')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='VacancySkill',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('skill', models.ForeignKey(
+                    db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+',
+                    to='junior_hunter.skill'
+                )),
+                ('vacancy', models.ForeignKey(
+                    on_delete=django.db.models.deletion.CASCADE, related_name='skill_links',
+                    to='junior_hunter.vacancy'
+                )),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='vacancyskill',
+            constraint=models.UniqueConstraint(fields=('skill', 'vacancy'), name='vacancy_skill_unique'),
+        ),
+    ]
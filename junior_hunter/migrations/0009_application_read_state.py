@@ -0,0 +1,26 @@
+from django.db import migrations, models
+
+
+def mark_existing_read(apps, schema_editor):
+    # До появления статуса работодатель видел все отклики списком, новыми считаются только следующие
+    apps.get_model('junior_hunter', 'Application').objects.update(is_read=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('junior_hunter', '0008_skill_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='application',
+            name='is_read',
+            field=models.BooleanField(default=False, verbose_name='Прочитан'),
+        ),
+        migrations.RunPython(mark_existing_read, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='application',
+            index=models.Index(fields=['vacancy', 'is_read', 'created_at'], name='application_vacancy_read_idx'),
+        ),
+    ]
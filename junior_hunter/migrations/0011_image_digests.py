@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('junior_hunter', '0010_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='company',
+            name='logo_digest',
+            field=models.CharField(blank=True, default='', editable=False, max_length=16),
+        ),
+        migrations.AddField(
+            model_name='specialty',
+            name='picture_digest',
+            field=models.CharField(blank=True, default='', editable=False, max_length=16),
+        ),
+    ]
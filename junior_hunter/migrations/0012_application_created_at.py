@@ -0,0 +1,17 @@
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('junior_hunter', '0011_image_digests'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='application',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False, verbose_name='Дата отклика'),
+        ),
+    ]
@@ -0,0 +1,79 @@
+import re
+
+from django.db import migrations
+
+# Копия разбора навыков из junior_hunter/skills.py на момент миграции
+SEPARATOR_RE = re.compile(r'[,;/|\n]+')
+SPACE_RE = re.compile(r'\s+')
+SKILL_ALIASES = {
+    'питон': 'python',
+    'python3': 'python',
+    'python 3': 'python',
+    'джанго': 'django',
+    'django rest framework': 'drf',
+    'js': 'javascript',
+    'java script': 'javascript',
+    'ts': 'typescript',
+    'postgres': 'postgresql',
+    'postgre': 'postgresql',
+    'psql': 'postgresql',
+    'k8s': 'kubernetes',
+    'golang': 'go',
+    'reactjs': 'react',
+    'react.js': 'react',
+    'vuejs': 'vue',
+    'vue.js': 'vue',
+    'nodejs': 'node.js',
+    'node': 'node.js',
+    'гит': 'git',
+    'rest api': 'rest',
+    'restful': 'rest',
+    'c sharp': 'c#',
+    'си шарп': 'c#',
+}
+SKILL_NAME_LENGTH = 64
+
+
+def parse_skills(text):
+    names = (SPACE_RE.sub(' ', name.casefold()).strip().rstrip('.') for name in SEPARATOR_RE.split(text))
+    return {SKILL_ALIASES.get(name, name)[:SKILL_NAME_LENGTH] for name in names if name}
+
+
+def fill_skill_index(apps, schema_editor, batch_size=2000):
+    """Индекс навыков для вакансий, созданных до 0008. Уже проиндексированные пары пропускаются."""
+    Vacancy = apps.get_model('junior_hunter', 'Vacancy')
+    Skill = apps.get_model('junior_hunter', 'Skill')
+    VacancySkill = apps.get_model('junior_hunter', 'VacancySkill')
+    rows = Vacancy.objects.values_list('id', 'skills').order_by('id').iterator(chunk_size=batch_size)
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            insert_postings(Skill, VacancySkill, batch)
+            batch = []
+    insert_postings(Skill, VacancySkill, batch)
+
+
+def insert_postings(Skill, VacancySkill, rows):
+    wanted = {pk: parse_skills(skills) for pk, skills in rows}
+    names = set().union(*wanted.values())
+    if not names:
+        return
+    Skill.objects.bulk_create([Skill(name=name) for name in names], ignore_conflicts=True)
+    ids = dict(Skill.objects.filter(name__in=names).values_list('name', 'id'))
+    VacancySkill.objects.bulk_create([
+        VacancySkill(skill_id=ids[name], vacancy_id=pk)
+        for pk, skill_names in wanted.items()
+        for name in skill_names
+    ], ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('junior_hunter', '0012_application_created_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_skill_index, migrations.RunPython.noop),
+    ]
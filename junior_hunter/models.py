@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 
 class Specialty(models.Model):
@@ -8,10 +9,29 @@ class Specialty(models.Model):
     )
     code = models.CharField(
         max_length=10,
+        db_index=True
     )
     picture = models.ImageField(
         upload_to='MEDIA_SPECIALITY_IMAGE_DIR'
     )
+    # Хэш содержимого картинки, под которым созданы ее уменьшенные копии (junior_hunter.images).
+    # Пусто, пока копий нет: тогда выводится оригинал
+    picture_digest = models.CharField(
+        max_length=16,
+        blank=True,
+        default='',
+        editable=False
+    )
+    vacancy_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество вакансий'
+    )
+    # Меняется и при изменении вакансий специальности (junior_hunter.counters), по нему отвечают 304
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Изменено'
+    )
 
     def __str__(self):
         return self.title
@@ -30,6 +50,13 @@ class Company(models.Model):
         upload_to='MEDIA_COMPANY_IMAGE_DIR',
         verbose_name='Логотип'
     )
+    # Хэш содержимого логотипа, под которым созданы его уменьшенные копии (junior_hunter.images)
+    logo_digest = models.CharField(
+        max_length=16,
+        blank=True,
+        default='',
+        editable=False
+    )
     description = models.TextField(
         verbose_name='Описание'
     )
@@ -41,6 +68,22 @@ class Company(models.Model):
         on_delete=models.CASCADE,
         related_name="company"
     )
+    vacancy_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество вакансий'
+    )
+    # Меняется и при изменении вакансий компании (junior_hunter.counters), по нему отвечают 304
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Изменено'
+    )
+
+    class Meta:
+        # Списки вакансий сравнивают MAX(updated_at) компаний: карточки выводят название и логотип
+        indexes = [
+            models.Index(fields=['updated_at'], name='company_updated_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -51,17 +94,20 @@ class Vacancy(models.Model):
         max_length=120,
         verbose_name='Название вакансии'
     )
+    # Отдельные индексы по внешним ключам не нужны: их покрывают составные индексы из Meta
     speciality = models.ForeignKey(
         Specialty,
         on_delete=models.CASCADE,
         related_name="vacancies",
-        verbose_name='Специальность'
+        verbose_name='Специальность',
+        db_index=False
     )
     company = models.ForeignKey(
         Company,
         on_delete=models.CASCADE,
         related_name="vacancies",
-        verbose_name='Компания'
+        verbose_name='Компания',
+        db_index=False
     )
     skills = models.TextField(
         verbose_name='Навыки'
@@ -79,11 +125,94 @@ class Vacancy(models.Model):
         auto_now_add=True,
         verbose_name='Дата'
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Изменено'
+    )
+
+    class Meta:
+        # Списки вакансий отсортированы по (published_at, id) и листаются курсором,
+        # поэтому id входит в индексы и сортировка не требует отдельного прохода
+        indexes = [
+            models.Index(fields=['published_at', 'id'], name='vacancy_published_idx'),
+            models.Index(fields=['speciality', 'published_at', 'id'], name='vacancy_speciality_pub_idx'),
+            models.Index(fields=['company', 'published_at', 'id'], name='vacancy_company_pub_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
 
+class VacancyFacet(models.Model):
+    """Предрасчитанное количество вакансий для фильтров страницы vacancy_filter:
+    одна строка на сочетание специальности, города компании, диапазона зарплаты и даты публикации.
+    Обновляется сигналами при изменении вакансий, полностью пересчитывается командой rebuild_facets"""
+    speciality = models.ForeignKey(
+        Specialty,
+        on_delete=models.CASCADE,
+        related_name='+',
+        db_index=False
+    )
+    location = models.CharField(
+        max_length=50
+    )
+    salary_bucket = models.PositiveSmallIntegerField()
+    published_at = models.DateField()
+    vacancy_count = models.IntegerField(
+        default=0
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['speciality', 'location', 'salary_bucket', 'published_at'],
+                name='vacancy_facet_unique'
+            ),
+        ]
+
+
+class Skill(models.Model):
+    """Навык в нормализованном виде (junior_hunter.skills.normalize_skill): 'postgresql', 'c#'"""
+    name = models.CharField(
+        max_length=64,
+        unique=True,
+        verbose_name='Навык'
+    )
+
+    def __str__(self):
+        return self.name
+
+
+class VacancySkill(models.Model):
+    """Инвертированный индекс навык -> вакансии, строится из Vacancy.skills.
+    Уникальный индекс (skill, vacancy) хранит вакансии каждого навыка по возрастанию id,
+    по нему пересекаются и объединяются списки при поиске по навыкам"""
+    skill = models.ForeignKey(
+        Skill,
+        on_delete=models.CASCADE,
+        related_name='+',
+        db_index=False
+    )
+    vacancy = models.ForeignKey(
+        Vacancy,
+        on_delete=models.CASCADE,
+        related_name='skill_links'
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['skill', 'vacancy'], name='vacancy_skill_unique'),
+        ]
+
+
+class VacancyChange(models.Model):
+    """Журнал изменений вакансий. По нему движок рекомендаций в каждом процессе
+    догружает только измененные вакансии. vacancy_id = None - метка полной перезагрузки"""
+    vacancy_id = models.IntegerField(
+        null=True
+    )
+
+
 class Application(models.Model):
     written_username = models.CharField(
         max_length=20
@@ -95,13 +224,33 @@ class Application(models.Model):
     vacancy = models.ForeignKey(
         Vacancy,
         on_delete=models.CASCADE,
-        related_name='applications'
+        related_name='applications',
+        db_index=False
     )
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
         related_name='applications'
     )
+    # Не auto_now_add: отклик из журнала (junior_hunter.application_journal) записывается в базу позже,
+    # а дата должна быть временем отправки
+    created_at = models.DateTimeField(
+        default=timezone.now,
+        editable=False,
+        verbose_name='Дата отклика'
+    )
+    is_read = models.BooleanField(
+        default=False,
+        verbose_name='Прочитан'
+    )
+
+    class Meta:
+        # Отклики выбираются по вакансии и фильтруются по дате.
+        # Второй индекс покрывает подсчет новых откликов по вакансиям и список только новых
+        indexes = [
+            models.Index(fields=['vacancy', 'created_at'], name='application_vacancy_date_idx'),
+            models.Index(fields=['vacancy', 'is_read', 'created_at'], name='application_vacancy_read_idx'),
+        ]
 
 
 class Resume(models.Model):
@@ -0,0 +1,63 @@
+from datetime import date, datetime
+
+from django.db.models import DateTimeField, Q
+
+
+class KeysetPage:
+    """Страница выдачи при пагинации по ключу (поле даты, id).
+    В отличие от OFFSET стоимость получения любой страницы одинакова."""
+
+    def __init__(self, object_list, next_cursor, cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.cursor = cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def is_first(self):
+        return self.cursor is None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def encode_cursor(obj, field='published_at'):
+    # obj - объект модели или словарь из values()
+    if isinstance(obj, dict):
+        return f'{obj[field].isoformat()}.{obj["id"]}'
+    return f'{getattr(obj, field).isoformat()}.{obj.id}'
+
+
+def decode_cursor(cursor, parse=date.fromisoformat):
+    """Курсор имеет вид '2020-07-12.15' (значение поля и id). Некорректный курсор - первая страница."""
+    if not cursor:
+        return None
+    try:
+        value, pk = cursor.rsplit('.', 1)
+        return parse(value), int(pk)
+    except ValueError:
+        return None
+
+
+def keyset_paginate(queryset, cursor, page_size, field='published_at'):
+    """Возвращает страницу после курсора: по убыванию field (DateField или DateTimeField),
+    при одинаковом значении - по убыванию id. По умолчанию - вакансии, новые первыми."""
+    queryset = queryset.order_by(f'-{field}', '-id')
+    is_datetime = isinstance(queryset.model._meta.get_field(field), DateTimeField)
+    position = decode_cursor(cursor, datetime.fromisoformat if is_datetime else date.fromisoformat)
+    if position:
+        value, pk = position
+        queryset = queryset.filter(Q(**{f'{field}__lt': value}) | Q(**{field: value, 'id__lt': pk}))
+    # Берем на одну запись больше, чтобы узнать, есть ли следующая страница
+    object_list = list(queryset[:page_size + 1])
+    next_cursor = None
+    if len(object_list) > page_size:
+        object_list = object_list[:page_size]
+        next_cursor = encode_cursor(object_list[-1], field)
+    return KeysetPage(object_list, next_cursor, cursor if position else None)
@@ -0,0 +1,126 @@
+import hashlib
+import uuid
+from datetime import date
+from functools import partial, wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse
+
+TAG_KEY = 'response-cache:tag:{}'
+ENTRY_KEY = 'response-cache:page:{}'
+# Меняется при каждом сбросе тегов. Ответ и фрагменты, которые рендерились во время сброса,
+# не сохраняются: они могли прочитать данные до коммита, а версии тегов - уже после
+GENERATION_KEY = 'response-cache:generation'
+
+
+def get_cache():
+    return caches[settings.RESPONSE_CACHE_ALIAS]
+
+
+def tag_response(response, *tags):
+    """Помечает ответ тегами данных, от которых он зависит, например company:3."""
+    response.cache_tags = getattr(response, 'cache_tags', set()) | set(tags)
+    return response
+
+
+def bump_tag_versions(tags):
+    """Выдает тегам новые версии. Ничего не нужно удалять, а другие воркеры
+    видят сброс сразу, если кэш общий (например, файловый)."""
+    tags = {tag for tag in tags if tag}
+    if tags:
+        cache = get_cache()
+        # Поколение раньше версий: кто увидел новые версии, увидит и новое поколение
+        cache.set(GENERATION_KEY, uuid.uuid4().hex, None)
+        cache.set_many({TAG_KEY.format(tag): uuid.uuid4().hex for tag in tags}, None)
+
+
+def invalidate_tags(*tags):
+    """Сбрасывает все закэшированные ответы, помеченные любым из тегов.
+    Сброс происходит после коммита, иначе параллельный запрос закэширует старые данные."""
+    transaction.on_commit(lambda: bump_tag_versions(tags))
+
+
+def current_tag_versions(tags, create_missing=False):
+    cache = get_cache()
+    keys = {TAG_KEY.format(tag): tag for tag in tags}
+    found = cache.get_many(keys)
+    versions = {keys[key]: version for key, version in found.items()}
+    if create_missing:
+        missing = {key: uuid.uuid4().hex for key in keys if key not in found}
+        if missing:
+            cache.set_many(missing, None)
+            versions.update({keys[key]: version for key, version in missing.items()})
+    return versions
+
+
+def cache_generation():
+    return get_cache().get(GENERATION_KEY)
+
+
+def request_generation(request):
+    """Поколение кэша на начало обработки запроса (его запоминает cache_response до вызова представления).
+    Сохранять отрендеренное можно, только если cache_generation() с тех пор не изменилось."""
+    if not hasattr(request, 'cache_generation'):
+        request.cache_generation = cache_generation()
+    return request.cache_generation
+
+
+def is_cacheable_request(request):
+    """Кэшируются только анонимные запросы без сессии и сообщений."""
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    return (
+        settings.SESSION_COOKIE_NAME not in request.COOKIES
+        and 'messages' not in request.COOKIES
+    )
+
+
+def entry_key(request, vary_on_date=False):
+    variant = f'{request.scheme}://{request.get_host()}{request.get_full_path()}'
+    if vary_on_date:
+        variant += f'#{date.today().isoformat()}'
+    return ENTRY_KEY.format(hashlib.md5(variant.encode()).hexdigest())
+
+
+def is_storable(request, response):
+    return (
+        response.status_code == 200
+        and getattr(response, 'cache_tags', None)
+        and not response.streaming
+        and not response.cookies
+        and not request.META.get('CSRF_COOKIE_USED')
+    )
+
+
+def cache_response(view_func=None, vary_on_date=False):
+    """Кэширует отрендеренный ответ представления до сброса любого из его тегов.
+    vary_on_date - ответ зависит от текущей даты (окна «сегодня», «за неделю»): в полночь он меняется
+    без изменения данных, поэтому у каждого дня своя запись.
+    Пример: @method_decorator(cache_response(vary_on_date=True), name='get')"""
+    if view_func is None:
+        return partial(cache_response, vary_on_date=vary_on_date)
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if not is_cacheable_request(request):
+            return view_func(request, *args, **kwargs)
+        cache = get_cache()
+        key = entry_key(request, vary_on_date)
+        entry = cache.get(key)
+        if entry and current_tag_versions(entry['tags']) == entry['tags']:
+            return HttpResponse(entry['content'], content_type=entry['content_type'])
+
+        generation = request_generation(request)
+        response = view_func(request, *args, **kwargs)
+        if is_storable(request, response) and cache_generation() == generation:
+            entry = {
+                'content': response.content,
+                'content_type': response['Content-Type'],
+                'tags': current_tag_versions(response.cache_tags, create_missing=True),
+            }
+            cache.set(key, entry, settings.RESPONSE_CACHE_TIMEOUT)
+        return response
+
+    return wrapper
@@ -0,0 +1,123 @@
+import re
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from junior_hunter.models import Vacancy
+
+FTS_TABLE = 'junior_hunter_vacancy_fts'
+
+# Веса колонок для BM25: совпадение в заголовке важнее, чем в описании
+BM25_WEIGHTS = (10.0, 1.0, 5.0)
+
+WORD_RE = re.compile(r'\w+')
+
+
+def is_supported():
+    """Полнотекстовый индекс есть только в SQLite (FTS5)."""
+    return connection.vendor == 'sqlite'
+
+
+def build_match_query(text):
+    """Превращает пользовательский запрос в выражение FTS5:
+    каждое слово ищется по префиксу, слова объединяются через AND."""
+    words = WORD_RE.findall(text.casefold())
+    return ' '.join('"{}"*'.format(word.replace('"', '""')) for word in words)
+
+
+def index_vacancies(vacancies):
+    """Добавляет (или переиндексирует) вакансии в полнотекстовом индексе."""
+    if not is_supported():
+        return
+    rows = [(v.id, v.title, v.description, v.skills) for v in vacancies]
+    if not rows:
+        return
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [(row[0],) for row in rows])
+        cursor.executemany(
+            f'INSERT INTO {FTS_TABLE} (rowid, title, description, skills) VALUES (%s, %s, %s, %s)',
+            rows
+        )
+
+
+def unindex_vacancies(vacancy_ids):
+    if not is_supported():
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [(pk,) for pk in vacancy_ids])
+
+
+def rebuild_index(batch_size=1000):
+    """Полная перестройка индекса пачками. Возвращает число проиндексированных вакансий."""
+    if not is_supported():
+        return 0
+    total = 0
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        batch = []
+        for vacancy in Vacancy.objects.only('id', 'title', 'description', 'skills').iterator(chunk_size=batch_size):
+            batch.append(vacancy)
+            if len(batch) >= batch_size:
+                index_vacancies(batch)
+                total += len(batch)
+                batch = []
+        index_vacancies(batch)
+        total += len(batch)
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+    return total
+
+
+def filter_vacancies(queryset, text):
+    """Вакансии queryset, подходящие под запрос, без сортировки по релевантности:
+    порядок задает вызывающий код, например для пагинации по курсору."""
+    if not is_supported():
+        return queryset.filter(Q(title__icontains=text) | Q(description__icontains=text) | Q(skills__icontains=text))
+    match_query = build_match_query(text)
+    if not match_query:
+        return queryset.none()
+    return queryset.filter(id__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match_query]))
+
+
+class SearchResults:
+    """Ленивый результат поиска по индексу, совместимый с django Paginator:
+    count() считает совпадения, срез выбирает страницу, отсортированную по BM25."""
+
+    def __init__(self, match_query):
+        self.match_query = match_query
+
+    def count(self):
+        if not self.match_query:
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT COUNT(*) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [self.match_query])
+            return cursor.fetchone()[0]
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, page):
+        if not self.match_query:
+            return []
+        offset = page.start or 0
+        limit = page.stop - offset
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+                f'ORDER BY bm25({FTS_TABLE}, %s, %s, %s) LIMIT %s OFFSET %s',
+                [self.match_query, *BM25_WEIGHTS, limit, offset]
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+        vacancies = Vacancy.objects.select_related('company').in_bulk(ids)
+        return [vacancies[pk] for pk in ids if pk in vacancies]
+
+
+def search_vacancies(text):
+    """Источник данных для страницы поиска."""
+    if is_supported():
+        return SearchResults(build_match_query(text))
+    return Vacancy.objects.filter(
+        Q(title__icontains=text) | Q(description__icontains=text) | Q(skills__icontains=text)
+    ).select_related('company').order_by('-published_at', '-id')
@@ -0,0 +1,146 @@
+from collections import Counter
+
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from junior_hunter import images, search
+from junior_hunter.autocomplete import autocomplete, entity_suggestion
+from junior_hunter.counters import change_vacancy_count
+from junior_hunter.facets import apply_facet_deltas, facet_key, move_company_location
+from junior_hunter.matching import record_vacancy_changes
+from junior_hunter.models import Company, Specialty, Vacancy
+from junior_hunter.response_cache import invalidate_tags
+from junior_hunter.skills import index_vacancy_skills
+
+
+def invalidate_vacancy_pages(vacancy_id, relations, *extra_tags):
+    """Сбрасывает кэш страниц вакансии, ее компании и специальности.
+    relations - список пар (speciality_id, company_id)."""
+    specialty_codes = Specialty.objects.filter(
+        id__in=[speciality_id for speciality_id, _ in relations]
+    ).values_list('code', flat=True)
+    invalidate_tags(
+        f'vacancy:{vacancy_id}',
+        *(f'company:{company_id}' for _, company_id in relations),
+        *(f'specialty:{code}' for code in specialty_codes),
+        *extra_tags
+    )
+
+
+def vacancies_bulk_changed(vacancy_ids):
+    """Обновляет производные данные для вакансий, записанных через
+    bulk_create или UPDATE в обход моделей, - для них сигналы не отправляются.
+    Счетчики, фасеты (rebuild_facet_counts) и кэш страниц вызывающий код обновляет сам, один раз в конце."""
+    vacancies = list(Vacancy.objects.filter(id__in=vacancy_ids).only('id', 'title', 'description', 'skills'))
+    search.index_vacancies(vacancies)
+    index_vacancy_skills(vacancies)
+    record_vacancy_changes(vacancy_ids)
+    autocomplete.invalidate()
+
+
+def vacancy_facet_key(vacancy):
+    return facet_key(vacancy.speciality_id, vacancy.company.location, vacancy.salary_min, vacancy.published_at)
+
+
+@receiver(pre_save, sender=Vacancy)
+def vacancy_before_save(sender, instance, **kwargs):
+    # Запоминаем, где вакансия была до сохранения, чтобы перенести счетчики и фасеты
+    instance._previous_relations = None
+    instance._previous_facet = None
+    instance._previous_text = None
+    if not instance._state.adding:
+        previous = Vacancy.objects.filter(id=instance.id).values_list(
+            'speciality_id', 'company_id', 'company__location', 'salary_min', 'published_at', 'title', 'skills'
+        ).first()
+        if previous:
+            speciality_id, company_id, location, salary_min, published_at, title, skills = previous
+            instance._previous_relations = (speciality_id, company_id)
+            instance._previous_facet = facet_key(speciality_id, location, salary_min, published_at)
+            instance._previous_text = (title, skills)
+
+
+@receiver(post_save, sender=Vacancy)
+def vacancy_saved(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_previous_relations', None)
+    current = (instance.speciality_id, instance.company_id)
+    facets = Counter({vacancy_facet_key(instance): 1})
+    if created or previous is None:
+        change_vacancy_count(*current, 1)
+        invalidate_vacancy_pages(instance.id, [current], 'vacancies')
+    else:
+        if previous != current:
+            change_vacancy_count(*previous, -1)
+            change_vacancy_count(*current, 1)
+        else:
+            # Счетчики те же, но списки вакансий специальности и компании изменились
+            change_vacancy_count(*current, 0)
+        invalidate_vacancy_pages(instance.id, {previous, current})
+        facets[instance._previous_facet] -= 1
+    apply_facet_deltas(facets)
+    search.index_vacancies([instance])
+    index_vacancy_skills([instance])
+    record_vacancy_changes([instance.id])
+    autocomplete.vacancy_changed(
+        (*instance._previous_text, *previous) if previous and instance._previous_text else None,
+        (instance.title, instance.skills, *current)
+    )
+
+
+@receiver(post_delete, sender=Vacancy)
+def vacancy_deleted(sender, instance, **kwargs):
+    change_vacancy_count(instance.speciality_id, instance.company_id, -1)
+    # Строки VacancySkill удаляются каскадом, списки по навыкам нужно сбросить
+    invalidate_vacancy_pages(instance.id, [(instance.speciality_id, instance.company_id)], 'vacancies', 'skills')
+    apply_facet_deltas({vacancy_facet_key(instance): -1})
+    search.unindex_vacancies([instance.id])
+    record_vacancy_changes([instance.id])
+    autocomplete.vacancy_changed((instance.title, instance.skills, instance.speciality_id, instance.company_id), None)
+
+
+def reset_image_digest(image):
+    # Новая загрузка: копии старой картинки ей не подходят, пока не созданы свои, выводится оригинал
+    if not image or not image._committed:
+        setattr(image.instance, f'{image.field.name}_digest', '')
+
+
+@receiver(pre_save, sender=Company)
+def company_before_save(sender, instance, **kwargs):
+    # Город компании - фасет ее вакансий
+    instance._previous_location = None
+    if not instance._state.adding:
+        instance._previous_location = Company.objects.filter(id=instance.id).values_list('location', flat=True).first()
+    reset_image_digest(instance.logo)
+
+
+@receiver(post_save, sender=Company)
+def company_saved(sender, instance, created, **kwargs):
+    invalidate_tags(f'company:{instance.id}', 'companies' if created else None)
+    previous_location = getattr(instance, '_previous_location', None)
+    if previous_location is not None and previous_location != instance.location:
+        move_company_location(instance.id, previous_location, instance.location)
+    images.schedule_derivatives(instance.logo, 'company_logo', f'company:{instance.id}')
+    autocomplete.entity_saved(entity_suggestion('company', instance.id, instance.name))
+
+
+@receiver(post_delete, sender=Company)
+def company_deleted(sender, instance, **kwargs):
+    invalidate_tags(f'company:{instance.id}', 'companies')
+    autocomplete.entity_deleted(('company', instance.id))
+
+
+@receiver(pre_save, sender=Specialty)
+def specialty_before_save(sender, instance, **kwargs):
+    reset_image_digest(instance.picture)
+
+
+@receiver(post_save, sender=Specialty)
+def specialty_saved(sender, instance, created, **kwargs):
+    invalidate_tags(f'specialty:{instance.code}', 'specialties' if created else None)
+    images.schedule_derivatives(instance.picture, 'specialty_picture', f'specialty:{instance.code}')
+    autocomplete.entity_saved(entity_suggestion('specialty', instance.id, instance.title, instance.code))
+
+
+@receiver(post_delete, sender=Specialty)
+def specialty_deleted(sender, instance, **kwargs):
+    invalidate_tags(f'specialty:{instance.code}', 'specialties')
+    autocomplete.entity_deleted(('specialty', instance.id))
@@ -0,0 +1,163 @@
+import re
+
+from django.db import transaction
+
+from junior_hunter.models import Skill, Vacancy, VacancySkill
+from junior_hunter.pagination import KeysetPage
+from junior_hunter.response_cache import invalidate_tags
+
+# Навыки в Vacancy.skills перечисляются через запятую, точку с запятой, косую черту или с новой строки
+SEPARATOR_RE = re.compile(r'[,;/|\n]+')
+SPACE_RE = re.compile(r'\s+')
+
+# Варианты написания -> каноническое имя навыка
+SKILL_ALIASES = {
+    'питон': 'python',
+    'python3': 'python',
+    'python 3': 'python',
+    'джанго': 'django',
+    'django rest framework': 'drf',
+    'js': 'javascript',
+    'java script': 'javascript',
+    'ts': 'typescript',
+    'postgres': 'postgresql',
+    'postgre': 'postgresql',
+    'psql': 'postgresql',
+    'k8s': 'kubernetes',
+    'golang': 'go',
+    'reactjs': 'react',
+    'react.js': 'react',
+    'vuejs': 'vue',
+    'vue.js': 'vue',
+    'nodejs': 'node.js',
+    'node': 'node.js',
+    'гит': 'git',
+    'rest api': 'rest',
+    'restful': 'rest',
+    'c sharp': 'c#',
+    'си шарп': 'c#',
+}
+
+# Режимы поиска по нескольким навыкам
+MODES = {'all': 'Все навыки', 'any': 'Любой из навыков'}
+
+
+def normalize_skill(name):
+    """' PostgreSQL ' -> 'postgresql', 'K8s' -> 'kubernetes'. Пустая строка - не навык."""
+    name = SPACE_RE.sub(' ', name.casefold()).strip().rstrip('.')
+    name = SKILL_ALIASES.get(name, name)
+    return name[:Skill._meta.get_field('name').max_length]
+
+
+def parse_skills(text):
+    """Нормализованные навыки из текста: 'Python, Django; REST API' -> {'python', 'django', 'rest'}."""
+    return {skill for skill in map(normalize_skill, SEPARATOR_RE.split(text)) if skill}
+
+
+def skill_ids(names, create=False):
+    """{имя навыка: id}. create=True добавляет недостающие навыки в таблицу Skill."""
+    names = set(names)
+    if not names:
+        return {}
+    if create:
+        Skill.objects.bulk_create([Skill(name=name) for name in names], ignore_conflicts=True)
+    return dict(Skill.objects.filter(name__in=names).values_list('name', 'id'))
+
+
+def index_vacancy_skills(vacancies):
+    """Приводит строки VacancySkill вакансий в соответствие с их полем skills.
+    Пишутся только отличающиеся пары, поэтому сохранение без изменения навыков не трогает индекс."""
+    wanted = {vacancy.id: parse_skills(vacancy.skills) for vacancy in vacancies}
+    if not wanted:
+        return
+    ids = skill_ids(set().union(*wanted.values()), create=True)
+    pairs = {(ids[name], vacancy_id) for vacancy_id, names in wanted.items() for name in names}
+    existing = {
+        (skill_id, vacancy_id): pk
+        for pk, skill_id, vacancy_id in VacancySkill.objects.filter(
+            vacancy_id__in=wanted
+        ).values_list('id', 'skill_id', 'vacancy_id')
+    }
+    stale = [pk for pair, pk in existing.items() if pair not in pairs]
+    added = [VacancySkill(skill_id=skill_id, vacancy_id=vacancy_id) for skill_id, vacancy_id in pairs - existing.keys()]
+    if not stale and not added:
+        return
+    with transaction.atomic():
+        VacancySkill.objects.filter(id__in=stale).delete()
+        VacancySkill.objects.bulk_create(added)
+    invalidate_tags('skills')
+
+
+@transaction.atomic
+def rebuild_skill_index(batch_size=2000):
+    """Полная перестройка индекса навыков пачками. Навыки без вакансий удаляются.
+    Возвращает число пар навык - вакансия."""
+    VacancySkill.objects.all().delete()
+    total = 0
+    batch = []
+    for vacancy in Vacancy.objects.only('id', 'skills').order_by().iterator(chunk_size=batch_size):
+        batch.append(vacancy)
+        if len(batch) >= batch_size:
+            total += _insert_postings(batch)
+            batch = []
+    total += _insert_postings(batch)
+    Skill.objects.exclude(id__in=VacancySkill.objects.values('skill_id')).delete()
+    invalidate_tags('skills')
+    return total
+
+
+def _insert_postings(vacancies):
+    wanted = {vacancy.id: parse_skills(vacancy.skills) for vacancy in vacancies}
+    if not wanted:
+        return 0
+    ids = skill_ids(set().union(*wanted.values()), create=True)
+    postings = [
+        VacancySkill(skill_id=ids[name], vacancy_id=vacancy_id)
+        for vacancy_id, names in wanted.items()
+        for name in names
+    ]
+    VacancySkill.objects.bulk_create(postings)
+    return len(postings)
+
+
+class SkillQuery:
+    """Вакансии с навыками: mode='all' - все навыки сразу, 'any' - хотя бы один.
+    Списки вакансий навыков читаются по индексу (skill, vacancy) и пересекаются (INTERSECT)
+    или объединяются (UNION) в SQL. Списки отсортированы по id, поэтому SQLite сливает их
+    за один проход и останавливается, набрав страницу.
+    Пример: SkillQuery('python, docker', 'all').page(request.GET.get('after'), 20)"""
+
+    def __init__(self, text, mode='all'):
+        self.skills = sorted(parse_skills(text))
+        self.mode = mode if mode in MODES else 'all'
+        ids = skill_ids(self.skills)
+        self.unknown = [name for name in self.skills if name not in ids]
+        # Неизвестный навык в режиме 'all' означает пустую выдачу
+        self.skill_ids = [] if self.mode == 'all' and self.unknown else sorted(ids.values())
+
+    def vacancy_ids(self, before=None):
+        """Запрос id вакансий с навыками (id меньше before, если задан)."""
+        postings = []
+        for skill_id in self.skill_ids:
+            rows = VacancySkill.objects.filter(skill_id=skill_id)
+            if before is not None:
+                rows = rows.filter(vacancy_id__lt=before)
+            postings.append(rows.values_list('vacancy_id', flat=True))
+        if not postings:
+            return VacancySkill.objects.none().values_list('vacancy_id', flat=True)
+        first, *rest = postings
+        if not rest:
+            return first
+        return first.intersection(*rest) if self.mode == 'all' else first.union(*rest)
+
+    def count(self):
+        return self.vacancy_ids().count()
+
+    def page(self, cursor, page_size):
+        """Страница вакансий по убыванию id. Курсор - id последней вакансии предыдущей страницы."""
+        before = int(cursor) if cursor and cursor.isdigit() else None
+        ids = list(self.vacancy_ids(before).order_by('-vacancy_id')[:page_size + 1])
+        next_cursor = str(ids[page_size - 1]) if len(ids) > page_size else None
+        ids = ids[:page_size]
+        vacancies = Vacancy.objects.select_related('company').in_bulk(ids)
+        return KeysetPage([vacancies[pk] for pk in ids if pk in vacancies], next_cursor, cursor if before else None)
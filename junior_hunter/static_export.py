@@ -0,0 +1,204 @@
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+from django.core.handlers.base import BaseHandler
+from django.db import connections
+from django.db.models import Max
+from django.test import RequestFactory
+from django.urls import reverse
+from django.utils import timezone
+
+from junior_hunter.models import Company, Specialty, Vacancy, VacancyChange
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = '.export.json'
+# Страницы, которые не зависят от конкретных строк и перестраиваются при любом изменении
+LISTING_ROUTES = ('index', 'vacancies', 'all_company')
+# Изменение, записанное до начала прошлой выгрузки, но закоммиченное после чтения,
+# попадет в следующую выгрузку за счет перекрытия
+WATERMARK_OVERLAP = timedelta(seconds=10)
+CHUNK_SIZE = 200
+
+
+def page_file(output_dir, url):
+    """'/vacancies/5/' -> <output_dir>/vacancies/5/index.html"""
+    return os.path.join(output_dir, url.strip('/'), 'index.html')
+
+
+def write_page(output_dir, url, content):
+    # Через временный файл и rename, чтобы веб-сервер не отдал недописанную страницу
+    path = page_file(output_dir, url)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary = f'{path}.{os.getpid()}.tmp'
+    with open(temporary, 'wb') as page:
+        page.write(content)
+    os.replace(temporary, path)
+
+
+def remove_page(output_dir, url):
+    directory = os.path.dirname(page_file(output_dir, url))
+    try:
+        os.remove(os.path.join(directory, 'index.html'))
+        os.rmdir(directory)
+    except FileNotFoundError:
+        pass
+    except OSError:
+        # В каталоге остались вложенные страницы
+        pass
+
+
+_handler = None
+
+
+def render_pages(output_dir, urls):
+    """Рендерит страницы через обычный стек middleware анонимным GET-запросом и пишет их в output_dir.
+    Возвращает список пар (url, код ответа). Страница с ответом 404 удаляется."""
+    global _handler
+    if _handler is None:
+        _handler = BaseHandler()
+        _handler.load_middleware()
+    factory = RequestFactory()
+    results = []
+    for url in urls:
+        response = _handler.get_response(factory.get(url))
+        if response.status_code == 200:
+            write_page(output_dir, url, response.content)
+        elif response.status_code == 404:
+            remove_page(output_dir, url)
+        results.append((url, response.status_code))
+    return results
+
+
+def read_manifest(output_dir):
+    try:
+        with open(os.path.join(output_dir, MANIFEST_FILE)) as manifest:
+            return json.load(manifest)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def write_manifest(output_dir, manifest):
+    path = os.path.join(output_dir, MANIFEST_FILE)
+    with open(f'{path}.tmp', 'w') as manifest_file:
+        json.dump(manifest, manifest_file)
+    os.replace(f'{path}.tmp', path)
+
+
+def specialty_url(code):
+    return reverse('vacancy_in_category', kwargs={'vacancy_in_category': code})
+
+
+def company_url(pk):
+    return reverse('company_id', kwargs={'company_id': pk})
+
+
+def vacancy_url(pk):
+    return reverse('vacancy_id', kwargs={'vacancy_id': pk})
+
+
+def stale_pages(output_dir, prefix, existing):
+    """Страницы в каталоге выгрузки, для которых больше нет строки в базе."""
+    try:
+        names = os.listdir(os.path.join(output_dir, prefix))
+    except FileNotFoundError:
+        return []
+    return [f'/{prefix}/{name}/' for name in names if name not in existing]
+
+
+class SiteExport:
+    """Выгрузка публичных страниц в статические HTML-файлы.
+    Первая выгрузка рендерит все страницы в пуле процессов. Следующие перестраивают только страницы
+    вакансий из журнала VacancyChange после прошлой выгрузки и страницы компаний и специальностей,
+    у которых updated_at новее ее начала (изменение вакансии обновляет updated_at ее компании
+    и специальности). Метка прошлой выгрузки хранится в output_dir/.export.json.
+    Пример: SiteExport(settings.STATIC_EXPORT_DIR, processes=4).run()"""
+
+    def __init__(self, output_dir, processes=None, full=False):
+        self.output_dir = output_dir
+        self.processes = processes or os.cpu_count()
+        self.full = full
+
+    def run(self):
+        """Возвращает (число выгруженных страниц, число удаленных, была ли выгрузка полной, список
+        (url, код ответа) страниц, которые не удалось выгрузить). При ошибках метка не сдвигается,
+        и следующая выгрузка повторит те же страницы."""
+        started = timezone.now()
+        change_id = VacancyChange.objects.aggregate(last_id=Max('id'))['last_id'] or 0
+        manifest = None if self.full else read_manifest(self.output_dir)
+        plan = self.changed_pages(manifest) if manifest else None
+        full = plan is None
+        if full:
+            urls, removed = self.all_pages()
+        else:
+            urls, removed = plan
+        for url in removed:
+            remove_page(self.output_dir, url)
+        results = self.render(urls)
+        failed = [(url, status) for url, status in results if status not in (200, 404)]
+        for url, status in failed:
+            logger.error('Страница %s не выгружена: ответ %s', url, status)
+        if not failed:
+            write_manifest(self.output_dir, {'watermark': started.isoformat(), 'change_id': change_id})
+        return len(urls) - len(failed), len(removed), full, failed
+
+    def all_pages(self):
+        codes = set(Specialty.objects.values_list('code', flat=True))
+        companies = {str(pk) for pk in Company.objects.values_list('id', flat=True)}
+        vacancies = {str(pk) for pk in Vacancy.objects.values_list('id', flat=True).iterator(chunk_size=10000)}
+        urls = [reverse(name) for name in LISTING_ROUTES + ('about',)]
+        urls += map(specialty_url, sorted(codes))
+        urls += map(company_url, sorted(companies, key=int))
+        urls += map(vacancy_url, sorted(vacancies, key=int))
+        removed = stale_pages(self.output_dir, 'vacancies/cat', codes)
+        removed += stale_pages(self.output_dir, 'companies', companies | {'index.html'})
+        removed += stale_pages(self.output_dir, 'vacancies', vacancies | {'index.html', 'cat'})
+        return urls, removed
+
+    def changed_pages(self, manifest):
+        """Страницы, которые нужно перестроить и удалить после прошлой выгрузки,
+        или None, если журнал вакансий не покрывает этот период и нужна полная выгрузка."""
+        since = datetime.fromisoformat(manifest['watermark']) - WATERMARK_OVERLAP
+        changes = list(
+            VacancyChange.objects.filter(id__gt=manifest['change_id']).values_list('vacancy_id', flat=True)
+        )
+        first_kept = VacancyChange.objects.order_by('id').values_list('id', flat=True).first()
+        if None in changes or (changes and first_kept > manifest['change_id'] + 1):
+            return None
+
+        companies = set(Company.objects.filter(updated_at__gte=since).values_list('id', flat=True))
+        specialties = set(Specialty.objects.filter(updated_at__gte=since).values_list('code', flat=True))
+        if not changes and not companies and not specialties:
+            return [], []
+        if companies:
+            # Карточки вакансий в списках специальностей выводят название и логотип компании
+            specialties = set(Specialty.objects.values_list('code', flat=True))
+        vacancies = set(Vacancy.objects.filter(id__in=set(changes)).values_list('id', flat=True))
+        vacancies.update(Vacancy.objects.filter(company_id__in=companies).values_list('id', flat=True))
+
+        urls = [reverse(name) for name in LISTING_ROUTES]
+        urls += map(specialty_url, sorted(specialties))
+        urls += map(company_url, sorted(companies))
+        urls += map(vacancy_url, sorted(vacancies))
+        removed = [vacancy_url(pk) for pk in set(changes) - vacancies]
+        # Удаление компании или специальности каскадом удаляет вакансии, их страницы уже в removed
+        removed += stale_pages(
+            self.output_dir, 'companies', {str(pk) for pk in Company.objects.values_list('id', flat=True)}
+        )
+        removed += stale_pages(self.output_dir, 'vacancies/cat', set(Specialty.objects.values_list('code', flat=True)))
+        return urls, removed
+
+    def render(self, urls):
+        chunks = [urls[start:start + CHUNK_SIZE] for start in range(0, len(urls), CHUNK_SIZE)]
+        if self.processes <= 1 or len(chunks) <= 1:
+            return render_pages(self.output_dir, urls)
+        # Соединение SQLite нельзя переносить через fork: дочерние процессы откроют свои
+        connections.close_all()
+        results = []
+        with ProcessPoolExecutor(max_workers=self.processes) as pool:
+            for chunk_results in pool.map(render_pages, [self.output_dir] * len(chunks), chunks):
+                results.extend(chunk_results)
+        return results
@@ -0,0 +1,41 @@
+from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html, format_html_join
+
+from junior_hunter.images import PRESETS, DENSITIES, derivative_name
+
+register = template.Library()
+
+
+def _srcset(name, preset, extension, digest):
+    return ', '.join(
+        f'{default_storage.url(derivative_name(name, preset, density, extension, digest))} {density}x'
+        for density in DENSITIES
+    )
+
+
+@register.simple_tag
+def picture(image, preset, **attrs):
+    """Выводит картинку в размере preset с WebP и PNG копиями для 1x и 2x.
+    Имена копий берутся из хэша в поле <поле картинки>_digest модели, хранилище не опрашивается.
+    Пока копии не созданы (хэш пуст), выводится оригинал.
+    Пример: {% picture company.logo 'company_logo' class='mx-auto d-block' %}"""
+    if not image:
+        return ''
+    width, height = PRESETS[preset]
+    attrs.setdefault('alt', '')
+    extra = format_html_join('', ' {}="{}"', attrs.items())
+    digest = getattr(image.instance, f'{image.field.name}_digest', '')
+    if not digest:
+        return format_html(
+            '<img src="{}" width="{}" height="{}"{}>',
+            image.url, width, height, extra
+        )
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}">'
+        '<img src="{}" srcset="{}" width="{}" height="{}"{}></picture>',
+        _srcset(image.name, preset, 'webp', digest),
+        default_storage.url(derivative_name(image.name, preset, 1, 'png', digest)),
+        _srcset(image.name, preset, 'png', digest),
+        width, height, extra
+    )
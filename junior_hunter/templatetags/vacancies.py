@@ -0,0 +1,44 @@
+import hashlib
+
+from django import template
+from django.conf import settings
+from django.core.cache import caches
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+register = template.Library()
+
+FRAGMENT_KEY = 'fragment:vacancy_card:{}:{}'
+
+
+def card_key(vacancy):
+    # Карточка выводит поля вакансии и логотип компании: ключ меняется вместе с ними
+    company = vacancy.company
+    version = f'{vacancy.updated_at.isoformat()}:{company.logo.name}:{company.logo_digest}'
+    return FRAGMENT_KEY.format(vacancy.id, hashlib.md5(version.encode()).hexdigest())
+
+
+@register.simple_tag
+def vacancy_cards(vacancies):
+    """Выводит карточки вакансий из includes/vacancy_card.html.
+    Готовый HTML карточки кэшируется по id, updated_at вакансии и логотипу компании (имя файла и хэш копий):
+    ключ строится из уже прочитанных строк (select_related('company')), поэтому версии тегов не читаются,
+    а измененная вакансия или новый логотип получают новый ключ.
+    На страницу уходит одно обращение к кэшу фрагментов (get_many) и одно на запись недостающих карточек.
+    Пример: {% vacancy_cards vacancies %}"""
+    vacancies = list(vacancies)
+    if not vacancies:
+        return ''
+    keys = [card_key(vacancy) for vacancy in vacancies]
+
+    cache = caches[settings.FRAGMENT_CACHE_ALIAS]
+    cards = cache.get_many(keys)
+    missing = {
+        key: render_to_string('includes/vacancy_card.html', {'vacancy': vacancy})
+        for key, vacancy in zip(keys, vacancies)
+        if key not in cards
+    }
+    if missing:
+        cache.set_many(missing, settings.FRAGMENT_CACHE_TIMEOUT)
+        cards.update(missing)
+    return mark_safe(''.join(cards[key] for key in keys))
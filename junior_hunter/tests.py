@@ -1,3 +1,1148 @@
-# from django.test import TestCase
+import asyncio
+import csv
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+from datetime import date, datetime, timedelta
+from importlib import import_module
+from io import BytesIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, reset_queries
+from django.db.models import Q
+from django.http import HttpResponse, QueryDict
+from django.template import Context, Template
+from django.template.loader import get_template
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import urlencode
+import numpy as np
+from PIL import Image
+
+from junior_hunter import application_journal, images
+from junior_hunter.autocomplete import AutocompleteIndex, Suggestion, autocomplete
+from junior_hunter.benchmark import SCALES, route_clients, seed_dataset
+from junior_hunter.exports import APPLICATION_COLUMNS
+from junior_hunter.facets import VacancyFilter, rebuild_facet_counts
+from junior_hunter.feeds import FeedImporter, read_rows
+from junior_hunter.images import DENSITIES, FORMATS, build_derivatives, derivative_name
+from junior_hunter.matching import MatchingEngine, engine
+from junior_hunter.media import serve_media
+from junior_hunter.metrics import Registry, RequestMetricsMiddleware, merged_snapshots
+from junior_hunter.models import Application, Company, Resume, Specialty, Vacancy, VacancyChange, VacancySkill
+from junior_hunter.pagination import keyset_paginate
+from junior_hunter.response_cache import bump_tag_versions, cache_response, entry_key, tag_response
+from junior_hunter.search import filter_vacancies, search_vacancies
+from junior_hunter.skills import SkillQuery, normalize_skill, parse_skills, rebuild_skill_index
+from junior_hunter.static_export import SiteExport, company_url, page_file, read_manifest, specialty_url, vacancy_url
+from junior_hunter.templatetags.images import picture
+from junior_hunter.warmup import FirstRequestReport, template_names
+
+# Небольшие справочники, которые можно читать целиком
+REFERENCE_TABLES = {'junior_hunter_specialty'}
+# Страницы, которые по замыслу выводят таблицу целиком
+FULL_LISTINGS = {
+    'all_company': {'junior_hunter_company'},
+    # Количества для фильтров без выбранных вариантов - сумма по всей таблице фасетов
+    'vacancy_filter': {'junior_hunter_vacancyfacet'},
+    # ETag списка компаний учитывает число строк, чтобы заметить удаление компании
+    'api_companies': {'junior_hunter_company'},
+}
+
+SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)')
+INDEX_SCAN = re.compile(r' USING (?:COVERING )?INDEX ')
+# Таблица SQLite - B-дерево по id: проход в порядке id без WHERE тоже останавливается на LIMIT
+ID_ORDER = re.compile(r' ORDER BY "(\w+)"\."id" (?:ASC|DESC) LIMIT ')
+
+
+def query_plan(sql):
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def full_scans(sql, allowed_tables=()):
+    """Строки плана с полным проходом по таблице.
+    Допускаются виртуальные таблицы (FTS5), разрешенные таблицы, проход по результату подзапроса
+    и проход по индексу (или по таблице в порядке id без WHERE) с LIMIT без временного B-дерева:
+    он останавливается на первых строках. Иной проход по таблице не допускается и с LIMIT:
+    при выборочном WHERE он читает ее целиком."""
+    plan = query_plan(sql)
+    tables = set(connection.introspection.table_names())
+    stops_early = ' LIMIT ' in sql and not any('USE TEMP B-TREE' in detail for detail in plan)
+    id_order = ID_ORDER.search(sql)
+    scans = []
+    for detail in plan:
+        match = SCAN.match(detail)
+        if not match or 'VIRTUAL TABLE' in detail or match.group(1) not in tables or match.group(1) in allowed_tables:
+            continue
+        if stops_early and INDEX_SCAN.search(detail):
+            continue
+        if stops_early and id_order and id_order.group(1) == match.group(1) and ' WHERE ' not in sql:
+            continue
+        scans.append(detail)
+    return scans
+
+
+@skipUnless(connection.vendor == 'sqlite', 'План запроса разбирается в формате SQLite')
+@override_settings(RESPONSE_CACHE_ALIAS='default')
+class QueryPlanTests(TestCase):
+    """Каждый запрос каждой страницы должен идти по индексу, а не полным проходом по таблице."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.bench_user = seed_dataset(**SCALES['tiny'])
+
+    def setUp(self):
+        caches['default'].clear()
+        # Снимок подбора вакансий и индекс подсказок читают таблицу целиком один раз на процесс, а не на запрос
+        engine.reload()
+        autocomplete.reload()
+
+    def test_pages_do_not_scan_tables(self):
+        for name, path, client in route_clients(self.bench_user):
+            with self.subTest(route=name, path=path):
+                # Журнал запросов очищается в начале каждого запроса,
+                # иначе CaptureQueriesContext потеряет его первые записи
+                reset_queries()
+                with CaptureQueriesContext(connection) as queries:
+                    response = client.get(path)
+                    if response.streaming:
+                        b''.join(response.streaming_content)
+                captured = [query['sql'] for query in queries.captured_queries]
+                self.assertLess(response.status_code, 400)
+                allowed_tables = REFERENCE_TABLES | FULL_LISTINGS.get(name, set())
+                for sql in captured:
+                    if not sql.startswith('SELECT'):
+                        continue
+                    self.assertEqual(full_scans(sql, allowed_tables), [], sql)
+
+    def test_limit_does_not_hide_table_scan(self):
+        self.assertNotEqual(
+            full_scans("SELECT id FROM junior_hunter_vacancy WHERE description = 'x' LIMIT 1"), []
+        )
+        self.assertEqual(full_scans(
+            'SELECT id FROM junior_hunter_company ORDER BY "junior_hunter_company"."id" ASC LIMIT 16'
+        ), [])
+
+    def test_keyset_pages_use_composite_indexes(self):
+        specialty_plan = ' '.join(query_plan(
+            'SELECT id FROM junior_hunter_vacancy WHERE speciality_id = 1 '
+            'ORDER BY published_at DESC, id DESC LIMIT 21'
+        ))
+        company_plan = ' '.join(query_plan(
+            'SELECT id FROM junior_hunter_vacancy WHERE company_id = 1 '
+            'ORDER BY published_at DESC, id DESC LIMIT 21'
+        ))
+        self.assertIn('vacancy_speciality_pub_idx', specialty_plan)
+        self.assertIn('vacancy_company_pub_idx', company_plan)
+        self.assertNotIn('TEMP B-TREE', specialty_plan + company_plan)
+
+
+class ApiTests(TestCase):
+    """JSON API (junior_hunter/api.py)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_dataset(**SCALES['tiny'])
+
+    def walk(self, url):
+        """id всех строк по ссылкам next."""
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            ids += [row['id'] for row in data['results']]
+            url = data['next']
+        return ids
+
+    def test_unknown_field_is_rejected(self):
+        for url in ('/api/vacancies/?fields=id,salary', '/api/companies/?fields=title'):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.json())
+
+    def test_selected_fields(self):
+        row = self.client.get('/api/vacancies/?fields=title&limit=1').json()['results'][0]
+        # id и published_at нужны курсору и выбираются всегда
+        self.assertEqual(set(row), {'id', 'published_at', 'title'})
+
+    def test_vacancy_cursor_covers_all_rows_once(self):
+        expected = list(Vacancy.objects.order_by('-published_at', '-id').values_list('id', flat=True))
+        self.assertEqual(self.walk('/api/vacancies/?limit=7&fields=id'), expected)
+
+    def test_company_cursor_covers_all_rows_once(self):
+        expected = list(Company.objects.order_by('id').values_list('id', flat=True))
+        self.assertEqual(self.walk('/api/companies/?limit=6'), expected)
+
+    def test_specialty_filter(self):
+        vacancies = Vacancy.objects.filter(speciality__code='spec1').order_by('-published_at', '-id')
+        expected = list(vacancies.values_list('id', flat=True))
+        self.assertTrue(expected)
+        self.assertEqual(self.walk('/api/vacancies/?specialty=spec1&limit=5'), expected)
+        self.assertEqual(self.client.get('/api/vacancies/?specialty=nope').status_code, 404)
+
+    def test_search_filter(self):
+        rows = self.client.get('/api/vacancies/?search=python&fields=title,skills,description&limit=500').json()
+        self.assertTrue(rows['results'])
+        for row in rows['results']:
+            self.assertIn('python', f'{row["title"]} {row["skills"]} {row["description"]}'.lower())
+
+    def test_not_modified_until_data_changes(self):
+        for url in ('/api/vacancies/', '/api/companies/', '/api/specialties/'):
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        etag = self.client.get('/api/vacancies/')['ETag']
+        vacancy = Vacancy.objects.order_by('id').first()
+        vacancy.title = 'Новое название'
+        vacancy.save()
+        self.assertEqual(self.client.get('/api/vacancies/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+@override_settings(RESPONSE_CACHE_ALIAS='default')
+class AnonymousSessionTests(TestCase):
+    """Анонимные запросы без cookie сессии не читают и не создают сессии."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.bench_user = seed_dataset(**SCALES['tiny'])
+
+    def setUp(self):
+        caches['default'].clear()
+        engine.reload()
+
+    def test_public_pages_do_not_touch_sessions(self):
+        for name, path, client in route_clients(self.bench_user):
+            if settings.SESSION_COOKIE_NAME in client.cookies:
+                continue
+            with self.subTest(route=name, path=path):
+                reset_queries()
+                with CaptureQueriesContext(connection) as queries:
+                    response = client.get(path)
+                captured = [query['sql'] for query in queries.captured_queries]
+                self.assertEqual([sql for sql in captured if 'django_session' in sql], [])
+                self.assertNotIn(settings.SESSION_COOKIE_NAME, response.cookies)
+
+    def test_anonymous_messages_are_stored_in_cookie(self):
+        client = Client()
+        response = client.get('/search/', HTTP_REFERER='/')
+        self.assertIn('messages', response.cookies)
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, response.cookies)
+
+
+@override_settings(RESPONSE_CACHE_ALIAS='default')
+class ConditionalResponseTests(TestCase):
+    """Публичные страницы отвечают 304, пока не изменились данные, от которых они зависят."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.bench_user = seed_dataset(**SCALES['tiny'])
+
+    def setUp(self):
+        caches['default'].clear()
+        self.vacancy = Vacancy.objects.select_related('company', 'speciality').order_by('id').first()
+
+    def etag(self, path):
+        response = self.client.get(path)
+        self.assertEqual(response.status_code, 200, path)
+        return response['ETag']
+
+    def test_not_modified(self):
+        for path in ('/', '/vacancies/', f'/vacancies/{self.vacancy.id}/', f'/companies/{self.vacancy.company_id}/'):
+            with self.subTest(path=path):
+                response = self.client.get(path)
+                self.assertEqual(self.client.get(path, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+                since = self.client.get(path, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+                self.assertEqual(since.status_code, 304)
+
+    def test_etag_changes_with_data(self):
+        category = f'/vacancies/cat/{self.vacancy.speciality.code}/'
+        pages = {
+            'vacancy': f'/vacancies/{self.vacancy.id}/',
+            'company': f'/companies/{self.vacancy.company_id}/',
+            'category': category,
+            'vacancies': '/vacancies/',
+        }
+
+        def edit_vacancy():
+            # Вакансия осталась в той же специальности и компании: change_vacancy_count(..., 0)
+            self.vacancy.title = 'Новое название'
+            self.vacancy.save()
+
+        def edit_company():
+            self.vacancy.company.name = 'Новое имя'
+            self.vacancy.company.save()
+
+        def edit_specialty():
+            self.vacancy.speciality.title = 'Новая специальность'
+            self.vacancy.speciality.save()
+
+        edits = [
+            (edit_vacancy, ['vacancy', 'company', 'category', 'vacancies']),
+            (edit_company, ['vacancy', 'company', 'category', 'vacancies']),
+            (edit_specialty, ['category', 'vacancies']),
+        ]
+        for edit, changed in edits:
+            with self.subTest(edit=edit.__name__):
+                before = {name: self.etag(path) for name, path in pages.items()}
+                edit()
+                for name in changed:
+                    self.assertNotEqual(self.etag(pages[name]), before[name], name)
+
+    def test_authenticated_requests_are_not_conditional(self):
+        path = f'/vacancies/{self.vacancy.id}/'
+        etag = self.etag(path)
+        self.client.force_login(self.bench_user)
+        response = self.client.get(path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response)
+
+
+class WarmupTests(TestCase):
+    """Прогрев воркера (junior_hunter/warmup.py)."""
+
+    def test_all_templates_compile(self):
+        names = template_names()
+        self.assertIn('includes/vacancy_card.html', names)
+        for name in names:
+            with self.subTest(template=name):
+                get_template(name)
+
+    def test_first_request_is_reported_once(self):
+        lines = []
+        FirstRequestReport(0.0, lines.append).connect()
+        client = Client()
+        client.get('/about/')
+        client.get('/about/')
+        self.assertEqual(len(lines), 1)
+        self.assertIn('первый запрос /about/', lines[0])
+
+
+class RequestMetricsMiddlewareTests(SimpleTestCase):
+
+    def test_async_chain_is_not_serialized(self):
+        # Под ASGI middleware не должно переводить цепочку в синхронный режим
+        async def get_response(request):
+            return HttpResponse()
+
+        middleware = RequestMetricsMiddleware(get_response)
+        self.assertTrue(asyncio.iscoroutinefunction(middleware))
+        response = async_to_sync(middleware)(RequestFactory().get('/'))
+        self.assertIn('total;dur=', response['Server-Timing'])
+
+    def test_snapshots_of_finished_processes_are_dropped(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        registry = Registry()
+        registry.observe('index', {'request': 0.1, 'db': 0.01, 'template': 0.02}, 3)
+        finished = subprocess.Popen([sys.executable, '-c', ''])
+        finished.wait()
+        with override_settings(METRICS_DIR=directory.name), mock.patch('junior_hunter.metrics.registry', registry):
+            # Завершившийся процесс и прежний процесс с тем же pid, что у текущего
+            names = [f'metrics-{finished.pid}-1.json', f'metrics-{finished.pid}.json', f'metrics-{os.getpid()}-1.json']
+            for name in names:
+                with open(os.path.join(directory.name, name), 'w') as snapshot_file:
+                    json.dump(registry.snapshot(), snapshot_file)
+            self.assertEqual(merged_snapshots()['index']['queries'], 3)
+            self.assertEqual(os.listdir(directory.name), [os.path.basename(registry.snapshot_path())])
+            registry.remove_snapshot()
+            self.assertEqual(os.listdir(directory.name), [])
+
+
+@override_settings(RESPONSE_CACHE_ALIAS='default')
+class ResponseCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        caches['default'].clear()
+
+    def render(self, invalidate):
+        def view(request):
+            response = tag_response(HttpResponse('page'), 'company:1')
+            if invalidate:
+                # Сброс закоммичен, пока страница рендерилась по старым данным
+                bump_tag_versions(['company:1'])
+            return response
+
+        request = RequestFactory().get('/companies/1/')
+        cache_response(view)(request)
+        return caches['default'].get(entry_key(request))
+
+    def test_page_is_stored(self):
+        self.assertIsNotNone(self.render(invalidate=False))
+
+    def test_page_rendered_during_invalidation_is_not_stored(self):
+        self.assertIsNone(self.render(invalidate=True))
+
+    def test_vary_on_date_keeps_a_page_per_day(self):
+        request = RequestFactory().get('/vacancies/filter/')
+        with mock.patch('junior_hunter.response_cache.date') as today:
+            today.today.return_value = date(2020, 7, 20)
+            cache_response(vary_on_date=True)(lambda request: tag_response(HttpResponse('page'), 'facets'))(request)
+            self.assertIsNotNone(caches['default'].get(entry_key(request, vary_on_date=True)))
+            today.today.return_value = date(2020, 7, 21)
+            self.assertIsNone(caches['default'].get(entry_key(request, vary_on_date=True)))
+
+
+class FeedImportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_dataset(**SCALES['tiny'])
+
+    def write_feed(self, lines):
+        feed = tempfile.NamedTemporaryFile('w', suffix='.jsonl', encoding='utf-8', delete=False)
+        with feed:
+            feed.write('\n'.join(lines) + '\n')
+        self.addCleanup(os.remove, feed.name)
+        return feed.name
+
+    def vacancy_row(self, title):
+        return json.dumps({
+            'title': title, 'specialty': 'spec1', 'company': 'Компания 1', 'skills': 'Python',
+            'description': 'Описание', 'salary_min': 100, 'salary_max': 200,
+        })
+
+    def test_malformed_lines_are_reported_and_skipped(self):
+        path = self.write_feed([self.vacancy_row('Первая'), '{"title": ', '[1, 2]', self.vacancy_row('Вторая')])
+        importer = FeedImporter()
+        importer.import_vacancies(read_rows(path))
+        self.assertEqual(importer.created, 2)
+        self.assertEqual([line_number for line_number, _ in importer.errors], [2, 3])
+
+    def test_counters_are_reconciled_after_failure(self):
+        def rows():
+            yield 1, json.loads(self.vacancy_row('Первая'))
+            raise OSError('обрыв файла')
+
+        with self.assertRaises(OSError):
+            FeedImporter(batch_size=1).import_vacancies(rows())
+        specialty = Specialty.objects.get(code='spec1')
+        self.assertEqual(specialty.vacancy_count, Vacancy.objects.filter(speciality=specialty).count())
+
+    def test_upsert_without_logo_keeps_logo(self):
+        company = Company.objects.get(name='Компания 1')
+        row = {'name': company.name, 'location': 'Казань', 'description': 'Новое', 'employee_count': 10}
+        FeedImporter(upsert=True, owner=company.owner).import_companies(iter([(1, row)]))
+        company.refresh_from_db()
+        self.assertEqual(company.location, 'Казань')
+        self.assertEqual(company.logo.name, 'MEDIA_COMPANY_IMAGE_DIR/workiro.png')
+
+
+class ApplicationJournalTests(TestCase):
+    """Отклики через журнал (junior_hunter/application_journal.py)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.bench_user = seed_dataset(**SCALES['tiny'])
+        cls.vacancy = Vacancy.objects.order_by('id').first()
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        journal_settings = override_settings(APPLICATION_JOURNAL_DIR=directory.name, APPLICATION_FLUSH_MAX_ATTEMPTS=2)
+        journal_settings.enable()
+        self.addCleanup(journal_settings.disable)
+        self.directory = directory.name
+
+    def record(self, **fields):
+        return {
+            'written_username': 'Иван', 'written_phone': '+7 900', 'written_cover_letter': 'Здравствуйте',
+            'vacancy_id': self.vacancy.id, 'user_id': self.bench_user.id, 'attempts': 0, **fields
+        }
+
+    def test_submitted_application_is_flushed(self):
+        application_journal.submit(Application(
+            written_username='Иван', written_phone='+7 900', written_cover_letter='Здравствуйте',
+            vacancy=self.vacancy, user=self.bench_user
+        ))
+        self.assertEqual(os.listdir(self.directory), ['journal.jsonl'])
+        before = Application.objects.count()
+        self.assertEqual(application_journal.flush(blocking=True), 1)
+        self.assertEqual(Application.objects.count(), before + 1)
+        # Журнал переименован в pending-файл, а тот удален после записи
+        self.assertEqual([name for name in os.listdir(self.directory) if name.endswith('.jsonl')], [])
+
+    def test_submit_time_is_kept(self):
+        submitted = Application(
+            written_username='Иван', written_phone='+7 900', written_cover_letter='Здравствуйте',
+            vacancy=self.vacancy, user=self.bench_user, created_at=datetime(2020, 7, 20, 10, 30)
+        )
+        application_journal.submit(submitted)
+        application_journal.flush(blocking=True)
+        self.assertEqual(Application.objects.order_by('-id').first().created_at, submitted.created_at)
+        # Запись из журнала прошлой версии, без даты
+        application_journal.append_records('pending-1-1.jsonl', [self.record()])
+        application_journal.flush(blocking=True)
+        self.assertGreater(Application.objects.order_by('-id').first().created_at, submitted.created_at)
+
+    def test_failed_rows_are_retried_then_dead_lettered(self):
+        application_journal.append_records('pending-1-1.jsonl', [
+            self.record(written_username='Мария'), self.record(written_username=None),
+        ])
+        before = Application.objects.count()
+        with self.assertLogs('junior_hunter.application_journal', 'ERROR'):
+            application_journal.flush(blocking=True)
+        self.assertEqual(Application.objects.count(), before + 1)
+        retry = [name for name in os.listdir(self.directory) if name.startswith('retry-')]
+        self.assertEqual(len(retry), 1)
+        self.assertEqual(application_journal.read_records(os.path.join(self.directory, retry[0]))[0]['attempts'], 1)
+
+        with self.assertLogs('junior_hunter.application_journal', 'ERROR') as logs:
+            application_journal.flush(blocking=True)
+        self.assertIn('dead.jsonl', logs.output[-1])
+        dead = application_journal.read_records(os.path.join(self.directory, application_journal.DEAD_FILE))
+        self.assertEqual([record['attempts'] for record in dead], [2])
+        self.assertFalse([name for name in os.listdir(self.directory) if name.startswith(('retry-', 'pending-'))])
+
+
+class VacancyCardTests(TestCase):
+    """Ключ карточки строится из прочитанных строк: версии тегов не читаются, изменения дают новый ключ."""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_dataset(**SCALES['tiny'])
+
+    def render(self):
+        vacancies = Vacancy.objects.select_related('company').order_by('id')[:5]
+        # Кэш ответов и версий тегов карточкам не нужен
+        with mock.patch('junior_hunter.response_cache.get_cache', side_effect=AssertionError('версии тегов')):
+            template = Template('{% load vacancies %}{% vacancy_cards vacancies %}')
+            return template.render(Context({'vacancies': vacancies}))
+
+    def test_changes_render_new_cards(self):
+        self.assertEqual(self.render(), self.render())
+        vacancy = Vacancy.objects.order_by('id').first()
+        vacancy.title = 'Новое название'
+        vacancy.save()
+        self.assertIn('Новое название', self.render())
+        self.assertNotIn('<picture>', self.render())
+        Company.objects.filter(id=vacancy.company_id).update(logo_digest='0123456789ab')
+        self.assertIn('0123456789ab', self.render())
+
+
+class KeysetPaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_dataset(**SCALES['tiny'])
+
+    def walk(self, queryset, page_size, field='published_at'):
+        """id всех страниц подряд, переходя по next_cursor."""
+        ids, cursor, pages = [], None, []
+        while True:
+            page = keyset_paginate(queryset, cursor, page_size, field)
+            pages.append(page)
+            ids += [obj.id for obj in page]
+            if not page.has_next:
+                return ids, pages
+            cursor = page.next_cursor
+
+    def test_pages_follow_date_then_id(self):
+        expected = list(Vacancy.objects.order_by('-published_at', '-id').values_list('id', flat=True))
+        # В наборе данных много вакансий за один день: порядок внутри дня задает id
+        self.assertLess(Vacancy.objects.values('published_at').distinct().count(), len(expected))
+        for page_size in (7, len(expected) // 8):
+            with self.subTest(page_size=page_size):
+                ids, pages = self.walk(Vacancy.objects.all(), page_size)
+                self.assertEqual(ids, expected)
+                self.assertTrue(pages[0].is_first)
+                self.assertFalse(any(page.is_first for page in pages[1:]))
+                # Последняя полная страница не ссылается на пустую
+                self.assertTrue(pages[-1].object_list)
+                self.assertIsNone(pages[-1].next_cursor)
+
+    def test_datetime_cursor_with_ties(self):
+        tied = list(Application.objects.order_by('id').values_list('id', flat=True)[:30])
+        Application.objects.filter(id__in=tied).update(created_at=datetime(2020, 7, 20, 10, 30, 0, 123456))
+        expected = list(Application.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        ids, _ = self.walk(Application.objects.all(), 9, field='created_at')
+        self.assertEqual(ids, expected)
+
+    def test_malformed_cursor_returns_first_page(self):
+        first = keyset_paginate(Vacancy.objects.all(), None, 5)
+        for cursor in ('', 'abc', '2020-13-01.5', '2020-07-12.x', '2020-07-12', '15'):
+            with self.subTest(cursor=cursor):
+                page = keyset_paginate(Vacancy.objects.all(), cursor, 5)
+                self.assertTrue(page.is_first)
+                self.assertEqual([obj.id for obj in page], [obj.id for obj in first])
+
+
+class ApplicationsExportTests(TestCase):
+    """Потоковая выгрузка откликов совпадает с values_list() при любом размере пачки."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.bench_user = seed_dataset(**SCALES['tiny'])
+        cls.company = Company.objects.get(owner=cls.bench_user)
+        cls.vacancy = cls.company.vacancies.order_by('id').first()
+        cls.tricky = Application.objects.create(
+            written_username='Иван, "младший"', written_phone='+7 900',
+            written_cover_letter='Первая строка\nвторая; "цитата", запятая\r\nи\tтаб',
+            vacancy=cls.vacancy, user=cls.bench_user,
+        )
+
+    def setUp(self):
+        self.client.force_login(self.bench_user)
+
+    def expected(self, vacancy_id=None):
+        apps = Application.objects.filter(vacancy__company=self.company)
+        if vacancy_id is not None:
+            apps = apps.filter(vacancy_id=vacancy_id)
+        return list(apps.order_by('id').values_list(*APPLICATION_COLUMNS))
+
+    def export(self, path, **params):
+        response = self.client.get(path, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def read_csv(self, body):
+        return list(csv.reader(body.splitlines(keepends=True)))
+
+    def test_csv_matches_values_list(self):
+        rows = self.expected()
+        self.assertGreater(len(rows), 3)
+        for chunk_size in (1, 3, settings.EXPORT_CHUNK_SIZE):
+            with self.subTest(chunk_size=chunk_size), self.settings(EXPORT_CHUNK_SIZE=chunk_size):
+                header, *body = self.read_csv(self.export(reverse('company_applications_export')))
+                self.assertEqual(header, APPLICATION_COLUMNS)
+                self.assertEqual(body, [[str(value) for value in row] for row in rows])
+
+    def test_jsonl_matches_values_list(self):
+        rows = self.expected()
+        encoder = DjangoJSONEncoder()
+        for chunk_size in (1, 3, settings.EXPORT_CHUNK_SIZE):
+            with self.subTest(chunk_size=chunk_size), self.settings(EXPORT_CHUNK_SIZE=chunk_size):
+                body = self.export(reverse('company_applications_export'), format='jsonl')
+                self.assertTrue(body.endswith('\n'))
+                # Переводы строк внутри значений экранируются: одна запись — одна строка
+                records = [json.loads(line) for line in body.splitlines()]
+                self.assertEqual(records, [
+                    {column: json.loads(encoder.encode(value)) for column, value in zip(APPLICATION_COLUMNS, row)}
+                    for row in rows
+                ])
+
+    def test_escaping(self):
+        path = reverse('vacancy_applications_export', kwargs={'vacancy_id': self.vacancy.id})
+        body = self.read_csv(self.export(path))[1:]
+        row = dict(zip(APPLICATION_COLUMNS, body[-1]))
+        self.assertEqual(row['written_username'], self.tricky.written_username)
+        self.assertEqual(row['written_cover_letter'], self.tricky.written_cover_letter)
+        self.assertEqual(len(body), len(self.expected(self.vacancy.id)))
+
+        body = self.export(path, format='jsonl')
+        # Кириллица пишется как есть, без \uXXXX
+        self.assertIn('Иван', body)
+        record = json.loads(body.splitlines()[-1])
+        self.assertEqual(record['written_cover_letter'], self.tricky.written_cover_letter)
+
+    def test_headers_and_date_filter(self):
+        response = self.client.get(reverse('company_applications_export'), {'format': 'jsonl'})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+        self.assertEqual(
+            response['Content-Disposition'], f'attachment; filename="applications_company_{self.company.id}.jsonl"'
+        )
+        day = self.tricky.created_at.date()
+        body = self.export(reverse('company_applications_export'), date_from=day.isoformat(), date_to=day.isoformat())
+        ids = [int(row[0]) for row in self.read_csv(body)[1:]]
+        self.assertIn(self.tricky.id, ids)
+        self.assertEqual(ids, [row[0] for row in self.expected() if row[1].date() == day])
+
+
+@override_settings(RESPONSE_CACHE_ALIAS='default')
+class StaticExportTests(TestCase):
+    """Инкрементальная выгрузка перестраивает только страницы, затронутые изменениями."""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_dataset(**SCALES['tiny'])
+        # Строки изменены задолго до выгрузки, иначе все попадут в перекрытие WATERMARK_OVERLAP
+        hour_ago = timezone.now() - timedelta(hours=1)
+        Company.objects.update(updated_at=hour_ago)
+        Specialty.objects.update(updated_at=hour_ago)
+
+    def setUp(self):
+        caches['default'].clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.output_dir = directory.name
+        self.export = SiteExport(self.output_dir, processes=1)
+        self.pages, _, full, failed = self.export.run()
+        self.assertTrue(full)
+        self.assertEqual(failed, [])
+        self.vacancy = Vacancy.objects.select_related('company', 'speciality').order_by('id').first()
+
+    def plan(self):
+        return self.export.changed_pages(read_manifest(self.output_dir))
+
+    def read_page(self, url):
+        with open(page_file(self.output_dir, url), encoding='utf-8') as page:
+            return page.read()
+
+    def test_full_build(self):
+        expected = 4 + Specialty.objects.count() + Company.objects.count() + Vacancy.objects.count()
+        self.assertEqual(self.pages, expected)
+        for url in ('/', '/about/', vacancy_url(self.vacancy.id), company_url(self.vacancy.company_id),
+                    specialty_url(self.vacancy.speciality.code)):
+            self.assertTrue(os.path.exists(page_file(self.output_dir, url)), url)
+        self.assertEqual(self.plan(), ([], []))
+        self.assertEqual(self.export.run(), (0, 0, False, []))
+
+    def test_vacancy_edit(self):
+        self.vacancy.title = 'Новое название'
+        self.vacancy.save()
+        urls, removed = self.plan()
+        company = self.vacancy.company
+        self.assertLessEqual({
+            vacancy_url(self.vacancy.id), company_url(company.id), specialty_url(self.vacancy.speciality.code),
+        }, set(urls))
+        # Изменение вакансии обновляет updated_at ее компании: перестраиваются страницы компании
+        # и ее вакансий, но не вакансий других компаний
+        rebuilt_vacancies = {url for url in urls if re.fullmatch(r'/vacancies/\d+/', url)}
+        self.assertEqual(rebuilt_vacancies, {vacancy_url(pk) for pk in company.vacancies.values_list('id', flat=True)})
+        self.assertEqual(removed, [])
+        self.assertEqual(self.export.run()[:3], (len(urls), 0, False))
+        self.assertIn('Новое название', self.read_page(vacancy_url(self.vacancy.id)))
+
+    def test_vacancy_delete(self):
+        url = vacancy_url(self.vacancy.id)
+        self.vacancy.delete()
+        urls, removed = self.plan()
+        self.assertNotIn(url, urls)
+        self.assertEqual(removed, [url])
+        self.export.run()
+        self.assertFalse(os.path.exists(page_file(self.output_dir, url)))
+
+    def test_company_rename(self):
+        company = self.vacancy.company
+        company.name = 'Новое имя компании'
+        company.save()
+        urls, removed = self.plan()
+        company_vacancies = {vacancy_url(pk) for pk in company.vacancies.values_list('id', flat=True)}
+        self.assertTrue(company_vacancies)
+        self.assertLessEqual(company_vacancies | {company_url(company.id)}, set(urls))
+        # Карточки в списках всех специальностей выводят название компании
+        self.assertLessEqual({specialty_url(code) for code in Specialty.objects.values_list('code', flat=True)},
+                             set(urls))
+        self.assertEqual(removed, [])
+        self.export.run()
+        self.assertIn('Новое имя компании', self.read_page(company_url(company.id)))
+
+    def test_trimmed_journal_forces_full_build(self):
+        change_id = read_manifest(self.output_dir)['change_id']
+        self.vacancy.save()
+        self.vacancy.save()
+        # Журнал обрезан с начала (MATCHING_JOURNAL_SIZE) дальше метки прошлой выгрузки
+        VacancyChange.objects.filter(id__lte=change_id + 1).delete()
+        self.assertIsNone(self.plan())
+        self.assertTrue(self.export.run()[2])
+
+
+class FacetCountTests(TestCase):
+    """Количества фасетов после изменений вакансий и компаний должны совпадать с пересчитанными заново."""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_dataset(**SCALES['tiny'])
+
+    def filters(self):
+        location = Company.objects.order_by('id').values_list('location', flat=True).first()
+        return [
+            {},
+            {'specialty': 'spec1'},
+            {'location': location, 'days': '7'},
+            {'specialty': 'spec2', 'salary': '2', 'days': '30'},
+            {'specialty': 'spec3', 'location': location, 'salary': '0', 'days': '1'},
+        ]
+
+    def counts(self):
+        specialties = list(Specialty.objects.order_by('title'))
+        results = []
+        for params in self.filters():
+            vacancy_filter = VacancyFilter(QueryDict(urlencode(params)), specialties)
+            # Итог - то же число, что и у списка вакансий под фильтром
+            self.assertEqual(vacancy_filter.total(), vacancy_filter.vacancies(Vacancy.objects.all()).count(), params)
+            facets = vacancy_filter.facets()
+            for option in [option for options in facets.values() for option in options if not option['selected']]:
+                # Количество варианта - итог фильтра, в котором этот вариант выбран
+                selected = VacancyFilter(QueryDict(option['query']), specialties)
+                self.assertEqual(option['count'], selected.vacancies(Vacancy.objects.all()).count(), option)
+            results.append((vacancy_filter.total(), facets))
+        return results
+
+    def assert_same_as_rebuilt(self):
+        counts = self.counts()
+        rebuild_facet_counts()
+        self.assertEqual(counts, self.counts())
+
+    def test_counts_after_changes(self):
+        rebuild_facet_counts()
+        vacancy = Vacancy.objects.order_by('id').first()
+        vacancy.salary_min = 180000
+        vacancy.speciality = Specialty.objects.get(code='spec2')
+        vacancy.save()
+        self.assert_same_as_rebuilt()
+        Vacancy.objects.order_by('id')[1].delete()
+        self.assert_same_as_rebuilt()
+        company = Company.objects.order_by('id').first()
+        company.location = 'Новый город'
+        company.save()
+        self.assert_same_as_rebuilt()
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Полнотекстовый индекс - SQLite FTS5')
+class SearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_dataset(**SCALES['tiny'])
+        cls.vacancy = Vacancy.objects.create(
+            title='Разработчик Питон', speciality=Specialty.objects.order_by('id').first(),
+            company=Company.objects.order_by('id').first(), skills='Zyxwq, Qwzyx',
+            description='Пишем сервисы', salary_min=100000, salary_max=150000
+        )
+
+    def found(self, text):
+        ids = list(filter_vacancies(Vacancy.objects.all(), text).values_list('id', flat=True))
+        self.assertEqual(search_vacancies(text).count(), len(ids), text)
+        return ids
+
+    def test_index_follows_save_and_delete(self):
+        self.assertEqual(self.found('zyxwq'), [self.vacancy.id])
+        self.vacancy.skills = 'Wqzyx'
+        self.vacancy.save()
+        self.assertEqual(self.found('zyxwq'), [])
+        self.assertEqual(self.found('wqzyx'), [self.vacancy.id])
+        self.vacancy.delete()
+        self.assertEqual(self.found('wqzyx'), [])
+
+    def test_cyrillic_and_prefix(self):
+        for text in ('разработчик', 'РАЗРАБ', 'питон разраб', 'сервис', 'Zyx', 'qwz'):
+            with self.subTest(text=text):
+                self.assertIn(self.vacancy.id, self.found(text))
+        # Слова объединяются через AND
+        self.assertEqual(self.found('разработчик zyxwq'), [self.vacancy.id])
+        self.assertEqual(self.found('разработчик нетсловатакого'), [])
+
+    def test_fts_syntax_is_escaped(self):
+        for text in ('"zyxwq', 'zyxwq"', '-zyxwq', 'zyx*', '(zyxwq', '"zyxwq" + ^qwzyx'):
+            with self.subTest(text=text):
+                self.assertEqual(self.found(text), [self.vacancy.id])
+        # Операторы и имена колонок FTS5 ищутся как обычные слова, которых в вакансии нет
+        for text in ('', '"', '-', '*', '"*"', '()', 'title:zyxwq', 'zyxwq NOT', 'zyxwq OR AND', 'NEAR(zyxwq)'):
+            with self.subTest(text=text):
+                self.assertEqual(self.found(text), [])
+
+
+class SkillIndexTests(TestCase):
+    """Поиск по индексу навыков должен находить то же, что и прежний поиск по подстроке в Vacancy.skills."""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_dataset(**SCALES['tiny'])
+        rebuild_skill_index()
+
+    def test_aliases(self):
+        self.assertEqual(normalize_skill(' PostgreSQL. '), 'postgresql')
+        self.assertEqual(normalize_skill('Си  Шарп'), 'c#')
+        self.assertEqual(
+            parse_skills('Питон, Django REST Framework; K8s / JS\nrest api,,'),
+            {'python', 'drf', 'kubernetes', 'javascript', 'rest'}
+        )
+        self.assertEqual(SkillQuery('питон, Postgres', 'all').skills, ['postgresql', 'python'])
+
+    def test_modes_match_icontains(self):
+        # Навыки без общих подстрок с другими навыками набора данных: icontains не находит лишнего
+        cases = [
+            ('python, docker', 'all', Q(skills__icontains='python') & Q(skills__icontains='docker')),
+            ('react, redis, figma', 'any',
+             Q(skills__icontains='react') | Q(skills__icontains='redis') | Q(skills__icontains='figma')),
+            ('python, нет такого навыка', 'all', Q(pk__in=[])),
+            ('python, нет такого навыка', 'any', Q(skills__icontains='python')),
+        ]
+        for text, mode, condition in cases:
+            with self.subTest(skills=text, mode=mode):
+                expected = set(Vacancy.objects.filter(condition).values_list('id', flat=True))
+                self.assertEqual(set(SkillQuery(text, mode).vacancy_ids()), expected)
+        # Пересечение в наборе данных не пустое, сравнение не вырожденное
+        self.assertTrue(SkillQuery('python, docker', 'all').count())
+
+    def test_migration_backfill_matches_rebuild(self):
+        fill_skill_index = import_module('junior_hunter.migrations.0013_fill_skill_index').fill_skill_index
+        pairs = set(VacancySkill.objects.values_list('skill__name', 'vacancy_id'))
+        VacancySkill.objects.all().delete()
+        fill_skill_index(django_apps, None, batch_size=64)
+        self.assertEqual(set(VacancySkill.objects.values_list('skill__name', 'vacancy_id')), pairs)
+
+
+class MatchingEngineTests(TestCase):
+    """Снимок, догруженный по журналу VacancyChange, должен оценивать вакансии так же, как загруженный заново."""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_dataset(**SCALES['tiny'])
+
+    def setUp(self):
+        refresh = override_settings(MATCHING_REFRESH_INTERVAL=0)
+        refresh.enable()
+        self.addCleanup(refresh.disable)
+        self.engine = MatchingEngine()
+        self.engine.reload()
+
+    def create_vacancy(self, speciality_id, skills, salary_min, salary_max):
+        return Vacancy.objects.create(
+            title='Вакансия', speciality_id=speciality_id, company=Company.objects.order_by('id').first(),
+            skills=skills, description='', salary_min=salary_min, salary_max=salary_max
+        )
+
+    def scores(self, engine, resume):
+        snapshot = engine.get_snapshot()
+        scores = snapshot.score(resume.specialty_id, resume.salary, {'python', 'django', 'zigzag'})
+        return {int(snapshot.ids[row]): round(float(scores[row]), 4) for row in np.flatnonzero(snapshot.active)}
+
+    def test_ranking(self):
+        resume = Resume(specialty_id=1, salary=200000, experience='Zigzag')
+        exact = self.create_vacancy(1, 'zigzag', 200000, 250000)
+        wide = self.create_vacancy(1, 'zigzag', 50000, 250000)
+        other_specialty = self.create_vacancy(2, 'zigzag', 200000, 250000)
+        ranked = self.engine.recommend(resume, 2)
+        self.assertEqual([pk for pk, _ in ranked], [exact.id, wide.id])
+        self.assertEqual(ranked[0][1], 6.0)
+        # Вилка 50-250 тысяч в среднем покрывает ожидания в 200 тысяч на ((200² - 50²) / 400 + 50) / 200
+        self.assertAlmostEqual(ranked[1][1], 5.0 + ((200 ** 2 - 50 ** 2) / 400 + 50) / 200, places=4)
+        # Без совпадения специальности: только зарплата и навыки
+        self.assertEqual(dict(self.engine.recommend(resume, Vacancy.objects.count()))[other_specialty.id], 3.0)
+
+    def test_incremental_refresh_matches_reload(self):
+        vacancies = list(Vacancy.objects.order_by('id')[:3])
+        self.create_vacancy(3, 'Python, Zigzag', 100000, 120000)
+        vacancies[0].skills = 'Django, Zigzag'
+        vacancies[0].salary_min = 10000
+        vacancies[0].save()
+        vacancies[1].delete()
+        vacancies[2].speciality_id = 5
+        vacancies[2].save()
+        for resume in (Resume(specialty_id=1, salary=150000), Resume(specialty_id=5, salary=0)):
+            with self.subTest(specialty=resume.specialty_id, salary=resume.salary):
+                self.assertEqual(self.scores(self.engine, resume), self.scores(MatchingEngine(), resume))
+        # Снимок догружен, а не перестроен: старые версии измененных вакансий выключены
+        self.assertEqual(self.engine.snapshot.inactive_count, 3)
+
+    def test_deleted_vacancy_is_deactivated(self):
+        resume = Resume(specialty_id=1, salary=100000, experience='Python')
+        best, _ = self.engine.recommend(resume, 1)[0]
+        Vacancy.objects.get(id=best).delete()
+        self.assertNotIn(best, dict(self.engine.recommend(resume, Vacancy.objects.count() + 1)))
+        self.assertEqual(self.engine.snapshot.inactive_count, 1)
+        self.assertNotIn(best, self.engine.rows)
+
+
+class VacancyCountTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_dataset(**SCALES['tiny'])
+
+    def test_delete_with_drifted_counter(self):
+        vacancy = Vacancy.objects.order_by('id').first()
+        Specialty.objects.filter(id=vacancy.speciality_id).update(vacancy_count=0)
+        vacancy.delete()
+        self.assertEqual(Specialty.objects.get(id=vacancy.speciality_id).vacancy_count, 0)
+
+
+class MediaTests(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        with open(os.path.join(directory.name, 'logo.png'), 'wb') as logo:
+            logo.write(b'0123456789')
+        media_settings = override_settings(MEDIA_ROOT=directory.name, MEDIA_SENDFILE_MODE=None)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+
+    def get(self, **headers):
+        response = serve_media(RequestFactory().get('/media/logo.png', **headers), 'logo.png')
+        self.addCleanup(response.close)
+        return response
+
+    def test_range(self):
+        response = self.get(HTTP_RANGE='bytes=2-4')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), b'234')
+        self.assertEqual(self.get(HTTP_RANGE='bytes=20-').status_code, 416)
+
+    def test_stale_if_range_returns_whole_file(self):
+        for byte_range in ('bytes=2-4', 'bytes=20-'):
+            with self.subTest(range=byte_range):
+                response = self.get(HTTP_RANGE=byte_range, HTTP_IF_RANGE='"old"')
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(b''.join(response.streaming_content), b'0123456789')
+
+
+class ImageDerivativeTests(TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        media_settings = override_settings(MEDIA_ROOT=directory.name, MEDIA_SENDFILE_MODE=None)
+        media_settings.enable()
+        self.addCleanup(media_settings.disable)
+        owner = User.objects.create(username='owner')
+        self.company = Company.objects.create(
+            name='Компания', location='Москва', description='', employee_count=1, owner=owner,
+            logo=ContentFile(self.png('red'), name='logo.png')
+        )
+
+    def png(self, color):
+        buffer = BytesIO()
+        Image.new('RGB', (400, 200), color).save(buffer, 'PNG')
+        return buffer.getvalue()
+
+    def build(self):
+        created = build_derivatives(self.company.logo, 'company_logo', f'company:{self.company.id}')
+        self.company.refresh_from_db()
+        return created
+
+    def test_picture_uses_hashed_derivatives_without_storage_lookups(self):
+        self.assertEqual(self.company.logo_digest, '')
+        with mock.patch.object(default_storage, 'exists', side_effect=AssertionError('exists() при рендере')):
+            self.assertIn(f'<img src="{self.company.logo.url}"', picture(self.company.logo, 'company_logo'))
+        self.assertTrue(self.build())
+        digest = self.company.logo_digest
+        self.assertRegex(digest, r'^[0-9a-f]{12}$')
+        names = [
+            derivative_name(self.company.logo.name, 'company_logo', density, extension, digest)
+            for density in DENSITIES for extension, _, _ in FORMATS
+        ]
+        self.assertTrue(all(default_storage.exists(name) for name in names))
+        with mock.patch.object(default_storage, 'exists', side_effect=AssertionError('exists() при рендере')):
+            html = picture(self.company.logo, 'company_logo')
+        for name in names:
+            self.assertIn(default_storage.url(name), html)
+        # Копии уже есть и хэш записан
+        self.assertFalse(self.build())
+
+    def test_new_upload_gets_new_names(self):
+        self.build()
+        old_digest = self.company.logo_digest
+        self.company.logo = ContentFile(self.png('blue'), name='logo.png')
+        self.company.save()
+        self.assertEqual(self.company.logo_digest, '')
+        self.assertTrue(self.build())
+        self.assertNotIn(self.company.logo_digest, ('', old_digest))
+
+    def test_executor_is_created_per_process(self):
+        with mock.patch.object(images, '_executor', None), mock.patch.object(images, '_executor_pid', None):
+            executor = images.get_executor()
+            self.addCleanup(executor.shutdown)
+            self.assertIs(images.get_executor(), executor)
+            # В воркере после fork pid другой: пул мастера не используется
+            with mock.patch('junior_hunter.images.os.getpid', return_value=os.getpid() + 1):
+                forked = images.get_executor()
+                self.addCleanup(forked.shutdown)
+            self.assertIsNot(forked, executor)
+
+    def test_schedule_skips_images_with_derivatives(self):
+        self.build()
+        with mock.patch('junior_hunter.images.transaction.on_commit') as on_commit:
+            images.schedule_derivatives(self.company.logo, 'company_logo', f'company:{self.company.id}')
+            self.assertFalse(on_commit.called)
+            self.company.logo = ContentFile(self.png('blue'), name='logo.png')
+            self.company.save()
+            self.assertTrue(on_commit.called)
+
+    def test_hashed_derivatives_are_immutable(self):
+        self.build()
+        derivative = derivative_name(self.company.logo.name, 'company_logo', 1, 'webp', self.company.logo_digest)
+        original = self.company.logo.name
+        # Хэш в имени загруженного файла выбрал пользователь, а не junior_hunter.images
+        uploaded = default_storage.save('MEDIA_COMPANY_IMAGE_DIR/logo.0123456789ab.png', ContentFile(b'0'))
+        expected = {
+            derivative: 'public, max-age=31536000, immutable',
+            original: f'public, max-age={settings.MEDIA_CACHE_MAX_AGE}',
+            uploaded: f'public, max-age={settings.MEDIA_CACHE_MAX_AGE}',
+        }
+        for path, cache_control in expected.items():
+            with self.subTest(path=path):
+                response = serve_media(RequestFactory().get(f'/media/{path}'), path)
+                response.close()
+                self.assertEqual(response['Cache-Control'], cache_control)
+
+
+class AutocompleteIndexTests(SimpleTestCase):
+    """Готовые списки лучших подсказок после add, remove и change_weight
+    должны совпадать с индексом, построенным заново."""
+
+    WORDS = ['python', 'pytest', 'разработчик', 'Разработка', 'ёлка', 'Елочный', 'ЁЖИК', 'ежевика', 'java', 'js']
+    PREFIXES = ['p', 'py', 'pyt', 'pyth', 'pytho', 'python 1', 'раз', 'РАЗР', 'разраб', 'е', 'ё', 'Ёл', 'ел',
+                'елоч', 'еж', 'ёжи', 'j', 'ja', '1', '12']
+
+    def suggestion(self, number, rnd):
+        text = f'{rnd.choice(self.WORDS)} {rnd.choice(self.WORDS)} {number}'
+        return Suggestion(('title', number), text, '', rnd.randint(0, 20))
+
+    def assert_same_as_rebuilt(self, index):
+        fresh = AutocompleteIndex(
+            [Suggestion(s.ident, s.text, s.url, s.weight) for s in index.suggestions.values()], index.top_size
+        )
+        for prefix in self.PREFIXES:
+            for limit in (3, index.top_size):
+                self.assertEqual(
+                    [s.ident for s in index.lookup(prefix, limit)],
+                    [s.ident for s in fresh.lookup(prefix, limit)],
+                    (prefix, limit)
+                )
+
+    @mock.patch('junior_hunter.autocomplete.SCAN_LIMIT', 8)
+    def test_incremental_updates_match_rebuilt_index(self):
+        rnd = random.Random(1)
+        index = AutocompleteIndex([self.suggestion(number, rnd) for number in range(300)], 5)
+        # Списки для длинных префиксов запоминаются при первом поиске и дальше тоже поддерживаются
+        self.assert_same_as_rebuilt(index)
+        next_number = 300
+        for step in range(600):
+            operation = rnd.random()
+            idents = list(index.suggestions)
+            if operation < 0.2:
+                index.add(self.suggestion(next_number, rnd), max_size=1000)
+                next_number += 1
+            elif operation < 0.35:
+                index.remove(rnd.choice(idents))
+            elif operation < 0.45:
+                # Замена текста существующей подсказки
+                ident = rnd.choice(idents)
+                index.add(Suggestion(ident, self.suggestion(ident[1], rnd).text, '', 0), max_size=1000)
+            else:
+                index.change_weight(rnd.choice(idents), rnd.choice([-3, -1, 1, 2, 5]))
+            if step % 50 == 0:
+                self.assert_same_as_rebuilt(index)
+        self.assert_same_as_rebuilt(index)
+
+    def test_case_and_yo_insensitive(self):
+        index = AutocompleteIndex([
+            Suggestion(('title', 1), 'Ёлочный дизайнер', '', 3),
+            Suggestion(('title', 2), 'Елка Python', '', 5),
+            Suggestion(('title', 3), 'Разработчик ёлок', '', 1),
+        ], 10)
+        for prefix in ('ЁЛ', 'ел', 'Ел', 'ёл'):
+            with self.subTest(prefix=prefix):
+                self.assertEqual([s.ident[1] for s in index.lookup(prefix, 10)], [2, 1, 3])
+        self.assertEqual([s.ident[1] for s in index.lookup('РАЗРАБ', 10)], [3])
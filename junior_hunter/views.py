@@ -1,39 +1,71 @@
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import logout
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.views import LoginView
 from django.http import HttpResponseNotFound, HttpResponseServerError, HttpResponse
 from django.shortcuts import render, redirect
+from django.utils.decorators import method_decorator
 from django.views import View
 from django.views.generic import CreateView
-from django.db.models import Q
-
+from django.core.paginator import Paginator
+from django.db.models import Count, Q, Sum
+
+from junior_hunter import application_journal
+from junior_hunter.conditional import (
+    category_validators, company_validators, conditional_response, main_validators, vacancies_validators,
+    vacancy_validators
+)
+from junior_hunter.exports import APPLICATION_COLUMNS, export_response, filter_by_dates
+from junior_hunter.facets import VacancyFilter
 from junior_hunter.forms import RegForm, CompanyInfoForms, VacancyForm, AppForm, ResumeForm
+from junior_hunter.matching import recommend_vacancies
 from junior_hunter.models import Specialty, Company, Vacancy, Application, Resume
+from junior_hunter.pagination import keyset_paginate
+from junior_hunter.response_cache import cache_response, tag_response
+from junior_hunter.search import search_vacancies
+from junior_hunter.skills import MODES as SKILL_MODES, SkillQuery
+
+
+def vacancy_tags(vacancies):
+    """Теги кэша для карточек вакансий: сама вакансия и компания (логотип, название)."""
+    for vacancy in vacancies:
+        yield f'vacancy:{vacancy.id}'
+        yield f'company:{vacancy.company_id}'
 
 
+@method_decorator(conditional_response(main_validators), name='get')
+@method_decorator(cache_response, name='get')
 class MainView(View):
-    """Главная страница. Выводятся специальности (до 8) и компании до (16)"""
+    """Главная страница. Выводятся специальности (до 8) и компании до (16).
+    Количество вакансий берется из счетчиков, поэтому страница строится двумя запросами"""
     def get(self, request):
         number_specialties_main_page = 8
         number_companies_main_page = 16
-        specialties = Specialty.objects.all()[:number_specialties_main_page]
-        companies = Company.objects.all()[:number_companies_main_page]
+        specialties = Specialty.objects.order_by('id')[:number_specialties_main_page]
+        companies = Company.objects.order_by('id')[:number_companies_main_page]
         context = {
             'specialties': specialties,
             'companies': companies
         }
-        return render(request, 'index.html', context=context)
+        response = render(request, 'index.html', context=context)
+        return tag_response(
+            response, 'specialties', 'companies',
+            *(f'specialty:{specialty.code}' for specialty in specialties),
+            *(f'company:{company.id}' for company in companies)
+        )
 
 
 class SearchView(View):
-    """Страница поиска, поиск осуществляется по заголовку и описанию
-    ВАЖНО! в sqlite не работает icontains, поэтому поиск чувствителен к регистру"""
+    """Страница поиска по заголовку, описанию и навыкам.
+    Ищет по полнотекстовому индексу FTS5 без учета регистра, по префиксам слов,
+    результаты отсортированы по релевантности (BM25)"""
 
     def get(self, request):
         search = request.GET.get('search', '')
         if search:
-            vacancies = Vacancy.objects.filter(Q(title__icontains=search) | Q(description__icontains=search))
+            paginator = Paginator(search_vacancies(search), settings.VACANCIES_PAGE_SIZE)
+            vacancies = paginator.get_page(request.GET.get('page'))
             context = {
                 'vacancies': vacancies,
                 'search': search
@@ -44,23 +76,79 @@ class SearchView(View):
             return redirect(request.META['HTTP_REFERER'])
 
 
+@method_decorator(conditional_response(vacancies_validators), name='get')
+@method_decorator(cache_response, name='get')
 class VacanciesView(View):
-    """На странице выводятся все вакансии. Необходимо доработать пагинацию!"""
+    """На странице выводятся все вакансии, постранично по курсору ?after="""
+
+    def get(self, request):
+        vacancies = keyset_paginate(
+            Vacancy.objects.select_related('company'),
+            request.GET.get('after'),
+            settings.VACANCIES_PAGE_SIZE
+        )
+        context = {
+            'vacancies': vacancies,
+            # Сумма счетчиков специальностей вместо COUNT(*) по всей таблице вакансий
+            'vacancies_count': Specialty.objects.aggregate(total=Sum('vacancy_count'))['total'] or 0,
+        }
+        response = render(request, 'vacancies.html', context=context)
+        return tag_response(response, 'vacancies', *vacancy_tags(vacancies))
+
+
+@method_decorator(cache_response(vary_on_date=True), name='get')
+class VacancyFilterView(View):
+    """Подбор вакансий по специальности, городу, зарплате и дате публикации.
+    У каждого варианта фильтра выводится количество вакансий из таблицы VacancyFacet"""
+
+    def get(self, request):
+        vacancy_filter = VacancyFilter(request.GET, Specialty.objects.only('id', 'code', 'title').order_by('title'))
+        vacancies = keyset_paginate(
+            vacancy_filter.vacancies(Vacancy.objects.select_related('company')),
+            request.GET.get('after'),
+            settings.VACANCIES_PAGE_SIZE
+        )
+        context = {
+            'vacancies': vacancies,
+            'vacancies_count': vacancy_filter.total(),
+            'facets': vacancy_filter.facets(),
+            'query': vacancy_filter.query(),
+        }
+        response = render(request, 'vacancy_filter.html', context=context)
+        return tag_response(response, 'facets', 'specialties', *vacancy_tags(vacancies))
+
+
+@method_decorator(cache_response, name='get')
+class SkillVacanciesView(View):
+    """Вакансии по навыкам: ?skills=python, docker&mode=all (все навыки) или mode=any (любой из них).
+    Ищет по индексу навыков VacancySkill, постранично по курсору ?after="""
 
     def get(self, request):
-        vacancies = Vacancy.objects.all()
+        skill_query = SkillQuery(request.GET.get('skills', ''), request.GET.get('mode'))
+        vacancies = skill_query.page(request.GET.get('after'), settings.VACANCIES_PAGE_SIZE)
+        query = request.GET.copy()
+        query.pop('after', None)
         context = {
             'vacancies': vacancies,
+            'vacancies_count': skill_query.count(),
+            'skills': ', '.join(skill_query.skills),
+            'unknown_skills': skill_query.unknown,
+            'mode': skill_query.mode,
+            'modes': SKILL_MODES.items(),
+            'query': query.urlencode(),
         }
-        return render(request, 'vacancies.html', context=context)
+        response = render(request, 'skill_vacancies.html', context=context)
+        return tag_response(response, 'skills', *vacancy_tags(vacancies))
 
 
+@method_decorator(conditional_response(vacancy_validators), name='get')
+@method_decorator(cache_response, name='get')
 class VacancyView(View):
     """Просмотр отдельно взятой вакансии. С возможностью отправить отклик.
     Отклик может отправлять только зарегистрированный пользователь"""
 
     def get(self, request, vacancy_id):
-        vacancy = Vacancy.objects.get(id=vacancy_id)
+        vacancy = Vacancy.objects.select_related('company').get(id=vacancy_id)
         if not vacancy:
             return HttpResponseNotFound(
                 f'Нет вакансии с id {vacancy_id}.'
@@ -70,7 +158,8 @@ class VacancyView(View):
             'vacancy': vacancy,
             'form': form
         }
-        return render(request, 'vacancy.html', context=context)
+        response = render(request, 'vacancy.html', context=context)
+        return tag_response(response, *vacancy_tags([vacancy]))
 
     def post(self, request, vacancy_id):
         vacancy = Vacancy.objects.get(id=vacancy_id)
@@ -82,7 +171,10 @@ class VacancyView(View):
             post = form.save(commit=False)
             post.user = request.user
             post.vacancy = vacancy
-            post.save()
+            if settings.APPLICATION_WRITE_BEHIND:
+                application_journal.submit(post)
+            else:
+                post.save()
             return redirect('sent')
         else:
             messages.info(request, 'Форма невалидна')
@@ -93,6 +185,8 @@ def sent(request):
     return render(request, 'sent.html')  # Если отклик успешно отправлен, то выводится страница sent
 
 
+@method_decorator(conditional_response(company_validators), name='get')
+@method_decorator(cache_response, name='get')
 class CompanyView(View):
     """Просмотр отдельно взятой компании. Внешняя страница."""
 
@@ -103,14 +197,22 @@ class CompanyView(View):
                 f'Нет компании с id {company_id}.'
                 f' Перейти на <a href="/">Главную страницу</a>'
             )
-        company_vacancies = Vacancy.objects.filter(company_id=company)
+        company_vacancies = keyset_paginate(
+            Vacancy.objects.filter(company_id=company).select_related('company'),
+            request.GET.get('after'),
+            settings.VACANCIES_PAGE_SIZE
+        )
         context = {
             'company': company,
-            'company_vacancies': company_vacancies
+            'company_vacancies': company_vacancies,
+            'vacancies_count': company.vacancy_count,
         }
-        return render(request, 'company.html', context=context)
+        response = render(request, 'company.html', context=context)
+        return tag_response(response, f'company:{company.id}', *vacancy_tags(company_vacancies))
 
 
+@method_decorator(conditional_response(category_validators), name='get')
+@method_decorator(cache_response, name='get')
 class VacancyInCategoryView(View):
     """Страница с вакансиями по конкретной специальности - Backend, Design и т.д."""
 
@@ -120,12 +222,18 @@ class VacancyInCategoryView(View):
             return HttpResponseNotFound(
                 f'Нет категории {vacancy_in_category}.'
                 f' Перейти на <a href="/">Главную страницу</a>')
-        vacancies = Vacancy.objects.filter(speciality_id=specialty)
+        vacancies = keyset_paginate(
+            Vacancy.objects.filter(speciality_id=specialty).select_related('company'),
+            request.GET.get('after'),
+            settings.VACANCIES_PAGE_SIZE
+        )
         context = {
             'specialty': specialty,
             'vacancies': vacancies,
+            'vacancies_count': specialty.vacancy_count,
         }
-        return render(request, 'vacancy_categories.html', context=context)
+        response = render(request, 'vacancy_categories.html', context=context)
+        return tag_response(response, f'specialty:{specialty.code}', *vacancy_tags(vacancies))
 
 
 class UserProfile(View):
@@ -134,8 +242,11 @@ class UserProfile(View):
 
     def get(self, request):
         user = request.user
+        resume = Resume.objects.filter(user_id=user.id).first() if user.is_authenticated else None
         context = {
-            'user': user
+            'user': user,
+            'resume': resume,
+            'recommendations': recommend_vacancies(resume) if resume else [],
         }
         return render(request, 'user_profile.html', context=context)
 
@@ -170,8 +281,8 @@ class CompanyProfileInfo(View):
 
     def get(self, request):
         user = request.user
-        if Company.objects.filter(owner=user):
-            company = Company.objects.filter(owner=user)
+        company = list(Company.objects.filter(owner=user))
+        if company:
             context = {
                 'company': company
             }
@@ -236,15 +347,20 @@ class CreateCompanyProfileVacancy(View):
 
 
 class CompanyProfileVacancyList(View):
-    """Список вакансии в профиле компании.
+    """Список вакансии в профиле компании с количеством всех и новых откликов.
+    Количества считаются одним сгруппированным запросом.
     Если вакансия не создана - идет переадресация на страницу создания вакансии"""
 
     def get(self, request):
         user = request.user
         company = Company.objects.get(owner=user)
-
-        if Vacancy.objects.filter(company_id=company):
-            vacancies = Vacancy.objects.filter(company_id=company)
+        vacancies = list(
+            Vacancy.objects.filter(company=company).annotate(
+                applications_total=Count('applications'),
+                applications_new=Count('applications', filter=Q(applications__is_read=False))
+            ).order_by('-published_at', '-id')
+        )
+        if vacancies:
             context = {
                 'vacancies': vacancies
             }
@@ -253,17 +369,57 @@ class CompanyProfileVacancyList(View):
             return render(request, 'company_vacancy_not_created.html')
 
 
+@method_decorator(login_required, name='get')
 class CompanyProfileVacancy(View):
-    """Страница вакансии в профиле компании."""
+    """Страница вакансии в профиле компании с откликами, новые первыми.
+    Отклики листаются по курсору ?after=, ?unread=1 - только непрочитанные.
+    Показанные отклики отмечаются прочитанными."""
 
     def get(self, request, vacancy_id):
-        vacancy = Vacancy.objects.get(id=vacancy_id)
-        apps = Application.objects.filter(vacancy_id=vacancy)
+        vacancy = Vacancy.objects.select_related('company').filter(id=vacancy_id, company__owner=request.user).first()
+        if not vacancy:
+            return HttpResponseNotFound(f'Нет вакансии с ID {vacancy_id}')
+        apps = Application.objects.filter(vacancy=vacancy)
+        unread_only = request.GET.get('unread') == '1'
+        counts = apps.aggregate(total=Count('id'), new=Count('id', filter=Q(is_read=False)))
+        page = keyset_paginate(
+            apps.filter(is_read=False) if unread_only else apps,
+            request.GET.get('after'),
+            settings.APPLICATIONS_PAGE_SIZE,
+            field='created_at'
+        )
         context = {
             'vacancy': vacancy,
-            'apps': apps
+            'apps': page,
+            'apps_total': counts['total'],
+            'apps_new': counts['new'],
+            'unread_only': unread_only,
+            'query': 'unread=1' if unread_only else '',
         }
-        return render(request, 'company_vacancy.html', context=context)
+        response = render(request, 'company_vacancy.html', context=context)
+        unread_ids = [app.id for app in page if not app.is_read]
+        if unread_ids:
+            Application.objects.filter(id__in=unread_ids).update(is_read=True)
+        return response
+
+
+@method_decorator(login_required, name='get')
+class ApplicationsExport(View):
+    """Выгрузка откликов в CSV или JSONL (?format=jsonl) по одной вакансии
+    или по всем вакансиям компании. Фильтры: ?date_from=2020-07-01&date_to=2020-07-31"""
+
+    def get(self, request, vacancy_id=None):
+        company = Company.objects.filter(owner=request.user).first()
+        if not company:
+            return HttpResponseNotFound('Компания не создана')
+        apps = Application.objects.filter(vacancy__company=company)
+        filename = f'applications_company_{company.id}'
+        if vacancy_id is not None:
+            apps = apps.filter(vacancy_id=vacancy_id)
+            filename = f'applications_vacancy_{vacancy_id}'
+        apps = filter_by_dates(apps, request.GET.get('date_from'), request.GET.get('date_to'))
+        file_format = 'jsonl' if request.GET.get('format') == 'jsonl' else 'csv'
+        return export_response(apps.order_by('id'), APPLICATION_COLUMNS, filename, file_format)
 
 
 class CompanyProfileVacancyEdit(View):
@@ -304,8 +460,8 @@ class ResumeView(View):
 
     def get(self, request):
         user = request.user
-        if Resume.objects.filter(user_id=user):
-            resume = Resume.objects.filter(user_id=user).first()
+        resume = Resume.objects.filter(user_id=user).first()
+        if resume:
             form = ResumeForm(instance=resume)
             context = {
                 'form': form
@@ -374,12 +530,14 @@ def logout_view(request):
     return redirect('index')
 
 
+@cache_response
 def all_company(request):
     companies = Company.objects.all()
     context = {
         'companies': companies
     }
-    return render(request, 'all_company.html', context=context)
+    response = render(request, 'all_company.html', context=context)
+    return tag_response(response, 'companies', *(f'company:{company.id}' for company in companies))
 
 
 def about(request):
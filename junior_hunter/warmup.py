@@ -0,0 +1,130 @@
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.core.signals import request_finished, request_started
+from django.db import connections
+from django.template import TemplateSyntaxError
+from django.template.loader import get_template
+from django.urls import resolve, reverse
+from django.utils import translation
+
+from junior_hunter.autocomplete import autocomplete
+from junior_hunter.matching import engine
+from junior_hunter.models import Specialty
+
+logger = logging.getLogger(__name__)
+
+
+def template_names():
+    """Имена всех шаблонов проекта (каталоги TEMPLATES DIRS): 'index.html', 'includes/vacancy_card.html'."""
+    names = []
+    for directory in settings.TEMPLATES[0]['DIRS']:
+        for root, _, files in os.walk(directory):
+            names += [
+                os.path.relpath(os.path.join(root, name), directory).replace(os.sep, '/')
+                for name in files if name.endswith('.html')
+            ]
+    return sorted(set(names))
+
+
+def compile_templates():
+    """Без DEBUG шаблоны попадают в cached.Loader процесса и не компилируются на первых запросах.
+    С DEBUG кэша нет, и шаг только проверяет, что шаблоны собираются."""
+    for name in template_names():
+        try:
+            get_template(name)
+        except TemplateSyntaxError:
+            logger.exception('Шаблон %s не скомпилирован', name)
+
+
+def load_urls():
+    # Первый resolve импортирует urls.py со всеми представлениями и компилирует регулярные выражения маршрутов
+    resolve(reverse('index'))
+
+
+def load_translations():
+    with translation.override(settings.LANGUAGE_CODE):
+        translation.gettext('')
+
+
+def prime_reference_data():
+    """Справочник специальностей нужен почти каждой публичной странице: чтение поднимает его страницы
+    в кэш SQLite текущего соединения и в page cache ОС."""
+    list(Specialty.objects.order_by('id'))
+
+
+def open_connections():
+    """Соединения с базой для текущего процесса, чтобы первый запрос не платил за connect и PRAGMA."""
+    for connection in connections.all():
+        connection.ensure_connection()
+    prime_reference_data()
+
+
+def warmup():
+    """Делает заранее то, что процесс иначе делает на первых запросах: компилирует шаблоны, загружает
+    маршруты и переводы, читает справочники, строит снимок рекомендаций и индекс подсказок
+    (если WARMUP_INDEXES). Возвращает {шаг: секунды}.
+    Соединения с базой в конце закрываются: при gunicorn --preload прогрев идет в мастере, а соединение
+    SQLite нельзя переносить через fork. Воркер открывает свои через open_connections()."""
+    steps = [
+        ('templates', compile_templates),
+        ('urls', load_urls),
+        ('translations', load_translations),
+        ('reference_data', prime_reference_data),
+    ]
+    if settings.WARMUP_INDEXES:
+        steps += [('matching', engine.reload), ('autocomplete', autocomplete.reload)]
+    report = {}
+    try:
+        for name, step in steps:
+            started = time.monotonic()
+            step()
+            report[name] = time.monotonic() - started
+    finally:
+        connections.close_all()
+    return report
+
+
+def format_report(report):
+    """{'templates': 0.12, 'urls': 0.3} -> 'templates 120 мс, urls 300 мс'"""
+    return ', '.join(f'{name} {seconds * 1000:.0f} мс' for name, seconds in report.items())
+
+
+class FirstRequestReport:
+    """Пишет в log время от старта процесса (started, time.monotonic()) до конца первого запроса
+    и время самого запроса. После первого запроса отключается от сигналов."""
+
+    def __init__(self, started, log):
+        self.started = started
+        self.log = log
+        self.lock = threading.Lock()
+        self.request_started = None
+        self.path = None
+        self.done = False
+
+    def connect(self):
+        # Ссылок на объект больше нигде нет: слабая ссылка из сигнала не удержала бы его
+        request_started.connect(self.on_started, dispatch_uid='warmup_first_request', weak=False)
+        request_finished.connect(self.on_finished, dispatch_uid='warmup_first_request', weak=False)
+
+    def on_started(self, sender, environ=None, scope=None, **kwargs):
+        with self.lock:
+            if self.request_started is None:
+                self.request_started = time.monotonic()
+                self.path = environ.get('PATH_INFO') if environ else (scope or {}).get('path')
+
+    def on_finished(self, sender, **kwargs):
+        with self.lock:
+            if self.done or self.request_started is None:
+                return
+            self.done = True
+        request_started.disconnect(dispatch_uid='warmup_first_request')
+        request_finished.disconnect(dispatch_uid='warmup_first_request')
+        finished = time.monotonic()
+        self.log(
+            f'Процесс {os.getpid()}: первый запрос {self.path} обработан через {finished - self.started:.2f} с '
+            f'после старта, сам запрос {(finished - self.request_started) * 1000:.0f} мс'
+        )